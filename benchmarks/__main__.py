@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Run the benchmark suite and print (or save) its results as JSON.
+
+    python -m benchmarks                         # everything
+    python -m benchmarks signing limiter         # some of it
+    python -m benchmarks -o 0.0.9.json           # save the results
+    python -m benchmarks --compare 0.0.9.json    # and the change from a saved run
+"""
+import argparse
+import importlib
+import json
+import platform
+import sys
+from datetime import datetime
+from datetime import timezone
+
+try:
+    from importlib.metadata import PackageNotFoundError
+    from importlib.metadata import version as distribution_version
+except ImportError:  # Python < 3.8
+    distribution_version = None  # type: ignore
+
+
+BENCHMARKS = ('imports', 'signing', 'encoding', 'throughput', 'concurrency', 'limiter', 'decoding')
+
+
+def version() -> str:
+    if distribution_version is None:
+        return 'unknown'
+    try:
+        return distribution_version('pyloniex')
+    except PackageNotFoundError:
+        return 'unknown'
+
+
+def compare(results: list, baseline: list) -> dict:
+    """The ratio of every number in `results` to its value in `baseline`."""
+    before = {result['benchmark']: result for result in baseline}
+    ratios = {}
+    for result in results:
+        previous = before.get(result['benchmark'], {})
+        for key, value in result.items():
+            old = previous.get(key)
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+                ratios[f'{result["benchmark"]}.{key}'] = round(value / old, 3)
+    return ratios
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    parser.add_argument('names', nargs='*', choices=BENCHMARKS + ((),), default=())
+    parser.add_argument('-o', '--output', help='also write the results to this file')
+    parser.add_argument('--compare', help='results of an earlier run to compare against')
+    args = parser.parse_args(argv)
+
+    report = {
+        'pyloniex': version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'results': [],
+    }
+    for name in args.names or BENCHMARKS:
+        print(f'Running {name}...', file=sys.stderr)
+        module = importlib.import_module(f'benchmarks.{name}')
+        report['results'].append(module.run())  # type: ignore
+
+    if args.compare:
+        with open(args.compare) as f:
+            report['compared_to'] = compare(report['results'], json.load(f)['results'])  # type: ignore
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Requests per second with several requests in flight at once: the asyncio
+client on one event loop, versus the blocking client on as many threads.
+FakePoloniex takes LATENCY to answer, so that concurrency pays off the way
+it does against the real exchange.
+
+    python -m benchmarks.concurrency
+"""
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+
+from requests.adapters import HTTPAdapter
+
+from benchmarks.server import FakePoloniex
+from pyloniex import PoloniexPublicAPI
+from pyloniex.api.aio import AsyncPoloniexPublicAPI
+
+
+# Requests in flight at once
+CONCURRENCY = (1, 10, 50)
+# Requests made by each of them
+CALLS_EACH = 10
+LATENCY = 0.02
+UNLIMITED = 10 ** 6
+
+
+def threaded(url: str, concurrency: int) -> float:
+    class Public(PoloniexPublicAPI):
+        host = url
+
+    public = Public(requests_per_second=UNLIMITED)
+    # One pooled connection per thread, as aiohttp's connector keeps
+    public._session.mount('http://', HTTPAdapter(pool_maxsize=concurrency))
+
+    def worker(_) -> None:
+        for _ in range(CALLS_EACH):
+            public.return_24h_volume()
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda _: public.return_24h_volume(), range(concurrency)))
+        start = perf_counter()
+        list(pool.map(worker, range(concurrency)))
+        return perf_counter() - start
+
+
+def concurrent(url: str, concurrency: int) -> float:
+    class AsyncPublic(AsyncPoloniexPublicAPI):
+        host = url
+
+    async def main() -> float:
+        async with AsyncPublic(requests_per_second=UNLIMITED, connection_limit=concurrency) as public:
+
+            async def worker() -> None:
+                for _ in range(CALLS_EACH):
+                    await public.return_24h_volume()
+
+            await asyncio.gather(*(public.return_24h_volume() for _ in range(concurrency)))
+            start = perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            return perf_counter() - start
+
+    return asyncio.run(main())
+
+
+def run():
+    result = {'benchmark': 'concurrency', 'latency_ms': LATENCY * 1000}
+    with FakePoloniex(latency=LATENCY) as server:
+        for concurrency in CONCURRENCY:
+            calls = concurrency * CALLS_EACH
+            threaded_seconds = min(threaded(server.public, concurrency) for _ in range(3))
+            async_seconds = min(concurrent(server.public, concurrency) for _ in range(3))
+            result[f'threaded_{concurrency}_requests_per_second'] = round(calls / threaded_seconds)
+            result[f'async_{concurrency}_requests_per_second'] = round(calls / async_seconds)
+    return result
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Decode time and peak memory for the large responses (returnOrderBook for
+all pairs, returnTradeHistory and returnChartData), with each JSON backend,
+streaming decoding and, where supported, columnar decoding; then end to end
+through PoloniexPublicAPI against FakePoloniex, including the Decimal
+number mode.
+
+    python -m benchmarks.decoding
+"""
+import json
+import tracemalloc
+from collections import deque
+from decimal import Decimal
+from time import perf_counter
+from typing import Any
+from typing import Callable
+from typing import Dict
+
+from benchmarks.server import FakePoloniex
+from benchmarks.server import payloads
+from pyloniex import PoloniexPublicAPI
+from pyloniex.api import STREAM_CHUNK_SIZE
+from pyloniex.decoding import BACKENDS
+from pyloniex.decoding import backend
+from pyloniex.streaming import iter_json
+
+
+REPEAT = 3
+
+
+def chunks(body: bytes):
+    for i in range(0, len(body), STREAM_CHUNK_SIZE):
+        yield body[i:i + STREAM_CHUNK_SIZE]
+
+
+def measure(func: Callable[[], Any]) -> Dict[str, float]:
+    """Best time of REPEAT runs, and the peak memory allocated by one."""
+    best = float('inf')
+    for _ in range(REPEAT):
+        start = perf_counter()
+        func()
+        best = min(best, perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'ms': round(best * 1e3, 2), 'peak_mib': round(peak / 2 ** 20, 2)}
+
+
+def flatten(prefix: str, results: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    return {
+        f'{prefix}_{method}_{unit}': value
+        for method, measured in results.items()
+        for unit, value in measured.items()
+    }
+
+
+def run():
+    try:
+        from pyloniex.columnar import CHART_DATA_COLUMNS
+        from pyloniex.columnar import TRADE_HISTORY_COLUMNS
+        from pyloniex.columnar import decode_columns
+    except ImportError:
+        decode_columns = None  # type: ignore
+
+    bodies = payloads()
+    results: Dict[str, Any] = {
+        'benchmark': 'decoding',
+        **{f'{command}_bytes': len(body) for command, body in bodies.items()},
+    }
+
+    cases = [
+        ('order_book', bodies['returnOrderBook'], '{', None),
+        ('trade_history', bodies['returnTradeHistory'], '[', 'TRADE_HISTORY_COLUMNS'),
+        ('chart_data', bodies['returnChartData'], '[', 'CHART_DATA_COLUMNS'),
+    ]
+    for name, body, container, columns in cases:
+        measured = {}
+        for backend_name in BACKENDS:
+            try:
+                loads = backend(backend_name)
+            except ImportError:
+                continue
+            measured[backend_name] = measure(lambda: loads(body))
+        measured.update({
+            # Consumes the members without holding on to them
+            'stream': measure(lambda: deque(iter_json(chunks(body), container), maxlen=0)),
+        })
+        if columns is not None and decode_columns is not None:
+            spec = {
+                'TRADE_HISTORY_COLUMNS': TRADE_HISTORY_COLUMNS,
+                'CHART_DATA_COLUMNS': CHART_DATA_COLUMNS,
+            }[columns]
+            measured['columnar'] = measure(lambda: decode_columns(body, spec))
+        results.update(flatten(name, measured))
+
+    with FakePoloniex() as server:
+        class Public(PoloniexPublicAPI):
+            host = server.public
+
+        public = Public(requests_per_second=10 ** 6)
+        stdlib = Public(requests_per_second=10 ** 6, loads=json.loads)
+        decimal = Public(requests_per_second=10 ** 6, numbers='decimal')
+
+        def sum_rates(client):
+            return sum(trade['rate'] for trade in client.return_trade_history(currency_pair='BTC_ETH'))
+
+        end_to_end = {
+            'order_book': lambda: public.return_order_book(),
+            'order_book_stdlib_json': lambda: stdlib.return_order_book(),
+            'order_book_stream': lambda: deque(public.iter_order_books(), maxlen=0),
+            'trade_history': lambda: public.return_trade_history(currency_pair='BTC_ETH'),
+            'trade_history_stdlib_json': lambda: stdlib.return_trade_history(currency_pair='BTC_ETH'),
+            'trade_history_decimal': lambda: decimal.return_trade_history(currency_pair='BTC_ETH'),
+            # Converting one field of every row, lazily and after the fact
+            'trade_history_decimal_rates': lambda: sum_rates(decimal),
+            'trade_history_eager_rates': lambda: sum(
+                Decimal(trade['rate'])
+                for trade in public.return_trade_history(currency_pair='BTC_ETH')
+            ),
+            'chart_data': lambda: public.return_chart_data(
+                currency_pair='BTC_ETH', period=300, start=0, end=1,
+            ),
+        }
+        if decode_columns is not None:
+            end_to_end['chart_data_columnar'] = lambda: public.return_chart_data(
+                currency_pair='BTC_ETH', period=300, start=0, end=1, format='columnar',
+            )
+        results.update(flatten('client', {
+            name: measure(func) for name, func in end_to_end.items()
+        }))
+
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
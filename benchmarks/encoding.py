@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Time to build and sign the body of an order, the way PoloniexPrivateAPI
+used to (protect_floats, then form encoding by requests, then encoding the
+string to bytes) and with pyloniex.encoding.
+
+    python -m benchmarks.encoding
+"""
+import json
+from timeit import Timer
+
+from requests.models import RequestEncodingMixin
+
+from pyloniex.api.private import PoloniexAuth
+from pyloniex.encoding import encode_params
+from pyloniex.utils import protect_floats
+
+
+SECRET = 'f' * 128
+NONCE = 1539874200000000
+PARAMS = {
+    'command': 'buy',
+    'currencyPair': 'BTC_ETH',
+    'rate': 0.03141593,
+    'amount': 2.71828183,
+    'postOnly': 1,
+}
+
+
+def per_second(func, repeat: int = 5) -> float:
+    timer = Timer(func)
+    number, _ = timer.autorange()
+    return number / min(timer.repeat(repeat=repeat, number=number))
+
+
+def run():
+    auth = PoloniexAuth('key', SECRET)
+
+    def before():
+        data = protect_floats(PARAMS)
+        data['nonce'] = NONCE
+        body = RequestEncodingMixin._encode_params(data)
+        return auth.sign(body.encode('utf-8'))
+
+    def after():
+        return auth.sign(encode_params(PARAMS).with_nonce(NONCE))
+
+    assert before() == after()
+    old = per_second(before)
+    new = per_second(after)
+    return {
+        'benchmark': 'encoding',
+        'protect_floats_per_second': round(old),
+        'encode_params_per_second': round(new),
+        'saved_us': round((1 / old - 1 / new) * 1e6, 2),
+        'speedup': round(new / old, 2),
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
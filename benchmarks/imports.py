@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Time, in a fresh interpreter, to import pyloniex and to get a client
+ready, next to the time requests alone takes to import; and which of the
+dependencies that should load lazily were loaded anyway.
+
+    python -m benchmarks.imports
+"""
+import json
+import subprocess
+import sys
+from statistics import median
+
+
+REPEAT = 7
+
+CASES = {
+    'requests': 'import requests',
+    'pyloniex': 'import pyloniex',
+    'public_client': 'from pyloniex import PoloniexPublicAPI; PoloniexPublicAPI()',
+    'private_client': "from pyloniex import PoloniexPrivateAPI; PoloniexPrivateAPI(key='k', secret='s')",
+}
+
+# Loaded on first use only: by the first request (tenacity), or not at all
+# by the blocking clients
+LAZY = ('asyncio', 'cryptography', 'tenacity')
+
+PROBE = '''
+import sys
+from time import perf_counter
+start = perf_counter()
+{statement}
+elapsed = perf_counter() - start
+print(elapsed, ','.join(m for m in {lazy!r} if m in sys.modules))
+'''
+
+
+def measure(statement: str):
+    times = []
+    for _ in range(REPEAT):
+        output = subprocess.run(
+            [sys.executable, '-c', PROBE.format(statement=statement, lazy=LAZY)],
+            check=True,
+            stdout=subprocess.PIPE,
+        ).stdout.decode().split()
+        times.append(float(output[0]))
+        loaded = output[1].split(',') if len(output) > 1 else []
+    return round(median(times) * 1e3, 2), loaded
+
+
+def run():
+    results = {'benchmark': 'imports', 'repeat': REPEAT}
+    for name, statement in CASES.items():
+        ms, loaded = measure(statement)
+        results[f'{name}_ms'] = ms
+        if name != 'requests':
+            results[f'{name}_eager_modules'] = loaded
+    return results
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""How closely the rate limiters keep to their rate when many threads
+contend for them, and how fast an uncontended check is.
+
+    python -m benchmarks.limiter
+"""
+import json
+import os
+import tempfile
+import threading
+from statistics import median
+from time import monotonic
+from timeit import Timer
+
+from pyloniex.limiters import SharedMemoryRateLimiter
+from pyloniex.utils import BaseRateLimiter
+from pyloniex.utils import RateLimiter
+
+
+RATE = 50
+THREADS = 8
+ACQUIRES = 25
+
+
+def accuracy(limiter: BaseRateLimiter) -> dict:
+    times = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(ACQUIRES):
+            limiter.acquire('benchmark')
+            now = monotonic()
+            with lock:
+                times.append(now)
+
+    limiter.acquire('benchmark')  # empty the bucket
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    start = monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    times.sort()
+    # Grant i is due (i + 1) / RATE seconds after the bucket was emptied
+    lateness = sorted(t - (start + (i + 1) / RATE) for i, t in enumerate(times))
+    return {
+        'measured_rate': round((len(times) - 1) / (times[-1] - times[0]), 2),
+        'lateness_p50_ms': round(median(lateness) * 1e3, 3),
+        'lateness_p99_ms': round(lateness[int(len(lateness) * 0.99)] * 1e3, 3),
+    }
+
+
+def checks_per_second(limiter: BaseRateLimiter) -> int:
+    timer = Timer(lambda: limiter.check('uncontended'))
+    number, _ = timer.autorange()
+    return round(number / min(timer.repeat(repeat=3, number=number)))
+
+
+def run():
+    with tempfile.TemporaryDirectory() as path:
+        shared = SharedMemoryRateLimiter(os.path.join(path, 'buckets'), RATE, 1)
+        try:
+            results = {
+                'memory': accuracy(RateLimiter(RATE, 1, 16)),
+                'shared_memory': accuracy(shared),
+            }
+            fast = SharedMemoryRateLimiter(os.path.join(path, 'fast'), 10 ** 9, 10 ** 9)
+            try:
+                shared_checks = checks_per_second(fast)
+            finally:
+                fast.close()
+        finally:
+            shared.close()
+
+    return {
+        'benchmark': 'limiter',
+        'target_rate': RATE,
+        'threads': THREADS,
+        **{
+            f'{backend}_{name}': value
+            for backend, measured in results.items()
+            for name, value in measured.items()
+        },
+        'memory_checks_per_second': checks_per_second(RateLimiter(10 ** 9, 10 ** 9, 16)),
+        'shared_memory_checks_per_second': shared_checks,
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
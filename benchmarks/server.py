@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""An in-process fake of the Poloniex HTTP API, serving canned responses of
+realistic size, so that benchmarks measure the client rather than the
+exchange or the network.
+
+    with FakePoloniex() as server:
+        public = PoloniexPublicAPI(...)  # with host = server.public
+"""
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from time import sleep
+from typing import Dict
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+
+PAIRS = 100
+BOOK_DEPTH = 50
+TRADES = 50000
+CANDLES = 30 * 24 * 12  # 30 days of 5 minute candles
+
+
+def _dumps(data) -> bytes:
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def payloads(seed: int = 0) -> Dict[str, bytes]:
+    """Canned response bodies, keyed by command."""
+    rng = random.Random(seed)
+    pairs = [f'BTC_{i:03d}' for i in range(PAIRS)]
+
+    ticker = {
+        pair: {
+            'id': i, 'last': f'{rng.random():.8f}', 'lowestAsk': f'{rng.random():.8f}',
+            'highestBid': f'{rng.random():.8f}', 'percentChange': f'{rng.random():.8f}',
+            'baseVolume': f'{rng.random() * 1e3:.8f}', 'quoteVolume': f'{rng.random() * 1e5:.8f}',
+            'isFrozen': '0', 'high24hr': f'{rng.random():.8f}', 'low24hr': f'{rng.random():.8f}',
+        }
+        for i, pair in enumerate(pairs)
+    }
+
+    def side():
+        return [[f'{rng.random():.8f}', round(rng.random() * 100, 8)] for _ in range(BOOK_DEPTH)]
+
+    books = {
+        pair: {'asks': side(), 'bids': side(), 'isFrozen': '0', 'seq': rng.randrange(10 ** 9)}
+        for pair in pairs
+    }
+
+    trades = []
+    for i in range(TRADES):
+        rate = rng.random() / 10
+        amount = rng.random() * 10
+        trades.append({
+            'globalTradeID': 200000000 + TRADES - i,
+            'tradeID': 4000000 + TRADES - i,
+            'date': f'2018-10-{1 + i * 28 // TRADES:02d} {i % 24:02d}:{i % 60:02d}:{(i * 7) % 60:02d}',
+            'type': 'buy' if rng.random() < 0.5 else 'sell',
+            'rate': f'{rate:.8f}',
+            'amount': f'{amount:.8f}',
+            'total': f'{rate * amount:.8f}',
+        })
+
+    candles = []
+    for i in range(CANDLES):
+        price = 0.03 + rng.random() / 100
+        candles.append({
+            'date': 1538352000 + i * 300,
+            'high': round(price * 1.01, 8), 'low': round(price * 0.99, 8),
+            'open': round(price, 8), 'close': round(price * 1.001, 8),
+            'volume': round(rng.random() * 50, 8), 'quoteVolume': round(rng.random() * 1500, 8),
+            'weightedAverage': round(price, 8),
+        })
+
+    volume = {
+        pair: {'BTC': f'{rng.random() * 1e3:.8f}', pair[4:]: f'{rng.random() * 1e5:.8f}'}
+        for pair in pairs[:5]
+    }
+
+    return {
+        'returnTicker': _dumps(ticker),
+        'return24hVolume': _dumps(volume),
+        'returnOrderBook': _dumps(books),
+        'returnTradeHistory': _dumps(trades),
+        'returnChartData': _dumps(candles),
+        'returnBalances': _dumps({pair.split('_')[1]: '0.00000000' for pair in pairs}),
+    }
+
+
+class FakePoloniex:
+    """Serves `payloads()` over HTTP/1.1 keep-alive on a local port. /public
+    answers by `command`; /tradingApi answers every command with balances,
+    without checking signatures. Each response waits `latency` seconds, as
+    if it came from far away.
+    """
+
+    def __init__(self, seed: int = 0, latency: float = 0.0) -> None:
+        self.payloads = payloads(seed)
+        bodies = self.payloads
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body go out as separate writes; without this,
+            # delayed ACKs add 40ms to every response
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def reply(self, body: bytes) -> None:
+                if latency:
+                    sleep(latency)
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                command = parse_qs(urlparse(self.path).query)['command'][0]
+                self.reply(bodies.get(command, b'{"error":"Invalid command."}'))
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                self.reply(bodies['returnBalances'])
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        base = f'http://127.0.0.1:{self._server.server_address[1]}'
+        self.public = f'{base}/public'
+        self.trading = f'{base}/tradingApi'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Signatures per second for PoloniexAuth, versus keying a fresh HMAC for
+every request the way it used to (with cryptography, which is only compared
+against if it's installed).
+
+    python -m benchmarks.signing
+"""
+import json
+from binascii import hexlify
+from timeit import Timer
+
+from pyloniex.api.private import PoloniexAuth
+
+
+SECRET = 'f' * 128
+BODY = (
+    b'command=buy&currencyPair=BTC_ETH&rate=0.03141593&amount=2.71828183'
+    b'&nonce=1539874200000000'
+)
+
+
+def unkeyed_signer():
+    """Signing as it used to be done, or None without cryptography."""
+    try:
+        from cryptography.hazmat.backends import default_backend
+        from cryptography.hazmat.primitives.hashes import SHA512
+        from cryptography.hazmat.primitives.hmac import HMAC
+    except ImportError:
+        return None
+
+    def sign_unkeyed(secret: str, body: bytes) -> bytes:
+        hmac = HMAC(secret.encode('utf-8'), SHA512(), default_backend())
+        hmac.update(body)
+        return hexlify(hmac.finalize())
+
+    return sign_unkeyed
+
+
+def per_second(func, repeat: int = 5) -> float:
+    timer = Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number))
+    return number / best
+
+
+def run():
+    auth = PoloniexAuth('key', SECRET)
+    after = per_second(lambda: auth.sign(BODY))
+    result = {'benchmark': 'signing', 'keyed_copy_per_second': round(after)}
+
+    sign_unkeyed = unkeyed_signer()
+    if sign_unkeyed is not None:
+        assert auth.sign(BODY) == sign_unkeyed(SECRET, BODY)
+        before = per_second(lambda: sign_unkeyed(SECRET, BODY))
+        result['unkeyed_per_second'] = round(before)
+        result['speedup'] = round(after / before, 2)
+    return result
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
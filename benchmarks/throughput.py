@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Requests per second through the clients against FakePoloniex, and the
+overhead per call compared to the same request made with a bare requests
+Session. Overhead is measured with small responses, so that decoding them
+doesn't drown it out.
+
+    python -m benchmarks.throughput
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+from time import perf_counter
+from time import time
+
+import requests
+
+from benchmarks.server import FakePoloniex
+from pyloniex import PoloniexPrivateAPI
+from pyloniex import PoloniexPublicAPI
+from pyloniex.api.aio import AsyncPoloniexPublicAPI
+
+
+CALLS = 500
+CONCURRENCY = 50
+SECRET = 'f' * 128
+UNLIMITED = 10 ** 6
+
+
+def timed(func, calls: int = CALLS) -> float:
+    func()  # warm up the connection
+    start = perf_counter()
+    for _ in range(calls):
+        func()
+    return perf_counter() - start
+
+
+def best_of(rounds: int, *funcs) -> list:
+    """The best time for each of `funcs`, taking turns so that they all see
+    the same conditions.
+    """
+    best = [float('inf')] * len(funcs)
+    for _ in range(rounds):
+        for i, func in enumerate(funcs):
+            best[i] = min(best[i], timed(func))
+    return best
+
+
+def run():
+    with FakePoloniex() as server:
+        class Public(PoloniexPublicAPI):
+            host = server.public
+
+        class Private(PoloniexPrivateAPI):
+            host = server.trading
+
+        class AsyncPublic(AsyncPoloniexPublicAPI):
+            host = server.public
+
+        session = requests.Session()
+        public = Public(requests_per_second=UNLIMITED)
+        private = Private(key='key', secret=SECRET, requests_per_second=UNLIMITED)
+
+        def raw_public():
+            return session.get(server.public, params={'command': 'return24hVolume'}).json()
+
+        def raw_private():
+            body = f'command=returnBalances&nonce={int(time() * 1e6)}'.encode()
+            sign = hmac.new(SECRET.encode(), body, hashlib.sha512).hexdigest()
+            return session.post(
+                server.trading,
+                data=body,
+                headers={
+                    'Key': 'key',
+                    'Sign': sign,
+                    'Content-Type': 'application/x-www-form-urlencoded',
+                },
+            ).json()
+
+        raw_public_seconds, public_seconds = best_of(3, raw_public, public.return_24h_volume)
+        raw_private_seconds, private_seconds = best_of(3, raw_private, private.return_balances)
+        ticker_seconds = timed(public.return_ticker)
+
+        async def concurrent():
+            async with AsyncPublic(requests_per_second=UNLIMITED) as client:
+                await client.return_24h_volume()
+                start = perf_counter()
+                for _ in range(CALLS // CONCURRENCY):
+                    await asyncio.gather(*(client.return_24h_volume() for _ in range(CONCURRENCY)))
+                return perf_counter() - start
+
+        async_seconds = asyncio.run(concurrent())
+
+    return {
+        'benchmark': 'throughput',
+        'calls': CALLS,
+        'public_requests_per_second': round(CALLS / public_seconds),
+        'ticker_requests_per_second': round(CALLS / ticker_seconds),
+        'public_overhead_us': round((public_seconds - raw_public_seconds) / CALLS * 1e6, 1),
+        'private_requests_per_second': round(CALLS / private_seconds),
+        'private_overhead_us': round((private_seconds - raw_private_seconds) / CALLS * 1e6, 1),
+        'async_public_requests_per_second': round(CALLS // CONCURRENCY * CONCURRENCY / async_seconds),
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -1,3 +1,32 @@
 # -*- coding: utf-8 -*-
-from pyloniex.api.public import PoloniexPublicAPI    # noqa: F401
-from pyloniex.api.private import PoloniexPrivateAPI  # noqa: F401
+"""The clients are imported on first use, along with requests, so that
+importing pyloniex (or a module in it that doesn't need them) stays cheap.
+"""
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pyloniex.api.public import PoloniexPublicAPI    # noqa: F401
+    from pyloniex.api.private import PoloniexPrivateAPI  # noqa: F401
+
+
+_LAZY = {
+    'PoloniexPublicAPI': 'pyloniex.api.public',
+    'PoloniexPrivateAPI': 'pyloniex.api.private',
+}
+
+__all__ = sorted(_LAZY)
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(module), name)
+    # Later lookups don't come through here
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
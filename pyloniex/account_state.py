@@ -0,0 +1,430 @@
+# -*- coding: utf-8 -*-
+"""An account's balances, open orders and margin positions, kept in memory.
+
+An AccountMirror loads a snapshot of the exchange account
+(returnCompleteBalances, returnOpenOrders and getMarginPosition for all
+pairs) and then keeps it up to date from the results of the trading
+commands made through it, so that reading the account costs no requests:
+
+    account = AccountMirror(private, interval=300)
+    account.buy(currency_pair='BTC_ETH', rate=0.03, amount=2)
+    account.return_complete_balances()['ETH']['available']
+    account.return_open_orders(currency_pair='BTC_ETH')
+
+buy, sell, cancel_order, move_order and transfer_balance move balances in
+and out of orders as the exchange would; return_order_trades applies the
+fills of orders that have traded since. The read methods take the same
+arguments, and return the same shapes, as the client's, with numbers as
+the client's `numbers` has them (floats given None). The mirror keeps them
+as Decimals, so that its arithmetic is exact.
+
+The mirror reconciles with a new snapshot when it's read, if `interval`
+seconds have passed since the last one (never, given None), or if it has
+seen something it can't account for: an order it doesn't know of, a cancel
+for a different amount than it expected (a fill it missed), a balance that
+would go negative, a trading command that failed (whose outcome isn't
+known), or a result that raced with a reconciliation. btcValue is only as
+recent as the last snapshot.
+"""
+from decimal import Decimal
+from logging import getLogger
+from threading import RLock
+from time import monotonic
+from typing import TYPE_CHECKING
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Set
+
+from pyloniex.constants import OrderType
+from pyloniex.decoding import _identity
+from pyloniex.decoding import unwrap
+from pyloniex.encoding import Scaled
+
+if TYPE_CHECKING:
+    from pyloniex.api.private import PoloniexPrivateAPI  # noqa: F401
+
+
+# Amounts smaller than this are rounding error (Poloniex uses 8 decimals)
+DUST = Decimal('1e-9')
+
+# Orders of these types never rest on the book
+IMMEDIATE = frozenset({OrderType.fill_or_kill, OrderType.immediate_or_cancel})
+
+logger = getLogger(__name__)
+
+
+class MirroredOrder(NamedTuple):
+    order_number: str
+    currency_pair: str
+    side: str
+    rate: Decimal
+    # What's left of it
+    amount: Decimal
+    starting_amount: Decimal
+
+    def as_dict(self) -> Dict[str, Any]:
+        """In the shape of a returnOpenOrders entry."""
+        return {
+            'orderNumber': self.order_number,
+            'type': self.side,
+            'rate': self.rate,
+            'amount': self.amount,
+            'startingAmount': self.starting_amount,
+            'total': self.rate * self.amount,
+        }
+
+
+def _decimal(value: Any) -> Decimal:
+    if isinstance(value, Scaled):
+        return Decimal(value.units).scaleb(-value.scale)
+    elif isinstance(value, float):
+        # repr is the shortest string that round trips, i.e. what was meant
+        return Decimal(repr(value))
+    return Decimal(value)
+
+
+def _floats(data: Any) -> Any:
+    if isinstance(data, dict):
+        return {key: _floats(value) for key, value in data.items()}
+    elif isinstance(data, list):
+        return [_floats(value) for value in data]
+    elif isinstance(data, Decimal):
+        return float(data)
+    return data
+
+
+def _trades(result: Dict[str, Any], currency_pair: str) -> Iterable[Any]:
+    trades = result.get('resultingTrades') or []
+    # moveOrder reports them by pair
+    if hasattr(trades, 'get'):
+        trades = trades.get(currency_pair) or []
+    return trades
+
+
+class AccountMirror:
+    """The state of the exchange account of `client`, a PoloniexPrivateAPI.
+
+    Trading commands can be made through the mirror from several threads at
+    once. Reads made while it reconciles wait for the new snapshot.
+    """
+
+    def __init__(
+        self,
+        client: 'PoloniexPrivateAPI',
+        *,
+        interval: Optional[float] = 60.0,
+    ) -> None:
+        self._client = client
+        # How the client presents numbers (see pyloniex.decoding)
+        self._view = getattr(client, '_numbers', _identity)
+        self.interval = interval
+        self._lock = RLock()
+        self._balances: Dict[str, Dict[str, Decimal]] = {}
+        self._orders: Dict[str, MirroredOrder] = {}
+        self._pairs: Set[str] = set()
+        self._positions: Dict[str, Dict[str, Any]] = {}
+        # When the last snapshot was taken (monotonic); None until the first
+        self.refreshed: Optional[float] = None
+        # Whether the next read reconciles, whatever the interval
+        self.stale = True
+        # Counts snapshots, so that results can tell whether they raced one
+        self._generation = 0
+
+    # Reconciliation
+
+    def refresh(self) -> None:
+        """Replace the mirror with a new snapshot of the account."""
+        with self._lock:
+            # Numbers as Poloniex sent them, whatever the client's `numbers`
+            balances = unwrap(self._client.return_complete_balances())
+            orders = unwrap(self._client.return_open_orders(currency_pair='all'))
+            positions = unwrap(self._client.get_margin_position(currency_pair='all'))
+
+            self._balances = {
+                currency: {
+                    'available': _decimal(balance['available']),
+                    'onOrders': _decimal(balance['onOrders']),
+                    'btcValue': _decimal(balance.get('btcValue', 0)),
+                }
+                for currency, balance in balances.items()
+            }
+            self._orders = {}
+            self._pairs = set(orders)
+            for pair, pair_orders in orders.items():
+                for order in pair_orders:
+                    number = str(order['orderNumber'])
+                    amount = _decimal(order['amount'])
+                    self._orders[number] = MirroredOrder(
+                        number,
+                        pair,
+                        order['type'],
+                        _decimal(order['rate']),
+                        amount,
+                        _decimal(order.get('startingAmount', amount)),
+                    )
+            self._positions = {
+                pair: {k: v if k == 'type' else _decimal(v) for k, v in position.items()}
+                for pair, position in positions.items()
+            }
+            self._generation += 1
+            self.stale = False
+            self.refreshed = monotonic()
+
+    def _current(self) -> None:
+        with self._lock:
+            due = self.refreshed is None or (
+                self.interval is not None and monotonic() - self.refreshed >= self.interval
+            )
+            if self.stale or due:
+                self.refresh()
+
+    # Reads
+
+    def _present(self, data: Any) -> Any:
+        if self._view is _identity:
+            return _floats(data)
+        return self._view(data)
+
+    def return_complete_balances(self):
+        with self._lock:
+            self._current()
+            return self._present({currency: dict(balance) for currency, balance in self._balances.items()})
+
+    def return_open_orders(self, *, currency_pair: Optional[str] = None):
+        with self._lock:
+            self._current()
+            if currency_pair is not None and currency_pair != 'all':
+                return self._present([
+                    order.as_dict() for order in self._orders.values()
+                    if order.currency_pair == currency_pair
+                ])
+            by_pair: Dict[str, List[Dict[str, Any]]] = {pair: [] for pair in sorted(self._pairs)}
+            for order in self._orders.values():
+                by_pair.setdefault(order.currency_pair, []).append(order.as_dict())
+            return self._present(by_pair)
+
+    def get_margin_position(self, *, currency_pair: Optional[str] = None):
+        with self._lock:
+            self._current()
+            if currency_pair is not None and currency_pair != 'all':
+                return self._present(dict(self._positions.get(currency_pair, {'type': 'none'})))
+            return self._present({pair: dict(position) for pair, position in self._positions.items()})
+
+    # Trading commands, applied to the mirror
+
+    def _call(self, command: Callable[..., Any], apply: Callable[[Any], None], **kwargs) -> Any:
+        with self._lock:
+            generation = self._generation
+        try:
+            result = command(**kwargs)
+        except Exception:
+            self.stale = True
+            raise
+        with self._lock:
+            # A snapshot taken while the command was in flight may or may not
+            # include its effects
+            if generation != self._generation:
+                self.stale = True
+            else:
+                # The command went through whatever happens here, so its
+                # result must get back to the caller
+                try:
+                    apply(unwrap(result))
+                except Exception:
+                    logger.exception('Could not apply the result of %s to the account mirror', command)
+                    self.stale = True
+        return result
+
+    def _order(self, side: str, command: Callable[..., Any], **kwargs) -> Any:
+        return self._call(command, lambda result: self._place(side, result, **kwargs), **kwargs)
+
+    def buy(
+        self,
+        *,
+        currency_pair: str,
+        rate: float,
+        amount: float,
+        order_type: Optional[OrderType] = None,
+    ):
+        return self._order(
+            'buy',
+            self._client.buy,
+            currency_pair=currency_pair,
+            rate=rate,
+            amount=amount,
+            order_type=order_type,
+        )
+
+    def sell(
+        self,
+        *,
+        currency_pair: str,
+        rate: float,
+        amount: float,
+        order_type: Optional[OrderType] = None,
+    ):
+        return self._order(
+            'sell',
+            self._client.sell,
+            currency_pair=currency_pair,
+            rate=rate,
+            amount=amount,
+            order_type=order_type,
+        )
+
+    def cancel_order(self, *, order_number: int):
+        def apply(result: Dict[str, Any]) -> None:
+            order = self._forget(order_number)
+            if order is not None and abs(_decimal(result.get('amount', order.amount)) - order.amount) > DUST:
+                self.stale = True
+
+        return self._call(self._client.cancel_order, apply, order_number=order_number)
+
+    def move_order(
+        self,
+        *,
+        order_number: int,
+        rate: float,
+        amount: Optional[float] = None,
+        order_type: Optional[OrderType] = None,
+    ):
+        def apply(result: Dict[str, Any]) -> None:
+            order = self._forget(order_number)
+            if order is not None:
+                self._place(
+                    order.side,
+                    result,
+                    currency_pair=order.currency_pair,
+                    rate=rate,
+                    amount=order.amount if amount is None else _decimal(amount),
+                    order_type=order_type,
+                )
+
+        return self._call(
+            self._client.move_order,
+            apply,
+            order_number=order_number,
+            rate=rate,
+            amount=amount,
+            order_type=order_type,
+        )
+
+    def transfer_balance(
+        self,
+        *,
+        currency: str,
+        amount: float,
+        from_account: str,
+        to_account: str,
+    ):
+        def apply(result: Dict[str, Any]) -> None:
+            if from_account == 'exchange':
+                self._adjust(currency, available=-_decimal(amount))
+            if to_account == 'exchange':
+                self._adjust(currency, available=_decimal(amount))
+
+        return self._call(
+            self._client.transfer_balance,
+            apply,
+            currency=currency,
+            amount=amount,
+            from_account=from_account,
+            to_account=to_account,
+        )
+
+    def return_order_trades(self, *, order_number: int):
+        """The order's trades, as the client returns them. Those made since
+        the mirror last heard of the order are applied to it.
+        """
+        def apply(trades: List[Dict[str, Any]]) -> None:
+            order = self._orders.get(str(order_number))
+            if order is None or not trades:
+                return
+            filled = sum(_decimal(trade['amount']) for trade in trades)
+            new = filled - (order.starting_amount - order.amount)
+            if new <= DUST:
+                return
+            if new > order.amount + DUST:
+                self.stale = True
+                new = order.amount
+            fee = _decimal(trades[-1].get('fee', 0))
+            # Fills are paid for out of what the order has on hold
+            base, quote = order.currency_pair.split('_')
+            if order.side == 'buy':
+                self._adjust(base, on_orders=-new * order.rate)
+                self._adjust(quote, available=new * (1 - fee))
+            else:
+                self._adjust(quote, on_orders=-new)
+                self._adjust(base, available=new * order.rate * (1 - fee))
+            if order.amount - new <= DUST:
+                del self._orders[order.order_number]
+            else:
+                self._orders[order.order_number] = order._replace(amount=order.amount - new)
+
+        return self._call(self._client.return_order_trades, apply, order_number=order_number)
+
+    # Bookkeeping
+
+    def _adjust(self, currency: str, *, available: Decimal = Decimal(0), on_orders: Decimal = Decimal(0)) -> None:
+        balance = self._balances.setdefault(
+            currency,
+            {'available': Decimal(0), 'onOrders': Decimal(0), 'btcValue': Decimal(0)},
+        )
+        balance['available'] += available
+        balance['onOrders'] += on_orders
+        if balance['available'] < -DUST or balance['onOrders'] < -DUST:
+            self.stale = True
+
+    def _reserve(self, order: MirroredOrder, amount: Decimal) -> None:
+        """Move `amount` of the order (negative to release it) from
+        available to on orders.
+        """
+        base, quote = order.currency_pair.split('_')
+        if order.side == 'buy':
+            self._adjust(base, available=-amount * order.rate, on_orders=amount * order.rate)
+        else:
+            self._adjust(quote, available=-amount, on_orders=amount)
+
+    def _forget(self, order_number: int) -> Optional[MirroredOrder]:
+        order = self._orders.pop(str(order_number), None)
+        if order is None:
+            self.stale = True
+        else:
+            self._reserve(order, -order.amount)
+        return order
+
+    def _place(
+        self,
+        side: str,
+        result: Dict[str, Any],
+        *,
+        currency_pair: str,
+        rate: float,
+        amount: Any,
+        order_type: Optional[OrderType] = None,
+    ) -> None:
+        base, quote = currency_pair.split('_')
+        fee = _decimal(result.get('fee', 0))
+        filled = total = Decimal(0)
+        for trade in _trades(result, currency_pair):
+            filled += _decimal(trade['amount'])
+            total += _decimal(trade['total'])
+        if side == 'buy':
+            self._adjust(base, available=-total)
+            self._adjust(quote, available=filled * (1 - fee))
+        else:
+            self._adjust(quote, available=-filled)
+            self._adjust(base, available=total * (1 - fee))
+
+        self._pairs.add(currency_pair)
+        remaining = _decimal(amount) - filled
+        if remaining > DUST and order_type not in IMMEDIATE:
+            number = str(result['orderNumber'])
+            order = MirroredOrder(number, currency_pair, side, _decimal(rate), remaining, _decimal(amount))
+            self._orders[number] = order
+            self._reserve(order, remaining)
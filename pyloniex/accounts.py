@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Running private commands across many accounts at once.
+
+An AccountPool holds a PoloniexPrivateAPI per account. The clients share one
+transport adapter, and with it their connection pools, but each has its own
+rate limiter and nonce stream, so that accounts don't wait on each other.
+`sweep` runs a command for every account concurrently and yields the
+results as they come in, so a sweep takes about as long as the slowest
+account rather than the sum of all of them:
+
+    with AccountPool({'main': (key, secret), 'bot': (key2, secret2)}) as pool:
+        for result in pool.sweep(lambda client: client.return_complete_balances()):
+            if result.error is None:
+                print(result.account, result.value)
+"""
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from time import monotonic
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from typing import TypeVar
+
+from pyloniex.api import REQUESTS_PER_SECOND
+from pyloniex.api.private import NonceOrderAdapter
+from pyloniex.api.private import PoloniexPrivateAPI
+from pyloniex.nonce import BaseNonceAllocator
+from pyloniex.nonce import NonceAllocator
+from pyloniex.utils import BaseRateLimiter
+from pyloniex.utils import RateLimiter
+
+
+T = TypeVar('T')
+
+
+class SweepResult(NamedTuple):
+    account: str
+    value: Any
+    error: Optional[BaseException]
+    elapsed: float
+
+
+class AccountPool:
+    """Private clients for `accounts`, a mapping of account names to (key,
+    secret) pairs. Every other keyword argument is passed on to each
+    PoloniexPrivateAPI.
+
+    `rate_limiter` and `nonce_allocator` make the rate limiter and the nonce
+    allocator for a key. By default, each key gets a RateLimiter at
+    `requests_per_second` and a NonceAllocator of its own, shared by the
+    accounts that use it. Use e.g. FileNonceAllocator if clients outside the
+    pool, or other processes, use the keys too.
+
+    Sweeps run on up to `workers` threads, one per account by default.
+    """
+
+    def __init__(
+        self,
+        accounts: Dict[str, Tuple[str, str]],
+        *,
+        workers: Optional[int] = None,
+        requests_per_second: int = REQUESTS_PER_SECOND,
+        rate_limiter: Optional[Callable[[str], BaseRateLimiter]] = None,
+        nonce_allocator: Optional[Callable[[str], BaseNonceAllocator]] = None,
+        client_class: type = PoloniexPrivateAPI,
+        **kwargs,
+    ) -> None:
+        if not accounts:
+            raise ValueError('AccountPool needs at least one account')
+        self._workers = workers or len(accounts)
+        # Enough connections for every worker to have one of its own
+        self._adapter = NonceOrderAdapter(pool_maxsize=self._workers)
+        if rate_limiter is None:
+            def rate_limiter(key: str) -> BaseRateLimiter:
+                return RateLimiter(requests_per_second, 1, 1)
+        if nonce_allocator is None:
+            def nonce_allocator(key: str) -> BaseNonceAllocator:
+                return NonceAllocator()
+
+        per_key: Dict[str, Tuple[BaseRateLimiter, BaseNonceAllocator]] = {}
+        self._clients: Dict[str, PoloniexPrivateAPI] = {}
+        for account, (key, secret) in accounts.items():
+            if key not in per_key:
+                per_key[key] = rate_limiter(key), nonce_allocator(key)
+            limiter, allocator = per_key[key]
+            self._clients[account] = client_class(
+                key=key,
+                secret=secret,
+                requests_per_second=requests_per_second,
+                rate_limiter=limiter,
+                nonce_allocator=allocator,
+                adapter=self._adapter,
+                **kwargs,
+            )
+        self._executor = ThreadPoolExecutor(self._workers, thread_name_prefix='AccountPool')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __getitem__(self, account: str) -> PoloniexPrivateAPI:
+        return self._clients[account]
+
+    @property
+    def accounts(self) -> List[str]:
+        return list(self._clients)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        for client in self._clients.values():
+            client._session.close()
+        self._adapter.close()
+
+    def sweep(
+        self,
+        call: Callable[[PoloniexPrivateAPI], T],
+        *,
+        accounts: Optional[Iterable[str]] = None,
+    ) -> Iterator[SweepResult]:
+        """Call `call` with the client of every account (or of `accounts`)
+        concurrently, yielding a SweepResult for each as soon as it's done.
+        An account whose call raises yields its exception as `error`; the
+        rest of the sweep carries on.
+        """
+        def run(account: str) -> SweepResult:
+            start = monotonic()
+            try:
+                value = call(self._clients[account])
+            except Exception as e:
+                return SweepResult(account, None, e, monotonic() - start)
+            return SweepResult(account, value, None, monotonic() - start)
+
+        names = self.accounts if accounts is None else list(accounts)
+        futures = [self._executor.submit(run, account) for account in names]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Abandoning the sweep drops the calls that haven't started
+            for future in futures:
+                future.cancel()
+
+    def gather(
+        self,
+        call: Callable[[PoloniexPrivateAPI], T],
+        *,
+        accounts: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        """Like `sweep`, but waits for every account and returns a dict of
+        their values, raising the first error (if any) once all are done.
+        """
+        values: Dict[str, Any] = {}
+        errors: List[BaseException] = []
+        for result in self.sweep(call, accounts=accounts):
+            if result.error is not None:
+                errors.append(result.error)
+            values[result.account] = result.value
+        if errors:
+            raise errors[0]
+        return values
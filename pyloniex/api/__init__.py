@@ -1,36 +1,147 @@
 # -*- coding: utf-8 -*-
+import json
 from abc import ABCMeta
 from abc import abstractmethod
-from time import sleep
+from functools import wraps
 from logging import getLogger
+from time import monotonic
 from typing import Any
+from typing import Callable
 from typing import Dict
+from typing import Iterator
 from typing import List
 from typing import Optional
 from typing import Union
 
-import tenacity
+from requests import PreparedRequest
 from requests import Request
+from requests import Response
 from requests import Session
 
+from pyloniex.decoding import PRICE_SCALE
+from pyloniex.decoding import backend
+from pyloniex.decoding import number_view
 from pyloniex.errors import PoloniexRequestError
 from pyloniex.errors import PoloniexServerError
+from pyloniex.metrics import NOOP
+from pyloniex.metrics import Instrumentation
+from pyloniex.metrics import RequestRecord
+from pyloniex.metrics import command_of
+from pyloniex.metrics import current_record
+from pyloniex.metrics import recording
+from pyloniex.metrics import waiting
+from pyloniex.replay import Transport
+from pyloniex.scheduler import RequestScheduler
+from pyloniex.streaming import UnexpectedJSON
+from pyloniex.streaming import iter_json
+from pyloniex.utils import BaseRateLimiter
 from pyloniex.utils import RateLimiter
 
 
 REQUESTS_PER_SECOND = 6
 
+STREAM_CHUNK_SIZE = 64 * 1024
+
 logger = getLogger(__name__)
 
 
+def _is_nonce_error(exc):
+    """Pipelined requests are sent in nonce order, but ones travelling over
+    different connections can still be read by the server out of order.
+    """
+    if isinstance(exc, PoloniexRequestError) and exc.message is not None:
+        return exc.message.lower().startswith('nonce must be greater')
+    return False
+
+
 def _retry_poloniex_error(exc):
     if isinstance(exc, PoloniexRequestError) and exc.status_code == 429:
         return True
     elif isinstance(exc, PoloniexServerError):
         return True
+    elif _is_nonce_error(exc):
+        return True
     return False
 
 
+def _wait(retry_state, backoff):
+    client = retry_state.args[0] if retry_state.args else None
+    if getattr(client, 'replaying', False):
+        return 0
+    # A nonce error isn't a sign of overload; every attempt gets a fresh
+    # nonce, so try again right away
+    if _is_nonce_error(retry_state.outcome.exception()):
+        return 0
+    return backoff(retry_state)
+
+
+def _before_sleep(retry_state):
+    client = retry_state.args[0] if retry_state.args else None
+    instrumentation = getattr(client, '_instrumentation', None)
+    if instrumentation is not None:
+        instrumentation.retried(
+            type(client).__name__,
+            command_of(retry_state.kwargs),
+            retry_state.outcome.exception(),
+        )
+
+
+def _policy(func: Callable) -> Callable:
+    import tenacity
+
+    backoff = tenacity.wait_exponential() + tenacity.wait_random(0, 1)
+    return tenacity.retry(
+        retry=tenacity.retry_if_exception(_retry_poloniex_error),
+        wait=lambda retry_state: _wait(retry_state, backoff),
+        before_sleep=_before_sleep,
+        stop=tenacity.stop_after_attempt(4) | tenacity.stop_after_delay(8),
+        reraise=True,
+    )(func)
+
+
+def retry_policy(func: Callable) -> Callable:
+    """Retries `func` (a function or coroutine function) on rate limiting,
+    server errors and nonce errors. tenacity is only imported, and the policy
+    only applied, when `func` is first called.
+    """
+    retrying = None
+
+    @wraps(func)
+    def call(*args, **kwargs):
+        nonlocal retrying
+        if retrying is None:
+            retrying = _policy(func)
+        return retrying(*args, **kwargs)
+
+    return call
+
+
+def handle_response(
+    response: Response,
+    decoder: Optional[Callable[[bytes], Any]] = None,
+) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+    status = response.status_code
+    if status >= 200 and status < 300:
+        data = None
+        try:
+            if decoder is None:
+                data = response.json()
+            else:
+                data = decoder(response.content)
+        except ValueError:
+            logger.exception('Error decoding response JSON')
+        return data
+    elif status >= 400 and status < 500:
+        raise PoloniexRequestError(response)
+    elif status >= 500:
+        raise PoloniexServerError(response)
+    else:
+        # We shouldn't ever get 1xx responses (Poloniex doesn't send them)
+        # or 3xx responses (requests follows redirects); return None to
+        # make mypy happy
+        return None
+
+
 class PoloniexBaseAPI(metaclass=ABCMeta):
 
     @abstractmethod
@@ -38,45 +149,165 @@ class PoloniexBaseAPI(metaclass=ABCMeta):
         self,
         *,
         requests_per_second: int = REQUESTS_PER_SECOND,
+        rate_limiter: Optional[BaseRateLimiter] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        instrumentation: Instrumentation = NOOP,
+        transport: Optional[Transport] = None,
+        loads: Optional[Callable[[bytes], Any]] = None,
+        numbers: Optional[str] = None,
+        price_scale: int = PRICE_SCALE,
     ) -> None:
-        self._rate_limiter = RateLimiter(requests_per_second, 1, 1)
+        if rate_limiter is None:
+            rate_limiter = RateLimiter(requests_per_second, 1, 1)
+        self._rate_limiter = rate_limiter
         self._requests_per_second = requests_per_second
+        # With a scheduler, requests take turns in priority order (and under
+        # the scheduler's rate limit) instead
+        self._scheduler = scheduler
+        self._instrumentation = instrumentation
+        if transport is None:
+            transport = Transport()
+        self._transport = transport
+        # See pyloniex.decoding
+        self._loads = backend() if loads is None else loads
+        self._numbers = number_view(numbers, price_scale)
         self._session = Session()
 
-    @tenacity.retry(
-        retry=tenacity.retry_if_exception(_retry_poloniex_error),
-        wait=tenacity.wait_exponential() + tenacity.wait_random(0, 1),
-        stop=tenacity.stop_after_attempt(4) | tenacity.stop_after_delay(8),
-        reraise=True,
-    )
+    @property
+    def replaying(self) -> bool:
+        """Whether responses are replayed (see pyloniex.replay) rather than
+        fetched from the exchange.
+        """
+        return self._transport.replaying
+
+    def _take_turn(self, kwargs: Dict[str, Any]) -> None:
+        if self._transport.replaying:
+            return
+        if self._scheduler is None:
+            self._rate_limiter.acquire(type(self).__name__)
+        else:
+            self._scheduler.acquire(command_of(kwargs))
+
+    def _try_take_turn(self, kwargs: Dict[str, Any]) -> bool:
+        """Like _take_turn, but only if that doesn't involve waiting."""
+        if self._transport.replaying:
+            return True
+        if self._scheduler is None:
+            return self._rate_limiter.acquire(type(self).__name__, timeout=0)
+        return self._scheduler.try_acquire(command_of(kwargs))
+
+    def _feedback(self, status_code: int, latency: float) -> None:
+        limiter = self._rate_limiter if self._scheduler is None else self._scheduler.limiter
+        limiter.feedback(status_code, latency)
+
+    @retry_policy
     def request(
         self,
         *args,
+        decoder: Optional[Callable[[bytes], Any]] = None,
         **kwargs,
     ) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
-        cls_name = type(self).__name__
-        while self._rate_limiter.check(cls_name) is False:
-            sleep(1 / self._requests_per_second)
+        instrumentation = self._instrumentation
+        with recording(instrumentation, type(self).__name__, command_of(kwargs)) as record:
+            with waiting(instrumentation, record):
+                self._take_turn(kwargs)
+            return self._exchange(*args, decoder=decoder, **kwargs)
 
-        request = Request(*args, **kwargs)
-        prepared = self._session.prepare_request(request)
-
-        response = self._session.send(prepared)
+    def _exchange(
+        self,
+        *args,
+        decoder: Optional[Callable[[bytes], Any]] = None,
+        **kwargs,
+    ) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        """A single round trip, without rate limiting or retries."""
+        with recording(self._instrumentation, type(self).__name__, command_of(kwargs)) as record:
+            request = Request(*args, **kwargs)
+            response = self._timed_send(record, request)
 
-        status = response.status_code
-        if status >= 200 and status < 300:
-            data = None
-            try:
-                data = response.json()
-            except ValueError:
-                logger.exception('Error decoding response JSON')
+            start = monotonic()
+            data = self._decode(response, decoder)
+            record.add('decode', monotonic() - start)
             return data
-        elif status >= 400 and status < 500:
-            raise PoloniexRequestError(response)
-        elif status >= 500:
-            raise PoloniexServerError(response)
+
+    def _decode(
+        self,
+        response: Response,
+        decoder: Optional[Callable[[bytes], Any]] = None,
+    ) -> Any:
+        """Decode a response with `decoder` if given, or else with the
+        client's JSON backend and number mode.
+        """
+        if decoder is not None:
+            return handle_response(response, decoder)
+        return self._numbers(handle_response(response, self._loads))
+
+    @retry_policy
+    def _open_stream(self, *args, **kwargs) -> Response:
+        instrumentation = self._instrumentation
+        with recording(instrumentation, type(self).__name__, command_of(kwargs)) as record:
+            with waiting(instrumentation, record):
+                self._take_turn(kwargs)
+
+            request = Request(*args, **kwargs)
+            response = self._timed_send(record, request, stream=True)
+
+            if response.status_code >= 400:
+                # Reads the (small) error body and raises
+                handle_response(response)
+            return response
+
+    def _timed_send(self, record: RequestRecord, request: Request, stream: bool = False) -> Response:
+        start = monotonic()
+        before = record.phases.get('wait', 0.0) + record.phases.get('prepare', 0.0)
+        response = self._send(request, stream=stream)
+        # _send has timed any waiting and preparing it did itself
+        after = record.phases.get('wait', 0.0) + record.phases.get('prepare', 0.0)
+        network = monotonic() - start - (after - before)
+        record.add('network', network)
+        record.status = response.status_code
+        if not stream:
+            record.bytes_in = len(response.content)
+        self._feedback(response.status_code, network)
+        return response
+
+    def stream_request(
+        self,
+        *args,
+        container: str = '[',
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        **kwargs,
+    ) -> Iterator[Any]:
+        """Like `request`, but decodes the response body as it arrives,
+        yielding the members of its top-level `container` (values for '[',
+        (key, value) pairs for '{') one by one. See pyloniex.streaming.
+
+        Retries only happen before the response starts streaming.
+        """
+        response = self._open_stream(*args, **kwargs)
+        view = self._numbers
+        if container == '{':
+            def present(item):
+                return item[0], view(item[1])
         else:
-            # We shouldn't ever get 1xx responses (Poloniex doesn't send them)
-            # or 3xx responses (requests follows redirects); return None to
-            # make mypy happy
-            return None
+            present = view
+        try:
+            for item in iter_json(response.iter_content(chunk_size), container):
+                yield present(item)
+        except UnexpectedJSON as e:
+            # Probably {"error": ...}; keep it around for PoloniexAPIError
+            response._content = json.dumps(e.document).encode('utf-8')
+            raise PoloniexRequestError(response)
+        finally:
+            response.close()
+
+    def _prepare(self, request: Request) -> PreparedRequest:
+        start = monotonic()
+        prepared = self._session.prepare_request(request)
+        record = current_record()
+        if record is not None:
+            record.add('prepare', monotonic() - start)
+            record.bytes_out = len(prepared.body or b'')  # type: ignore
+        return prepared
+
+    def _send(self, request: Request, stream: bool = False) -> Response:
+        return self._transport.send(self._session, self._prepare(request), stream=stream)
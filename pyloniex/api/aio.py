@@ -0,0 +1,337 @@
+# -*- coding: utf-8 -*-
+"""asyncio flavors of the Poloniex clients.
+
+These reuse the command methods of PoloniexPublicAPI and PoloniexPrivateAPI
+verbatim; the only thing that changes is `request`, which becomes a coroutine.
+Every command therefore returns an awaitable:
+
+    async with AsyncPoloniexPublicAPI() as public:
+        books = await asyncio.gather(*(
+            public.return_order_book(currency_pair=pair)
+            for pair in pairs
+        ))
+
+Requires aiohttp (`pip install pyloniex[async]`).
+"""
+import json
+from time import monotonic
+from types import SimpleNamespace
+from typing import Any
+from typing import AsyncIterator
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Union
+from urllib.parse import urlencode
+
+import aiohttp
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from pyloniex.api import STREAM_CHUNK_SIZE
+from pyloniex.api import handle_response
+from pyloniex.api import retry_policy
+from pyloniex.api.private import PoloniexAuth
+from pyloniex.api.private import PoloniexPrivateAPI
+from pyloniex.api.public import PoloniexPublicAPI
+from pyloniex.batch import BatchResult
+from pyloniex.batch import run_batch_async
+from pyloniex.cache import cache_key
+from pyloniex.decoding import unwrap
+from pyloniex.encoding import EncodedParams
+from pyloniex.errors import PoloniexRequestError
+from pyloniex.metrics import command_of
+from pyloniex.metrics import current_record
+from pyloniex.metrics import recording
+from pyloniex.metrics import waiting
+from pyloniex.streaming import JSONStreamParser
+from pyloniex.streaming import UnexpectedJSON
+from pyloniex.utils import AsyncRateLimiter
+from pyloniex.utils import AsyncSingleFlight
+from pyloniex.utils import protect_floats
+
+
+CONNECTION_LIMIT = 100
+KEEPALIVE_TIMEOUT = 30
+
+
+async def _on_request_chunk_sent(
+    session: aiohttp.ClientSession,
+    context: SimpleNamespace,
+    params: aiohttp.TraceRequestChunkSentParams,
+) -> None:
+    # Private requests pass the dispatcher's release callback along as the
+    # trace context, so that (if pipelined) the next nonce can go out as soon as this
+    # request's body is on the wire
+    on_sent = context.trace_request_ctx
+    if callable(on_sent):
+        on_sent()
+
+
+def _build_response(
+    status: int,
+    headers: Dict[str, str],
+    content: bytes,
+    url: str,
+) -> Response:
+    """Wrap a finished aiohttp exchange in a requests.Response so that response
+    handling and PoloniexAPIError work the same for both clients.
+    """
+    response = Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = content  # type: ignore
+    response.url = url
+    return response
+
+
+class AsyncPoloniexBaseAPI:
+    """Mixin that swaps the blocking `request` of a PoloniexBaseAPI subclass
+    for a coroutine running on a pooled, keep-alive aiohttp session.
+    """
+
+    _auth: Optional[PoloniexAuth] = None
+
+    def __init__(
+        self,
+        *,
+        connection_limit: int = CONNECTION_LIMIT,
+        **kwargs,
+    ) -> None:
+        if kwargs.get('scheduler') is not None:
+            raise ValueError('RequestScheduler only supports the blocking clients')
+        if kwargs.get('transport') is not None:
+            raise ValueError('Recording and replaying only support the blocking clients')
+        super().__init__(**kwargs)  # type: ignore
+        self._connection_limit = connection_limit
+        self._client: Optional[aiohttp.ClientSession] = None
+        self._async_rate_limiter = AsyncRateLimiter(self._rate_limiter)  # type: ignore
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def _get_client(self) -> aiohttp.ClientSession:
+        # aiohttp sessions must be created from inside a running event loop
+        if self._client is None or self._client.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._connection_limit,
+                keepalive_timeout=KEEPALIVE_TIMEOUT,
+            )
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_request_chunk_sent.append(_on_request_chunk_sent)
+            self._client = aiohttp.ClientSession(
+                connector=connector,
+                trace_configs=[trace_config],
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    @retry_policy
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        data: Optional[Union[Dict[str, Any], EncodedParams]] = None,
+        decoder: Optional[Callable[[bytes], Any]] = None,
+    ) -> Optional[Union[Dict[str, Any], List[Dict[str, Any]]]]:
+        instrumentation = self._instrumentation  # type: ignore
+        command = command_of({'params': params, 'data': data})
+        with recording(instrumentation, type(self).__name__, command) as record:
+            with waiting(instrumentation, record):
+                await self._async_rate_limiter.acquire(type(self).__name__)
+
+            if data is None:
+                response = await self._send_async(method, url, params=params)
+            elif self._auth is None:
+                response = await self._send_async(
+                    method,
+                    url,
+                    params=params,
+                    body=data if isinstance(data, bytes) else urlencode(data).encode('utf-8'),
+                )
+            else:
+                auth = self._auth
+                queued = monotonic()
+
+                async def send(nonce: int, on_sent: Callable[[], None]) -> Response:
+                    start = monotonic()
+                    record.add('wait', start - queued)
+                    body = data.with_nonce(nonce)  # type: ignore
+                    sign = auth.sign(body).decode('ascii')
+                    record.add('prepare', monotonic() - start)
+                    return await self._send_async(
+                        method,
+                        url,
+                        params=params,
+                        body=body,
+                        headers={'Key': auth.key, 'Sign': sign},
+                        on_sent=on_sent,
+                    )
+
+                response = await self._dispatcher.dispatch_async(send)  # type: ignore
+
+            start = monotonic()
+            result = self._decode(response, decoder)  # type: ignore
+            record.add('decode', monotonic() - start)
+            return result
+
+    async def _send_async(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        on_sent: Optional[Callable[[], None]] = None,
+    ) -> Response:
+        headers = dict(headers or {})
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        client = self._get_client()
+        start = monotonic()
+        async with client.request(
+            method,
+            url,
+            params=params,
+            data=body,
+            headers=headers,
+            trace_request_ctx=on_sent,
+        ) as r:
+            content = await r.read()
+            network = monotonic() - start
+            record = current_record()
+            if record is not None:
+                record.add('network', network)
+                record.status = r.status
+                record.bytes_out = len(body or b'')
+                record.bytes_in = len(content)
+            self._feedback(r.status, network)  # type: ignore
+            return _build_response(r.status, dict(r.headers), content, str(r.url))
+
+    @retry_policy
+    async def _open_stream(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> aiohttp.ClientResponse:
+        instrumentation = self._instrumentation  # type: ignore
+        command = command_of({'params': params})
+        with recording(instrumentation, type(self).__name__, command) as record:
+            with waiting(instrumentation, record):
+                await self._async_rate_limiter.acquire(type(self).__name__)
+
+            start = monotonic()
+            r = await self._get_client().request(method, url, params=params)
+            record.add('network', monotonic() - start)
+            record.status = r.status
+        self._feedback(r.status, record.phases['network'])  # type: ignore
+        if r.status >= 400:
+            # Reads the (small) error body and raises
+            try:
+                content = await r.read()
+            finally:
+                r.release()
+            handle_response(_build_response(r.status, dict(r.headers), content, str(r.url)))
+        return r
+
+    async def stream_request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: Optional[Dict[str, Any]] = None,
+        container: str = '[',
+        chunk_size: int = STREAM_CHUNK_SIZE,
+    ) -> AsyncIterator[Any]:
+        r = await self._open_stream(method, url, params=params)
+        parser = JSONStreamParser(container)
+        view = self._numbers  # type: ignore
+        if container == '{':
+            def present(item):
+                return item[0], view(item[1])
+        else:
+            present = view
+        try:
+            async for chunk in r.content.iter_chunked(chunk_size):
+                for item in parser.feed(chunk):
+                    yield present(item)
+            for item in parser.close():
+                yield present(item)
+        except UnexpectedJSON as e:
+            # Probably {"error": ...}; keep it around for PoloniexAPIError
+            content = json.dumps(e.document).encode('utf-8')
+            raise PoloniexRequestError(
+                _build_response(r.status, dict(r.headers), content, str(r.url)),
+            )
+        finally:
+            r.release()
+
+
+class AsyncPoloniexPublicAPI(AsyncPoloniexBaseAPI, PoloniexPublicAPI):  # type: ignore
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        if self._flights is not None:
+            self._flights = AsyncSingleFlight()  # type: ignore
+
+    async def public_request(
+        self,
+        params: Dict[str, Any],
+        decoder: Optional[Callable[[bytes], Any]] = None,
+    ):
+        params = protect_floats(params)
+        if decoder is not None:
+            return await self.request('GET', type(self).host, params=params, decoder=decoder)
+        if self._cache is not None:
+            hit, data = self._cache.lookup(params)
+            if hit:
+                return self._numbers(data)
+        if self._flights is not None:
+            return await self._flights.do(cache_key(params), lambda: self._fetch(params))
+        return await self._fetch(params)
+
+    async def _fetch(self, params: Dict[str, Any]):  # type: ignore
+        host = type(self).host
+        if self._hedging is not None and self._hedging.hedges(params):
+            async def hedge():
+                with recording(self._instrumentation, type(self).__name__, params['command']):
+                    return self._decode(await self._send_async('GET', host, params=params))
+
+            data = await self._hedging.call_async(
+                params['command'],
+                lambda: self.request('GET', host, params=params),
+                hedge,
+                lambda: self._try_take_turn({'params': params}),
+            )
+        else:
+            data = await self.request('GET', host, params=params)
+        if self._cache is not None:
+            self._cache.store(params, unwrap(data))
+        return data
+
+
+class AsyncPoloniexPrivateAPI(AsyncPoloniexBaseAPI, PoloniexPrivateAPI):  # type: ignore
+
+    async def _batch(  # type: ignore
+        self,
+        calls: Sequence[Callable[[], Awaitable[Any]]],
+        concurrency: int,
+        fail_fast: bool,
+    ) -> BatchResult:
+        return await run_batch_async(calls, concurrency=concurrency, fail_fast=fail_fast)
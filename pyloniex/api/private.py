@@ -1,19 +1,45 @@
 # -*- coding: utf-8 -*-
-import time
-from binascii import hexlify
+from functools import partial
+from threading import Lock
+from time import monotonic
 from typing import Any
+from typing import Callable
 from typing import Dict
+from typing import Iterable
+from typing import List
 from typing import Optional
+from typing import Sequence
 
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives.hashes import SHA512
-from cryptography.hazmat.primitives.hmac import HMAC
+from requests import Request
+from requests import Response
+from requests.adapters import HTTPAdapter
 from requests.auth import AuthBase
+from urllib3.connection import HTTPConnection
+from urllib3.connection import HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.connectionpool import HTTPSConnectionPool
 
 from pyloniex.api import PoloniexBaseAPI
 from pyloniex.api import REQUESTS_PER_SECOND
+from pyloniex.batch import BATCH_CONCURRENCY
+from pyloniex.batch import SIDES
+from pyloniex.batch import BatchResult
+from pyloniex.batch import Move
+from pyloniex.batch import Order
+from pyloniex.batch import run_batch
 from pyloniex.constants import OrderType
-from pyloniex.utils import protect_floats
+from pyloniex.decoding import PRICE_SCALE
+from pyloniex.encoding import encode_params
+from pyloniex.metrics import NOOP
+from pyloniex.metrics import Instrumentation
+from pyloniex.metrics import current_record
+from pyloniex.nonce import BaseNonceAllocator
+from pyloniex.nonce import NonceAllocator
+from pyloniex.nonce import NonceDispatcher
+from pyloniex.nonce import notify_sent
+from pyloniex.replay import Transport
+from pyloniex.scheduler import RequestScheduler
+from pyloniex.utils import BaseRateLimiter
 
 
 class PoloniexAuth(AuthBase):
@@ -21,17 +47,84 @@ class PoloniexAuth(AuthBase):
     def __init__(self, key: str, secret: str) -> None:
         self.key = key
         self.secret = secret
+        # Keyed on first use (so that hmac is only imported by clients that
+        # sign something), then copied for each request
+        self._hmac: Any = None
 
     def __call__(self, request):
-        hmac = HMAC(self.secret.encode('utf-8'), SHA512(), default_backend())
-        hmac.update(request.body.encode('utf-8'))
-        signature = hexlify(hmac.finalize())
+        body = request.body
+        if isinstance(body, str):
+            body = body.encode('utf-8')
 
         request.headers['Key'] = self.key
-        request.headers['Sign'] = signature
+        request.headers['Sign'] = self.sign(body)
 
         return request
 
+    def sign(self, body: bytes) -> bytes:
+        keyed = self._hmac
+        if keyed is None:
+            import hmac
+            # Keying the HMAC is the expensive part, so do it once. Naming
+            # the digest lets hmac use OpenSSL's implementation.
+            keyed = self._hmac = hmac.new(self.secret.encode('utf-8'), digestmod='sha512')
+        signer = keyed.copy()
+        signer.update(body)
+        return signer.hexdigest().encode('ascii')
+
+
+class _NotifyingHTTPConnection(HTTPConnection):
+
+    def request(self, *args, **kwargs):
+        super().request(*args, **kwargs)
+        notify_sent()
+
+
+class _NotifyingHTTPSConnection(HTTPSConnection):
+
+    def request(self, *args, **kwargs):
+        super().request(*args, **kwargs)
+        notify_sent()
+
+
+class _NotifyingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _NotifyingHTTPConnection
+
+
+class _NotifyingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _NotifyingHTTPSConnection
+
+
+class NonceOrderAdapter(HTTPAdapter):
+    """Transport adapter that tells a pipelined NonceDispatcher as soon as a request
+    has been written to its connection, before the response comes back.
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _NotifyingHTTPConnectionPool,
+            'https': _NotifyingHTTPSConnectionPool,
+        }
+
+
+# Unless told otherwise, clients share one allocator per key, so that two
+# clients for the same key can't produce the same nonce but clients for
+# different keys never wait on each other
+_nonce_allocators: Dict[str, NonceAllocator] = {}
+_nonce_allocators_lock = Lock()
+# For nonce(), which doesn't know the key
+_process_nonce_allocator = NonceAllocator()
+
+
+def _nonce_allocator(key: str) -> NonceAllocator:
+    """The process-wide allocator for `key`."""
+    with _nonce_allocators_lock:
+        allocator = _nonce_allocators.get(key)
+        if allocator is None:
+            allocator = _nonce_allocators[key] = NonceAllocator()
+        return allocator
+
 
 class PoloniexPrivateAPI(PoloniexBaseAPI):
 
@@ -43,22 +136,76 @@ class PoloniexPrivateAPI(PoloniexBaseAPI):
         key: str,
         secret: str,
         requests_per_second: int = REQUESTS_PER_SECOND,
+        rate_limiter: Optional[BaseRateLimiter] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        instrumentation: Instrumentation = NOOP,
+        nonce_allocator: Optional[BaseNonceAllocator] = None,
+        transport: Optional[Transport] = None,
+        loads: Optional[Callable[[bytes], Any]] = None,
+        numbers: Optional[str] = None,
+        price_scale: int = PRICE_SCALE,
+        adapter: Optional[NonceOrderAdapter] = None,
+        pipelined: bool = False,
     ) -> None:
-        super().__init__(requests_per_second=REQUESTS_PER_SECOND)
-        self._session.auth = PoloniexAuth(key, secret)  # type: ignore
+        super().__init__(
+            requests_per_second=requests_per_second,
+            rate_limiter=rate_limiter,
+            scheduler=scheduler,
+            instrumentation=instrumentation,
+            transport=transport,
+            loads=loads,
+            numbers=numbers,
+            price_scale=price_scale,
+        )
+        # Requests are signed by _send, which has their body at hand
+        self._auth = PoloniexAuth(key, secret)
+        # Clients can share an adapter, and with it their connection pools
+        if adapter is None:
+            adapter = NonceOrderAdapter()
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        if nonce_allocator is None:
+            nonce_allocator = _nonce_allocator(key)
+        # See pyloniex.nonce for what pipelining trades away
+        self._dispatcher = NonceDispatcher(nonce_allocator, pipelined=pipelined)
 
     @classmethod
     def nonce(cls) -> int:
         """We use the time to generate our nonce values. The actual value must
-        be an int and cannot repeat, so we convert to microseconds.
+        be an int and cannot repeat, so we convert to microseconds, and bump
+        it past the last value handed out by this method if need be. Clients
+        allocate the nonces they send per key, so these aren't ordered with
+        theirs.
         """
-        return int(time.time() * 1000000)
+        return _process_nonce_allocator.next()
 
     def private_request(self, params: Dict[str, Any]):
-        cls = type(self)
-        data = protect_floats(params)
-        data['nonce'] = cls.nonce()
-        return self.request('POST', cls.host, data=data)
+        # The body is encoded up front; _send adds the nonce and signs it
+        # right before the request goes out
+        return self.request('POST', type(self).host, data=encode_params(params))
+
+    def _send(self, request: Request, stream: bool = False) -> Response:
+        start = monotonic()
+        auth = self._auth
+
+        def send(nonce: int) -> Response:
+            signing = monotonic()
+            record = current_record()
+            if record is not None:
+                # Waiting for the previous nonce to go out
+                record.add('wait', signing - start)
+            body = request.data.with_nonce(nonce)  # type: ignore
+            request.data = body
+            request.headers = {
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Key': auth.key,
+                'Sign': auth.sign(body),
+            }
+            if record is not None:
+                record.add('prepare', monotonic() - signing)
+            return self._transport.send(self._session, self._prepare(request), stream=stream)
+
+        return self._dispatcher.dispatch(send)
 
     # Commands
 
@@ -193,6 +340,65 @@ class PoloniexPrivateAPI(PoloniexBaseAPI):
             params[order_type.value] = 1
         return self.private_request(params)
 
+    # Batches; see pyloniex.batch
+
+    def _batch(
+        self,
+        calls: Sequence[Callable[[], Any]],
+        concurrency: int,
+        fail_fast: bool,
+    ) -> BatchResult:
+        return run_batch(calls, concurrency=concurrency, fail_fast=fail_fast)
+
+    def cancel_orders(
+        self,
+        order_numbers: Iterable[int],
+        *,
+        concurrency: int = BATCH_CONCURRENCY,
+        fail_fast: bool = False,
+    ) -> BatchResult:
+        calls = [partial(self.cancel_order, order_number=n) for n in order_numbers]
+        return self._batch(calls, concurrency, fail_fast)
+
+    def place_orders(
+        self,
+        orders: Iterable[Order],
+        *,
+        concurrency: int = BATCH_CONCURRENCY,
+        fail_fast: bool = False,
+    ) -> BatchResult:
+        calls: List[Callable[[], Any]] = []
+        for order in orders:
+            if order.side not in SIDES:
+                raise ValueError(f'Order side must be one of {SIDES}, not {order.side!r}')
+            calls.append(partial(
+                self.buy if order.side == 'buy' else self.sell,
+                currency_pair=order.currency_pair,
+                rate=order.rate,
+                amount=order.amount,
+                order_type=order.order_type,
+            ))
+        return self._batch(calls, concurrency, fail_fast)
+
+    def move_orders(
+        self,
+        moves: Iterable[Move],
+        *,
+        concurrency: int = BATCH_CONCURRENCY,
+        fail_fast: bool = False,
+    ) -> BatchResult:
+        calls = [
+            partial(
+                self.move_order,
+                order_number=move.order_number,
+                rate=move.rate,
+                amount=move.amount,
+                order_type=move.order_type,
+            )
+            for move in moves
+        ]
+        return self._batch(calls, concurrency, fail_fast)
+
     def withdraw(
         self,
         *,
@@ -1,13 +1,44 @@
 # -*- coding: utf-8 -*-
 from typing import Any
+from typing import Callable
 from typing import Dict
 from typing import Optional
 
 from pyloniex.api import PoloniexBaseAPI
 from pyloniex.api import REQUESTS_PER_SECOND
+from pyloniex.cache import ResponseCache
+from pyloniex.cache import cache_key
+from pyloniex.decoding import PRICE_SCALE
+from pyloniex.decoding import unwrap
+from pyloniex.hedging import HedgingPolicy
+from pyloniex.metrics import NOOP
+from pyloniex.metrics import Instrumentation
+from pyloniex.replay import Transport
+from pyloniex.scheduler import RequestScheduler
+from pyloniex.utils import BaseRateLimiter
+from pyloniex.utils import SingleFlight
 from pyloniex.utils import protect_floats
 
 
+FORMATS = ('rows', 'columnar')
+
+
+def _format_decoder(
+    format: str,
+    columns: str,
+    price_scale: Optional[int],
+) -> Optional[Callable[[bytes], Any]]:
+    """The decoder for `format`, given the name of its columns in
+    pyloniex.columnar; None for rows, which are decoded as usual.
+    """
+    if format not in FORMATS:
+        raise ValueError(f'Unsupported format {format!r}; expected one of {FORMATS}')
+    if format == 'rows':
+        return None
+    from pyloniex import columnar
+    return columnar.decoder(getattr(columnar, columns), price_scale)
+
+
 class PoloniexPublicAPI(PoloniexBaseAPI):
 
     host = 'https://poloniex.com/public'
@@ -16,16 +47,83 @@ class PoloniexPublicAPI(PoloniexBaseAPI):
         self,
         *,
         requests_per_second: int = REQUESTS_PER_SECOND,
+        rate_limiter: Optional[BaseRateLimiter] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        instrumentation: Instrumentation = NOOP,
+        cache: Optional[ResponseCache] = None,
+        coalesce: bool = False,
+        hedging: Optional[HedgingPolicy] = None,
+        transport: Optional[Transport] = None,
+        loads: Optional[Callable[[bytes], Any]] = None,
+        numbers: Optional[str] = None,
+        price_scale: int = PRICE_SCALE,
     ) -> None:
-        super().__init__(requests_per_second=requests_per_second)
+        super().__init__(
+            requests_per_second=requests_per_second,
+            rate_limiter=rate_limiter,
+            scheduler=scheduler,
+            instrumentation=instrumentation,
+            transport=transport,
+            loads=loads,
+            numbers=numbers,
+            price_scale=price_scale,
+        )
+        self._cache = cache
+        # Concurrent identical requests share one round trip (and one
+        # response object, which callers mustn't mutate)
+        self._flights = SingleFlight() if coalesce else None
+        self._hedging = hedging
 
-    def public_request(self, params: Dict[str, Any]):
-        return self.request(
+    @property
+    def cache(self) -> Optional[ResponseCache]:
+        return self._cache
+
+    @property
+    def hedging(self) -> Optional[HedgingPolicy]:
+        return self._hedging
+
+    def public_request(
+        self,
+        params: Dict[str, Any],
+        decoder: Optional[Callable[[bytes], Any]] = None,
+    ):
+        """`decoder` replaces JSON decoding of the response body. Responses
+        decoded that way skip the cache and aren't coalesced.
+        """
+        params = protect_floats(params)
+        if decoder is not None:
+            return self.request('GET', type(self).host, params=params, decoder=decoder)
+        if self._cache is not None:
+            hit, data = self._cache.lookup(params)
+            if hit:
+                return self._numbers(data)
+        if self._flights is not None:
+            return self._flights.do(cache_key(params), lambda: self._fetch(params))
+        return self._fetch(params)
+
+    def public_stream(self, params: Dict[str, Any], container: str = '['):
+        return self.stream_request(
             'GET',
             type(self).host,
             params=protect_floats(params),
+            container=container,
         )
 
+    def _fetch(self, params: Dict[str, Any]):
+        host = type(self).host
+        if self._hedging is not None and self._hedging.hedges(params):
+            data = self._hedging.call(
+                params['command'],
+                lambda: self.request('GET', host, params=params),
+                lambda: self._exchange('GET', host, params=params),
+                lambda: self._try_take_turn({'params': params}),
+            )
+        else:
+            data = self.request('GET', host, params=params)
+        if self._cache is not None:
+            self._cache.store(params, unwrap(data))
+        return data
+
     # Commands
 
     def return_ticker(self):
@@ -50,13 +148,31 @@ class PoloniexPublicAPI(PoloniexBaseAPI):
             params['depth'] = depth
         return self.public_request(params)
 
+    def iter_order_books(self, *, depth: Optional[int] = None):
+        """Streaming flavor of return_order_book for all pairs: yields
+        (currency_pair, book) tuples as they are decoded.
+        """
+        params: Dict[str, Any] = {
+            'command': 'returnOrderBook',
+            'currencyPair': 'all',
+        }
+        if depth is not None:
+            params['depth'] = depth
+        return self.public_stream(params, container='{')
+
     def return_trade_history(
         self,
         *,
         currency_pair: str,
         start: Optional[int] = None,
         end: Optional[int] = None,
+        format: str = 'rows',
+        price_scale: Optional[int] = None,
     ):
+        """With format='columnar', returns a dict of NumPy arrays (one per
+        field, with dates as epoch seconds) instead of a list of dicts. See
+        pyloniex.columnar for details.
+        """
         params: Dict[str, Any] = {
             'command': 'returnTradeHistory',
             'currencyPair': currency_pair,
@@ -64,7 +180,27 @@ class PoloniexPublicAPI(PoloniexBaseAPI):
         if start is not None and end is not None:
             params['start'] = start
             params['end'] = end
-        return self.public_request(params)
+        decoder = _format_decoder(format, 'TRADE_HISTORY_COLUMNS', price_scale)
+        return self.public_request(params, decoder)
+
+    def iter_trade_history(
+        self,
+        *,
+        currency_pair: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None,
+    ):
+        """Streaming flavor of return_trade_history: yields trades as they
+        are decoded, without holding the whole response in memory.
+        """
+        params: Dict[str, Any] = {
+            'command': 'returnTradeHistory',
+            'currencyPair': currency_pair,
+        }
+        if start is not None and end is not None:
+            params['start'] = start
+            params['end'] = end
+        return self.public_stream(params)
 
     def return_chart_data(
         self,
@@ -73,7 +209,12 @@ class PoloniexPublicAPI(PoloniexBaseAPI):
         period: int,
         start: int,
         end: int,
+        format: str = 'rows',
+        price_scale: Optional[int] = None,
     ):
+        """With format='columnar', returns a dict of NumPy arrays (one per
+        field) instead of a list of dicts. See pyloniex.columnar for details.
+        """
         params = {
             'command': 'returnChartData',
             'currencyPair': currency_pair,
@@ -81,7 +222,8 @@ class PoloniexPublicAPI(PoloniexBaseAPI):
             'start': start,
             'end': end,
         }
-        return self.public_request(params)
+        decoder = _format_decoder(format, 'CHART_DATA_COLUMNS', price_scale)
+        return self.public_request(params, decoder)
 
     def return_currencies(self):
         params = {
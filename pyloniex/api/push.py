@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""Client for the Poloniex push (WebSocket) API.
+
+One connection carries every channel the process is interested in, and each
+message is decoded once and handed to every subscriber of its channel:
+
+    async with PoloniexPushAPI() as push:
+        ticker = await push.subscribe(TICKER)
+        async for channel, sequence, update in ticker:
+            ...
+
+Channels are TICKER, VOLUME, ACCOUNT (which needs a key and secret) or a
+currency pair, e.g. 'BTC_ETH', for that market's order book and trades. If
+the connection drops or goes quiet, the client reconnects and subscribes to
+every channel that still has subscribers; order book channels start over with
+a fresh snapshot (an 'i' update).
+
+Each subscriber has a queue of at most `maxsize` messages. When one fills up,
+a subscription with overflow='block' holds up the connection (and, through
+TCP flow control, the server) until its reader catches up; one with
+overflow='drop' discards its oldest message instead, and counts it.
+
+Messages are shared between subscribers, so they must not be mutated.
+
+Requires aiohttp 3.14 or later (`pip install pyloniex[async]`).
+"""
+import asyncio
+import json
+import random
+from collections import deque
+from logging import getLogger
+from typing import Any
+from typing import Deque
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Union
+
+import aiohttp
+
+from pyloniex.api.private import PoloniexAuth
+from pyloniex.api.private import _nonce_allocator
+from pyloniex.nonce import BaseNonceAllocator
+from pyloniex.nonce import next_async
+
+
+ACCOUNT = 1000
+TICKER = 1002
+VOLUME = 1003
+HEARTBEAT = 1010
+
+# Poloniex sends a heartbeat every second on an otherwise idle connection
+HEARTBEAT_TIMEOUT = 10
+
+SUBSCRIBER_QUEUE_SIZE = 1000
+
+Channel = Union[int, str]
+
+logger = getLogger(__name__)
+
+
+class Subscription:
+    """The messages of one channel, as seen by one subscriber. Iterate over
+    it to receive them; iteration ends once it (or the client) is closed and
+    the messages already queued have been read.
+    """
+
+    def __init__(
+        self,
+        push: 'PoloniexPushAPI',
+        channel: Channel,
+        *,
+        maxsize: int,
+        overflow: str,
+    ) -> None:
+        if overflow not in ('block', 'drop'):
+            raise ValueError(f'Unsupported overflow policy {overflow!r}')
+        self.channel = channel
+        self.dropped = 0
+        self._push = push
+        self._maxsize = maxsize
+        self._overflow = overflow
+        self._messages: Deque[Any] = deque()
+        self._closed = False
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Any:
+        while not self._messages:
+            if self._closed:
+                raise StopAsyncIteration
+            self._readable.clear()
+            await self._readable.wait()
+        message = self._messages.popleft()
+        self._writable.set()
+        return message
+
+    async def close(self) -> None:
+        await self._push._unsubscribe(self)
+
+    async def _put(self, message: Any) -> None:
+        while len(self._messages) >= self._maxsize and not self._closed:
+            if self._overflow == 'drop':
+                self._messages.popleft()
+                self.dropped += 1
+                break
+            self._writable.clear()
+            await self._writable.wait()
+        if not self._closed:
+            self._messages.append(message)
+            self._readable.set()
+
+    def _end(self) -> None:
+        self._closed = True
+        self._readable.set()
+        self._writable.set()
+
+
+class PoloniexPushAPI:
+
+    url = 'wss://api2.poloniex.com'
+
+    def __init__(
+        self,
+        *,
+        key: Optional[str] = None,
+        secret: Optional[str] = None,
+        nonce_allocator: Optional[BaseNonceAllocator] = None,
+        heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+        reconnect_delay: float = 1,
+        max_reconnect_delay: float = 30,
+    ) -> None:
+        self._auth = None if key is None or secret is None else PoloniexAuth(key, secret)
+        # Push nonces share the sequence of private REST requests made with
+        # the same key
+        if nonce_allocator is None and key is not None:
+            nonce_allocator = _nonce_allocator(key)
+        self._nonce_allocator = nonce_allocator
+        self._heartbeat_timeout = heartbeat_timeout
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._subscribers: Dict[Channel, List[Subscription]] = {}
+        # Order book channels are subscribed to by currency pair, but their
+        # messages only carry a numeric ID
+        self._names: Dict[int, str] = {}
+        self._client: Optional[aiohttp.ClientSession] = None
+        self._ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self._task: Optional[asyncio.Task] = None
+        self.connections = 0
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self) -> None:
+        try:
+            if self._task is not None:
+                task, self._task = self._task, None
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        finally:
+            if self._client is not None:
+                await self._client.close()
+                self._client = None
+            for subscribers in self._subscribers.values():
+                for subscription in subscribers:
+                    subscription._end()
+            self._subscribers.clear()
+
+    async def subscribe(
+        self,
+        channel: Channel,
+        *,
+        maxsize: int = SUBSCRIBER_QUEUE_SIZE,
+        overflow: str = 'block',
+    ) -> Subscription:
+        if channel == ACCOUNT and self._auth is None:
+            raise ValueError('Account notifications require a key and secret')
+        subscription = Subscription(self, channel, maxsize=maxsize, overflow=overflow)
+        subscribers = self._subscribers.setdefault(channel, [])
+        subscribers.append(subscription)
+        self.start()
+        if len(subscribers) == 1 and self._ws is not None:
+            await self._command('subscribe', channel)
+        return subscription
+
+    async def _unsubscribe(self, subscription: Subscription) -> None:
+        subscription._end()
+        subscribers = self._subscribers.get(subscription.channel, [])
+        if subscription not in subscribers:
+            return
+        subscribers.remove(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.channel]
+            if self._ws is not None:
+                await self._command('unsubscribe', subscription.channel)
+
+    async def _command(self, command: str, channel: Channel) -> None:
+        message: Dict[str, Any] = {'command': command, 'channel': channel}
+        if channel == ACCOUNT and command == 'subscribe':
+            assert self._auth is not None and self._nonce_allocator is not None
+            payload = f'nonce={await next_async(self._nonce_allocator)}'
+            message['key'] = self._auth.key
+            message['payload'] = payload
+            message['sign'] = self._auth.sign(payload.encode('utf-8')).decode('ascii')
+
+        ws = self._ws
+        if ws is None:
+            return
+        try:
+            await ws.send_str(json.dumps(message))
+        except (aiohttp.ClientError, ConnectionError):
+            # The connection is going away; every channel is subscribed to
+            # again once it has been re-established
+            pass
+
+    async def _run(self) -> None:
+        delay = self._reconnect_delay
+        while True:
+            if self._client is None:
+                self._client = aiohttp.ClientSession()
+            try:
+                async with self._client.ws_connect(type(self).url, decode_text=False) as ws:
+                    self._ws = ws  # type: ignore
+                    self.connections += 1
+                    delay = self._reconnect_delay
+                    for channel in list(self._subscribers):
+                        await self._command('subscribe', channel)
+                    await self._read(ws)
+            except asyncio.TimeoutError:
+                logger.warning('No messages from the push API in %ss; reconnecting', self._heartbeat_timeout)
+            except (aiohttp.ClientError, ConnectionError) as e:
+                logger.warning('Push API connection failed: %s', e)
+            except Exception:
+                # Whatever went wrong, a new connection starts every channel
+                # over, so subscribers aren't left waiting on a dead reader
+                logger.exception('Push API reader failed; reconnecting')
+            finally:
+                self._ws = None
+
+            await asyncio.sleep(delay * (1 + random.random()))
+            delay = min(2 * delay, self._max_reconnect_delay)
+
+    async def _read(self, ws: 'aiohttp.ClientWebSocketResponse[bool]') -> None:
+        while True:
+            frame = await ws.receive(timeout=self._heartbeat_timeout)
+            if frame.type in (aiohttp.WSMsgType.TEXT, aiohttp.WSMsgType.BINARY):
+                # Frames arrive as bytes and are decoded straight from them
+                try:
+                    message = json.loads(frame.data)
+                except ValueError:
+                    logger.warning('Skipping undecodable push API frame: %r', frame.data[:100])
+                    continue
+                await self._dispatch(message)
+            elif frame.type in (
+                aiohttp.WSMsgType.CLOSE,
+                aiohttp.WSMsgType.CLOSING,
+                aiohttp.WSMsgType.CLOSED,
+                aiohttp.WSMsgType.ERROR,
+            ):
+                return
+
+    async def _dispatch(self, message: Any) -> None:
+        if isinstance(message, dict):
+            logger.warning('Push API error: %s', message.get('error', message))
+            return
+        # Heartbeats and subscription acknowledgements carry no updates
+        if len(message) < 3:
+            return
+
+        channel_id, updates = message[0], message[2]
+        if channel_id not in self._names and updates and isinstance(updates[0], list):
+            # An order book channel opens with a snapshot naming its pair
+            kind, *fields = updates[0]
+            if kind == 'i':
+                self._names[channel_id] = fields[0]['currencyPair']
+
+        channel = self._names.get(channel_id, channel_id)
+        for subscription in tuple(self._subscribers.get(channel, ())):
+            await subscription._put(message)
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""Running many orders' worth of calls at once.
+
+The batch methods of PoloniexPrivateAPI (cancel_orders, place_orders,
+move_orders) hand their calls to `run_batch`, which keeps up to
+`concurrency` of them in flight. Each call still takes its turn with the
+rate limiter and its nonce from the dispatcher. A pipelined client
+(`pipelined=True`) lets the next request go as soon as one is on the wire,
+so a batch goes out as fast as those allow rather than one round trip at a
+time; otherwise the batch only overlaps the work around the round trips.
+
+Results come back in input order, as a BatchResult. In best-effort mode
+(the default) every call is made whatever happens to the others; with
+`fail_fast`, calls that haven't started when one fails are skipped, and
+their error is BatchAborted.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from time import monotonic
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Sequence
+
+from pyloniex.constants import OrderType
+
+
+BATCH_CONCURRENCY = 8
+
+SIDES = ('buy', 'sell')
+
+
+class Order(NamedTuple):
+    side: str
+    currency_pair: str
+    rate: Any
+    amount: Any
+    order_type: Optional[OrderType] = None
+
+
+class Move(NamedTuple):
+    order_number: int
+    rate: Any
+    amount: Any = None
+    order_type: Optional[OrderType] = None
+
+
+class BatchAborted(Exception):
+    """The error of calls skipped because an earlier one failed."""
+
+
+class ItemResult(NamedTuple):
+    value: Any
+    error: Optional[BaseException]
+    # When the call returned or raised (monotonic); None if it was skipped
+    acknowledged: Optional[float]
+
+
+class BatchResult(NamedTuple):
+    results: List[ItemResult]
+    # From the start of the batch to the last acknowledgment
+    elapsed: float
+    # From the first acknowledgment to the last
+    spread: float
+
+    @property
+    def ok(self) -> bool:
+        return all(result.error is None for result in self.results)
+
+    @property
+    def values(self) -> List[Any]:
+        return [result.value for result in self.results]
+
+    @property
+    def errors(self) -> List[Optional[BaseException]]:
+        return [result.error for result in self.results]
+
+
+def _summarize(start: float, results: Sequence[Optional[ItemResult]]) -> BatchResult:
+    finished = [r for r in results if r is not None]
+    acknowledged = [r.acknowledged for r in finished if r.acknowledged is not None]
+    if acknowledged:
+        elapsed = max(acknowledged) - start
+        spread = max(acknowledged) - min(acknowledged)
+    else:
+        elapsed = spread = 0.0
+    return BatchResult(finished, elapsed, spread)
+
+
+def run_batch(
+    calls: Sequence[Callable[[], Any]],
+    *,
+    concurrency: int = BATCH_CONCURRENCY,
+    fail_fast: bool = False,
+) -> BatchResult:
+    """Make `calls` with up to `concurrency` in flight at once."""
+    start = monotonic()
+    results: List[Optional[ItemResult]] = [None] * len(calls)
+    failed = Event()
+
+    def run(i: int) -> None:
+        if failed.is_set():
+            results[i] = ItemResult(None, BatchAborted(), None)
+            return
+        try:
+            value = calls[i]()
+        except Exception as e:
+            results[i] = ItemResult(None, e, monotonic())
+            if fail_fast:
+                failed.set()
+        else:
+            results[i] = ItemResult(value, None, monotonic())
+
+    if calls:
+        with ThreadPoolExecutor(min(concurrency, len(calls)), thread_name_prefix='Batch') as pool:
+            # Consumed to wait for every call (run doesn't raise)
+            list(pool.map(run, range(len(calls))))
+    return _summarize(start, results)
+
+
+async def run_batch_async(
+    calls: Sequence[Callable[[], Awaitable[Any]]],
+    *,
+    concurrency: int = BATCH_CONCURRENCY,
+    fail_fast: bool = False,
+) -> BatchResult:
+    """Coroutine flavor of `run_batch`, for the asyncio clients."""
+    import asyncio
+
+    start = monotonic()
+    results: List[Optional[ItemResult]] = [None] * len(calls)
+    semaphore = asyncio.Semaphore(concurrency)
+    failed = False
+
+    async def run(i: int) -> None:
+        nonlocal failed
+        async with semaphore:
+            if failed:
+                results[i] = ItemResult(None, BatchAborted(), None)
+                return
+            try:
+                value = await calls[i]()
+            except Exception as e:
+                results[i] = ItemResult(None, e, monotonic())
+                if fail_fast:
+                    failed = True
+            else:
+                results[i] = ItemResult(value, None, monotonic())
+
+    await asyncio.gather(*(run(i) for i in range(len(calls))))
+    return _summarize(start, results)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+from collections import OrderedDict
+from hashlib import sha1
+from threading import Lock
+from threading import get_ident
+from time import monotonic
+from time import time
+from typing import Any
+from typing import Dict
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+
+
+# How long, in seconds, responses to each public command stay fresh. Commands
+# not listed here aren't cached.
+DEFAULT_TTLS = {
+    'returnTicker': 1,
+    'return24hVolume': 60,
+    'returnCurrencies': 3600,
+}
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    disk_hits: int
+    misses: int
+    evictions: int
+
+
+def cache_key(params: Dict[str, Any]) -> str:
+    """Parameters are normalized (sorted, stringified) so that equivalent
+    calls share an entry.
+    """
+    return '&'.join(f'{k}={v}' for k, v in sorted(params.items()))
+
+
+class ResponseCache:
+    """An LRU cache of public API responses with a time to live per command.
+
+    At most `size` responses are held in memory; beyond that, the least
+    recently used is evicted. If `path` is given, responses are also written
+    to that directory and served from there (until they expire) when they
+    aren't in memory, e.g. after a restart or in another process.
+
+    Cached responses are shared between callers, so they must not be mutated.
+    """
+
+    def __init__(
+        self,
+        ttls: Optional[Dict[str, float]] = None,
+        *,
+        size: int = 1024,
+        path: Optional[str] = None,
+    ) -> None:
+        self._ttls = DEFAULT_TTLS if ttls is None else ttls
+        self._size = size
+        self._path = path
+        self._entries: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+
+    @property
+    def stats(self) -> CacheStats:
+        return CacheStats(self._hits, self._disk_hits, self._misses, self._evictions)
+
+    def ttl(self, params: Dict[str, Any]) -> Optional[float]:
+        return self._ttls.get(params.get('command'))  # type: ignore
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _file(self, key: str) -> str:
+        assert self._path is not None
+        return os.path.join(self._path, sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def lookup(self, params: Dict[str, Any]) -> Tuple[bool, Any]:
+        """Returns whether a fresh response for `params` is cached and, if so,
+        the response.
+        """
+        ttl = self.ttl(params)
+        if ttl is None:
+            return False, None
+
+        key = cache_key(params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, data = entry
+                if expires > monotonic():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return True, data
+                del self._entries[key]
+
+        if self._path is not None:
+            try:
+                with open(self._file(key)) as f:
+                    stored = json.load(f)
+            except (OSError, ValueError):
+                stored = None
+            if stored is not None and stored['key'] == key:
+                remaining = stored['expires'] - time()
+                if remaining > 0:
+                    self._insert(key, monotonic() + remaining, stored['data'])
+                    with self._lock:
+                        self._disk_hits += 1
+                    return True, stored['data']
+
+        with self._lock:
+            self._misses += 1
+        return False, None
+
+    def store(self, params: Dict[str, Any], data: Any) -> None:
+        ttl = self.ttl(params)
+        if ttl is None or data is None:
+            return
+
+        key = cache_key(params)
+        self._insert(key, monotonic() + ttl, data)
+
+        if self._path is not None:
+            # Write to a temporary file first so that readers never see a
+            # partially written entry
+            filename = self._file(key)
+            temporary = f'{filename}.{os.getpid()}.{get_ident()}.tmp'
+            with open(temporary, 'w') as f:
+                json.dump({'key': key, 'expires': time() + ttl, 'data': data}, f)
+            os.replace(temporary, filename)
+
+    def _insert(self, key: str, expires: float, data: Any) -> None:
+        with self._lock:
+            if key in self._entries:
+                del self._entries[key]
+            elif len(self._entries) >= self._size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+            self._entries[key] = (expires, data)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""A local, incremental store of returnChartData candles.
+
+Each (currency_pair, period) series lives in two files under the store's
+directory: an append-only binary file of fixed-size candle records, and a
+JSON index of the segments appended to it. Every segment is a sorted run of
+candles covering a known time range, so the index doubles as a record of
+which ranges have already been fetched.
+
+CandleStore.return_chart_data reads covered ranges straight out of the
+memory-mapped file (without copying when a single segment covers the whole
+request) and only calls the API for the gaps, plus the still-forming candles
+at the live end, which are never stored.
+
+Requires NumPy (`pip install pyloniex[numpy]`).
+"""
+import fcntl
+import json
+import os
+from threading import Lock
+from time import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Tuple
+
+import numpy as np
+
+from pyloniex.api.public import PoloniexPublicAPI
+from pyloniex.columnar import CHART_DATA_COLUMNS
+
+
+CANDLE = np.dtype([
+    (field, '<i8' if kind == 'int' else '<f8')
+    for field, kind in CHART_DATA_COLUMNS.items()
+])
+
+
+def _gaps(start: int, end: int, covered: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """The parts of [start, end) not covered by any of the (sorted,
+    disjoint) ranges in `covered`.
+    """
+    gaps = []
+    cursor = start
+    for a, b in covered:
+        if b <= cursor:
+            continue
+        if a >= end:
+            break
+        if a > cursor:
+            gaps.append((cursor, a))
+        cursor = max(cursor, b)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+class CandleStore:
+
+    def __init__(self, public: PoloniexPublicAPI, path: str) -> None:
+        self._public = public
+        self._path = path
+        self._lock = Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _files(self, currency_pair: str, period: int) -> Tuple[str, str, str]:
+        base = os.path.join(self._path, f'{currency_pair}_{period}')
+        return f'{base}.bin', f'{base}.json', f'{base}.lock'
+
+    def covered(self, *, currency_pair: str, period: int) -> List[Tuple[int, int]]:
+        """The time ranges, as sorted [start, end) pairs, that are stored."""
+        _, index_file, _ = self._files(currency_pair, period)
+        return [(a, b) for a, b, _, _ in self._load_index(index_file)]
+
+    @staticmethod
+    def _load_index(index_file: str) -> List[Tuple[int, int, int, int]]:
+        try:
+            with open(index_file) as f:
+                segments = json.load(f)['segments']
+        except FileNotFoundError:
+            return []
+        return sorted(tuple(segment) for segment in segments)  # type: ignore
+
+    def _fetch(self, currency_pair: str, period: int, start: int, end: int) -> np.ndarray:
+        columns = self._public.return_chart_data(
+            currency_pair=currency_pair,
+            period=period,
+            start=start,
+            end=end - 1,
+            format='columnar',
+        )
+        if not isinstance(columns, dict) or 'date' not in columns:
+            raise ValueError(f'Unexpected returnChartData response: {columns!r}')
+
+        candles = np.empty(len(columns['date']), dtype=CANDLE)
+        for field in CHART_DATA_COLUMNS:
+            candles[field] = columns[field]
+        # When there is no data, Poloniex sends a single candle of zeros
+        candles = candles[candles['date'] != 0]
+        return np.sort(candles, order='date')
+
+    def return_chart_data(
+        self,
+        *,
+        currency_pair: str,
+        period: int,
+        start: int,
+        end: int,
+    ) -> np.ndarray:
+        """Candles with start <= date <= end, as a structured array with the
+        fields of returnChartData, sorted by date. Arrays read from the store
+        are read-only.
+        """
+        # Candles are dated on period boundaries: the first at or after
+        # start, up to the last at or before end
+        first = -(-start // period) * period
+        last = end - end % period + period
+        # Candles from here on are still forming
+        live = int(time()) // period * period
+
+        data_file, index_file, lock_file = self._files(currency_pair, period)
+        with self._lock, open(lock_file, 'a') as f:
+            # Serializes access with other processes using the same store
+            fcntl.lockf(f, fcntl.LOCK_EX)
+            segments = self._load_index(index_file)
+            covered = [(a, b) for a, b, _, _ in segments]
+
+            fetched = []
+            for a, b in _gaps(first, last, covered):
+                candles = self._fetch(currency_pair, period, a, b)
+                stored_end = min(b, live)
+                if stored_end > a:
+                    complete = candles[candles['date'] < stored_end]
+                    segments.append(self._append(data_file, a, stored_end, complete))
+                fetched.append(candles[candles['date'] >= stored_end])
+
+            if fetched:
+                self._save_index(index_file, segments)
+
+        parts = self._read(data_file, sorted(segments), first, last)
+        parts.extend(candles for candles in fetched if len(candles))
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return np.empty(0, dtype=CANDLE)
+        return np.sort(np.concatenate(parts), order='date')
+
+    @staticmethod
+    def _append(data_file: str, start: int, end: int, candles: np.ndarray) -> Tuple[int, int, int, int]:
+        with open(data_file, 'ab') as f:
+            offset = f.tell() // CANDLE.itemsize
+            f.write(candles.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        return start, end, offset, len(candles)
+
+    @staticmethod
+    def _save_index(index_file: str, segments: List[Tuple[int, int, int, int]]) -> None:
+        temporary = f'{index_file}.{os.getpid()}.tmp'
+        with open(temporary, 'w') as f:
+            json.dump({'segments': sorted(segments)}, f)
+        os.replace(temporary, index_file)
+
+    @staticmethod
+    def _read(
+        data_file: str,
+        segments: List[Tuple[int, int, int, int]],
+        first: int,
+        last: int,
+    ) -> List[np.ndarray]:
+        parts: List[np.ndarray] = []
+        if not os.path.exists(data_file) or os.path.getsize(data_file) == 0:
+            return parts
+        records = np.memmap(data_file, dtype=CANDLE, mode='r')
+        for a, b, offset, count in segments:
+            if b <= first or a >= last or count == 0:
+                continue
+            segment = records[offset:offset + count]
+            dates = segment['date']
+            lo, hi = np.searchsorted(dates, [first, last])
+            if hi > lo:
+                parts.append(segment[lo:hi])
+        return parts
+
+
+def to_rows(candles: np.ndarray) -> List[Dict[str, Any]]:
+    """Convert candles back to the list of dicts that
+    PoloniexPublicAPI.return_chart_data returns.
+    """
+    return [dict(zip(CHART_DATA_COLUMNS, row)) for row in candles.tolist()]
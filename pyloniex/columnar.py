@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""Columnar decoding of large, flat Poloniex responses into NumPy arrays.
+
+Responses like returnChartData and returnTradeHistory are long lists of
+small objects that all have the same keys. Rather than build a dict (and a
+string or float) per row, the raw body is reduced to comma separated values
+and handed to NumPy's parser, which fills typed columns directly. Bodies
+that aren't laid out the way Poloniex sends them are decoded with json
+instead.
+
+Requires NumPy 1.23 or later (`pip install pyloniex[numpy]`).
+"""
+import json
+from decimal import Decimal
+from io import BytesIO
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Optional
+
+import numpy as np
+
+from pyloniex.decoding import to_scaled
+
+
+CHART_DATA_COLUMNS = {
+    'date': 'int',
+    'high': 'price',
+    'low': 'price',
+    'open': 'price',
+    'close': 'price',
+    'volume': 'price',
+    'quoteVolume': 'price',
+    'weightedAverage': 'price',
+}
+
+TRADE_HISTORY_COLUMNS = {
+    'globalTradeID': 'int',
+    'tradeID': 'int',
+    'date': 'datetime',
+    'type': 'bytes',
+    'rate': 'price',
+    'amount': 'price',
+    'total': 'price',
+}
+
+
+# Control characters other than whitespace, which JSON only allows escaped
+_MARKERS = bytes(range(0x0e, 0x20))
+_NOT_MARKERS = bytes(b for b in range(256) if b not in _MARKERS)
+
+# How each kind of field is parsed out of the body
+_DTYPES = {
+    'int': 'i8',
+    'price': 'f8',
+    'datetime': 'S19',
+    'bytes': 'S16',
+}
+
+
+def _dtype(kind: str, price_scale: Optional[int]) -> str:
+    # Scaled prices are parsed from their digits, so they're read as text
+    if kind == 'price' and price_scale is not None:
+        return 'S32'
+    return _DTYPES[kind]
+
+
+def _scaled(column: np.ndarray, scale: int) -> np.ndarray:
+    """Prices as text to int64 counts of 10 ** -scale. The integer and
+    fractional digits are joined and parsed as one integer, which (unlike
+    going through float64) is exact for any price.
+    """
+    if not len(column):
+        return np.zeros(0, np.int64)
+    parts = np.char.partition(column, b'.')
+    whole, fraction = parts[:, 0], parts[:, 2]
+    # Exponents, and digits beyond the scale (which need rounding), are left
+    # to Decimal
+    exponent = np.char.find(np.char.lower(column), b'e') >= 0
+    odd = (np.char.str_len(fraction) > scale) | exponent
+    digits = np.char.add(whole, np.char.ljust(fraction, scale, b'0'))
+    digits[odd] = b'0'
+    scaled = digits.astype(np.int64)
+    for i in np.flatnonzero(odd):
+        scaled[i] = to_scaled(Decimal(column[i].decode('ascii')), scale)
+    return scaled
+
+
+def _finish(column: np.ndarray, kind: str, price_scale: Optional[int]) -> np.ndarray:
+    if kind == 'price' and price_scale is not None:
+        return _scaled(column, price_scale)
+    elif kind == 'datetime':
+        # Poloniex timestamps are UTC; return seconds since the epoch
+        return column.astype('datetime64[s]').astype(np.int64)
+    return np.ascontiguousarray(column)
+
+
+def _from_rows(
+    rows: List[Dict[str, Any]],
+    columns: Dict[str, str],
+    price_scale: Optional[int],
+) -> Dict[str, np.ndarray]:
+    present = rows[0] if rows else columns
+    return {
+        key: _finish(
+            np.array([row[key] for row in rows], dtype=_dtype(kind, price_scale)),
+            kind,
+            price_scale,
+        )
+        for key, kind in columns.items()
+        if key in present
+    }
+
+
+def _from_compact(
+    body: bytes,
+    columns: Dict[str, str],
+    price_scale: Optional[int],
+) -> Optional[Dict[str, np.ndarray]]:
+    """The fast path, for compact bodies whose rows all have the same keys
+    in the same order; returns None for anything else.
+    """
+    if b', ' in body or b': ' in body or b'\n' in body:
+        return None
+    start, end = body.find(b'{'), body.find(b'}')
+    keys = list(json.loads(body[start:end + 1]))
+    if len(keys) > len(_MARKERS):
+        return None
+    rows = body.count(b'{')
+    if body.count(b'},{') != rows - 1:
+        return None
+
+    # Swap each key for a marker byte of its own (JSON strings can't hold
+    # these raw), then check that every row has every key, in order
+    markers = _MARKERS[:len(keys)]
+    for key, marker in zip(keys, markers):
+        body = body.replace(b'"' + key.encode('utf-8') + b'":', bytes([marker]))
+    if b'":' in body or body.translate(None, _NOT_MARKERS) != markers * rows:
+        return None
+
+    # Leave one line of comma separated values per row for NumPy's own (C)
+    # parser
+    body = body.replace(b'},{', b'\n').translate(None, b'[]{}' + _MARKERS)
+
+    wanted = [(i, key) for i, key in enumerate(keys) if key in columns]
+    try:
+        table = np.loadtxt(
+            BytesIO(body),
+            dtype=[(key, _dtype(columns[key], price_scale)) for _, key in wanted],
+            delimiter=',',
+            quotechar='"',
+            comments=None,
+            usecols=[i for i, _ in wanted],
+            ndmin=1,
+        )
+    except ValueError:
+        return None
+    if len(table) != rows:
+        return None
+    return {
+        key: _finish(table[key], columns[key], price_scale)
+        for _, key in wanted
+    }
+
+
+def decode_columns(
+    body: bytes,
+    columns: Dict[str, str],
+    *,
+    price_scale: Optional[int] = None,
+) -> Any:
+    """Decode a JSON array of flat objects into a dict of arrays, one per
+    field in `columns` (which maps field names to kinds). Fields missing from
+    the response are left out.
+
+    Prices are float64 unless `price_scale` is given, in which case they are
+    int64 counts of 10 ** -price_scale.
+
+    Bodies laid out the way Poloniex sends them (compact, with every row's
+    keys in the same order) go straight to NumPy's parser; any other array
+    is decoded with json first, which gives the same result more slowly. A
+    body that isn't an array (e.g. {"error": ...}) is decoded and returned
+    unchanged, as it would have been without columnar decoding.
+    """
+    if not body.lstrip().startswith(b'['):
+        return json.loads(body)
+    if body.find(b'{') != -1:
+        decoded = _from_compact(body, columns, price_scale)
+        if decoded is not None:
+            return decoded
+    return _from_rows(json.loads(body), columns, price_scale)
+
+
+def decoder(
+    columns: Dict[str, str],
+    price_scale: Optional[int] = None,
+) -> Callable[[bytes], Any]:
+    def decode(body: bytes) -> Any:
+        return decode_columns(body, columns, price_scale=price_scale)
+    return decode
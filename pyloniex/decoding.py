@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""JSON decoding of response bodies, and lazy conversion of the numbers in
+them.
+
+Clients decode with the `loads` of the fastest backend installed: orjson
+(`pip install pyloniex[fast]`), or else the standard library's json. Any
+callable taking bytes can be passed as a client's `loads=` instead.
+
+Poloniex sends prices and amounts as strings ("0.00012345"). With
+`numbers='decimal'` or `numbers='scaled'`, clients return read-only views of
+their responses in which those strings (and any floats or Decimals) come out
+as Decimals, or as int counts of 10 ** -price_scale, when they're accessed.
+Nothing is converted up front, so fields that are never read cost nothing:
+
+    public = PoloniexPublicAPI(numbers='decimal')
+    public.return_ticker()['BTC_ETH']['last']  # Decimal('0.03112000')
+
+Strings without a decimal point (order numbers, flags like isFrozen) are left
+alone, as are ints. The decoded response behind a view is its `raw`.
+"""
+from decimal import Decimal
+from decimal import InvalidOperation
+from importlib import import_module
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Sequence
+
+
+# Modules with a `loads` that takes bytes, fastest first
+BACKENDS = ('orjson', 'json')
+
+NUMBER_MODES = ('decimal', 'scaled')
+
+PRICE_SCALE = 8
+
+
+def backend(name: Optional[str] = None) -> Callable[[bytes], Any]:
+    """The `loads` of the backend called `name`, or of the fastest one
+    installed. Backends are only imported once they're asked for.
+    """
+    if name is not None:
+        return import_module(name).loads  # type: ignore
+    for name in BACKENDS[:-1]:
+        try:
+            return import_module(name).loads  # type: ignore
+        except ImportError:
+            pass
+    return import_module(BACKENDS[-1]).loads  # type: ignore
+
+
+def _is_number(value: str) -> bool:
+    # Like matching -?\d+\.\d+, but cheaper
+    whole, point, fraction = value.partition('.')
+    return bool(point) and fraction.isdigit() and whole.lstrip('-').isdigit()
+
+
+def to_decimal(value: Any) -> Any:
+    if isinstance(value, str):
+        if '.' in value:
+            try:
+                return Decimal(value)
+            except InvalidOperation:
+                pass
+        return value
+    elif isinstance(value, float):
+        # repr is the shortest string that round trips, i.e. what was sent
+        return Decimal(repr(value))
+    return value
+
+
+def to_scaled(value: Any, scale: int = PRICE_SCALE) -> Any:
+    if isinstance(value, str):
+        if not _is_number(value):
+            return value
+        whole, _, fraction = value.partition('.')
+        if len(fraction) <= scale:
+            # Exact, and much faster than going through Decimal
+            return int(whole + fraction.ljust(scale, '0'))
+        return int(Decimal(value).scaleb(scale).to_integral_value())
+    elif isinstance(value, float):
+        return int(Decimal(repr(value)).scaleb(scale).to_integral_value())
+    elif isinstance(value, Decimal):
+        return int(value.scaleb(scale).to_integral_value())
+    return value
+
+
+class LazyMapping(Mapping[str, Any]):
+    """A read-only view of a decoded JSON object that converts its numbers
+    (and wraps its containers) as they're accessed.
+    """
+
+    __slots__ = ('raw', '_convert')
+
+    def __init__(self, raw: Dict[str, Any], convert: Callable[[Any], Any]) -> None:
+        self.raw = raw
+        self._convert = convert
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.raw[key]
+        # Fast path for the common case
+        if type(value) is str:
+            return self._convert(value)
+        return _view(value, self._convert)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.raw)
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.raw!r})'
+
+
+class LazySequence(Sequence[Any]):
+    """A read-only view of a decoded JSON array; see LazyMapping."""
+
+    __slots__ = ('raw', '_convert')
+
+    def __init__(self, raw: List[Any], convert: Callable[[Any], Any]) -> None:
+        self.raw = raw
+        self._convert = convert
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return LazySequence(self.raw[index], self._convert)
+        return _view(self.raw[index], self._convert)
+
+    def __iter__(self) -> Iterator[Any]:
+        convert = self._convert
+        for value in self.raw:
+            yield _view(value, convert)
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self.raw!r})'
+
+
+def _view(value: Any, convert: Callable[[Any], Any]) -> Any:
+    if isinstance(value, dict):
+        return LazyMapping(value, convert)
+    elif isinstance(value, list):
+        return LazySequence(value, convert)
+    return convert(value)
+
+
+def unwrap(data: Any) -> Any:
+    """The decoded response behind a view, or `data` if it isn't one."""
+    if isinstance(data, (LazyMapping, LazySequence)):
+        return data.raw
+    return data
+
+
+def number_view(
+    mode: Optional[str],
+    price_scale: int = PRICE_SCALE,
+) -> Callable[[Any], Any]:
+    """A function that presents decoded responses with numbers in `mode`
+    (None to leave them as they are).
+    """
+    if mode is None:
+        return _identity
+    elif mode == 'decimal':
+        convert = to_decimal
+    elif mode == 'scaled':
+        def convert(value: Any) -> Any:
+            return to_scaled(value, price_scale)
+    else:
+        raise ValueError(f'numbers must be one of {NUMBER_MODES} or None, not {mode!r}')
+
+    def view(data: Any) -> Any:
+        # Views (e.g. a response that went through a hedge) pass through
+        if data is None or isinstance(data, (LazyMapping, LazySequence)):
+            return data
+        return _view(data, convert)
+
+    return view
+
+
+def number_parser(
+    mode: Optional[str],
+    price_scale: int = PRICE_SCALE,
+) -> Callable[[Any], Any]:
+    """A function that reads a single number (a string, as Poloniex sends
+    them, or an int or float) the way `mode` presents them: as a Decimal, an
+    int count of 10 ** -price_scale, or a float given None.
+    """
+    if mode is None:
+        return float
+    elif mode == 'decimal':
+        def parse(value: Any) -> Any:
+            return Decimal(repr(value)) if isinstance(value, float) else Decimal(value)
+    elif mode == 'scaled':
+        unit = 10 ** price_scale
+
+        def parse(value: Any) -> Any:
+            if isinstance(value, int):
+                return value * unit
+            elif isinstance(value, str) and '.' not in value:
+                return int(value) * unit
+            return to_scaled(value, price_scale)
+    else:
+        raise ValueError(f'numbers must be one of {NUMBER_MODES} or None, not {mode!r}')
+    return parse
+
+
+def _identity(data: Any) -> Any:
+    return data
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Form encoding of private request bodies, straight to bytes.
+
+`encode_params` turns a command's parameters into the urlencoded body that
+gets signed and sent, less the nonce, which `EncodedParams.with_nonce` adds
+once one has been allocated. The result is built in one pass, the
+`command=...` prefix of each command and the `key=` of each parameter are
+encoded once and reused, and the same bytes go to the signer and the
+transport.
+
+Prices and amounts are written exactly:
+
+    float           8 decimal places, as Poloniex expects
+    Decimal         every digit it has, never in exponent notation
+    Scaled(n, s)    the int n as a count of 10 ** -s
+"""
+from decimal import Decimal
+from typing import Any
+from typing import Dict
+from typing import NamedTuple
+from typing import Optional
+from urllib.parse import quote_plus
+
+from pyloniex.decoding import PRICE_SCALE
+
+
+class Scaled(NamedTuple):
+    """An exact price or amount, as an int count of 10 ** -scale, like those
+    returned with numbers='scaled' (see pyloniex.decoding).
+    """
+    units: int
+    scale: int = PRICE_SCALE
+
+    def __str__(self) -> str:
+        if self.scale <= 0:
+            return str(self.units * 10 ** -self.scale)
+        sign = '-' if self.units < 0 else ''
+        digits = str(abs(self.units)).rjust(self.scale + 1, '0')
+        return f'{sign}{digits[:-self.scale]}.{digits[-self.scale:]}'
+
+
+def format_value(value: Any) -> str:
+    """How a parameter value is written in a request."""
+    if isinstance(value, float):
+        # The default, scientific notation for small floats (1e-08), won't do
+        return f'{value:.8f}'
+    elif isinstance(value, Decimal):
+        return format(value, 'f')
+    return str(value)
+
+
+class EncodedParams(bytes):
+    """A urlencoded request body still missing its nonce. Remembers its
+    command, for the parts of a client that go by it.
+    """
+
+    command: Optional[str] = None
+
+    def with_nonce(self, nonce: int) -> bytes:
+        return b'%s&nonce=%d' % (self, nonce)
+
+
+# The encoded `command=...` prefix of each command and `&key=` of each
+# parameter. There are only a few dozen of either.
+_prefixes: Dict[str, bytes] = {}
+_keys: Dict[str, bytes] = {}
+
+
+def _encode(value: Any) -> bytes:
+    # type(), not isinstance(), so that bools still come out as True/False
+    if type(value) is int:
+        return b'%d' % value
+    return quote_plus(format_value(value)).encode('ascii')
+
+
+def encode_params(params: Dict[str, Any]) -> EncodedParams:
+    """The urlencoded body for `params`, with `command` first."""
+    command = params.get('command')
+    prefix = _prefixes.get(command)  # type: ignore
+    if prefix is None:
+        prefix = _prefixes[command] = b'command=' + _encode(command)  # type: ignore
+
+    parts = [prefix]
+    for key, value in params.items():
+        if key == 'command':
+            continue
+        encoded_key = _keys.get(key)
+        if encoded_key is None:
+            encoded_key = _keys[key] = b'&' + _encode(key) + b'='
+        parts.append(encoded_key)
+        parts.append(_encode(value))
+
+    body = EncodedParams(b''.join(parts))
+    body.command = command
+    return body
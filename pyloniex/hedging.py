@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""Hedged requests, to cut the tail latency of read-only public commands.
+
+If a request hasn't completed within the delay its command usually needs (a
+high percentile of its recent latencies), a second, identical request is
+sent, as long as the rate limiter has a token to spare right away. Whichever
+completes first wins and the other is abandoned: cancelled outright by the
+asyncio client, or left to finish in the background by the blocking one.
+
+    public = PoloniexPublicAPI(hedging=HedgingPolicy(percentile=95))
+    ...
+    public.hedging.stats
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from contextvars import Context
+from contextvars import copy_context
+from threading import Lock
+from time import monotonic
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Deque
+from typing import Dict
+from typing import FrozenSet
+from typing import NamedTuple
+from typing import Optional
+from typing import TypeVar
+
+
+T = TypeVar('T')
+
+# Small, latency-sensitive responses; hedging bulk history requests would
+# mostly double the load on the server
+HEDGED_COMMANDS = frozenset({
+    'returnTicker',
+    'return24hVolume',
+    'returnOrderBook',
+    'returnCurrencies',
+    'returnLoanOrders',
+})
+
+
+class HedgeStats(NamedTuple):
+    # Requests eligible for hedging
+    requests: int
+    # Hedges sent, because the first request was slower than the delay
+    hedges: int
+    # Hedges that completed before the request they were hedging
+    wins: int
+    # Hedges called for but not sent, for lack of rate budget (or of a free
+    # thread, for the blocking clients)
+    skipped: int
+
+
+class HedgingPolicy:
+    """Decides when to hedge, and runs hedged requests.
+
+    The delay for each command is the `percentile`th percentile of its last
+    `window` latencies (but at least `min_delay`). Until `min_samples`
+    requests have completed, `initial_delay` is used instead.
+
+    So that a blocking caller can return as soon as either request
+    completes, both run on a pool of `workers` threads, in the caller's
+    context (so that e.g. RequestScheduler.deadline still applies). Requests
+    never queue for a thread: while they're all busy, requests run on the
+    calling thread, unhedged, and hedges aren't sent.
+    """
+
+    def __init__(
+        self,
+        *,
+        percentile: float = 95,
+        window: int = 100,
+        min_samples: int = 10,
+        initial_delay: float = 0.5,
+        min_delay: float = 0.01,
+        commands: FrozenSet[str] = HEDGED_COMMANDS,
+        workers: int = 8,
+    ) -> None:
+        self._percentile = percentile
+        self._window = window
+        self._min_samples = min_samples
+        self._initial_delay = initial_delay
+        self._min_delay = min_delay
+        self._commands = commands
+        self._workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Requests submitted to the executor that haven't completed
+        self._running = 0
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._lock = Lock()
+        self._requests = 0
+        self._hedges = 0
+        self._wins = 0
+        self._skipped = 0
+
+    @property
+    def stats(self) -> HedgeStats:
+        return HedgeStats(self._requests, self._hedges, self._wins, self._skipped)
+
+    def hedges(self, params: Dict[str, Any]) -> bool:
+        return params.get('command') in self._commands
+
+    def delay(self, command: str) -> float:
+        with self._lock:
+            latencies = sorted(self._latencies.get(command, ()))
+        if len(latencies) < self._min_samples:
+            return self._initial_delay
+        i = min(len(latencies) - 1, int(len(latencies) * self._percentile / 100))
+        return max(self._min_delay, latencies[i])
+
+    def record(self, command: str, latency: float) -> None:
+        with self._lock:
+            latencies = self._latencies.get(command)
+            if latencies is None:
+                latencies = self._latencies[command] = deque(maxlen=self._window)
+            latencies.append(latency)
+
+    def _count(self, *, requests: int = 0, hedges: int = 0, wins: int = 0, skipped: int = 0) -> None:
+        with self._lock:
+            self._requests += requests
+            self._hedges += hedges
+            self._wins += wins
+            self._skipped += skipped
+
+    def _timed(self, command: str, func: Callable[[], T]) -> T:
+        start = monotonic()
+        result = func()
+        self.record(command, monotonic() - start)
+        return result
+
+    def _submit(self, context: Context, command: str, func: Callable[[], T]) -> 'Optional[Future[T]]':
+        """Run `func` on a pool thread in `context`, or return None if none
+        is free.
+        """
+        with self._lock:
+            if self._running >= self._workers:
+                return None
+            self._running += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self._workers)
+            executor = self._executor
+
+        def run() -> T:
+            try:
+                return context.run(self._timed, command, func)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+        return executor.submit(run)
+
+    def call(
+        self,
+        command: str,
+        primary: Callable[[], T],
+        hedge: Callable[[], T],
+        budget: Callable[[], bool],
+    ) -> T:
+        """Run `primary`; if it takes longer than the delay for `command` and
+        `budget` grants a token, race it against `hedge`.
+        """
+        self._count(requests=1)
+        # A copy per request: a Context can only be entered by one thread
+        # at a time
+        first = self._submit(copy_context(), command, primary)
+        if first is None:
+            return self._timed(command, primary)
+        done, _ = wait([first], timeout=self.delay(command))
+        if done:
+            return first.result()
+        second = None
+        # Checking for a free thread first, so as not to waste the token
+        if self._running < self._workers and budget():
+            second = self._submit(copy_context(), command, hedge)
+        if second is None:
+            self._count(skipped=1)
+            return first.result()
+
+        self._count(hedges=1)
+        winner = self._first_success([first, second])
+        if winner is second:
+            self._count(wins=1)
+        return winner.result()
+
+    @staticmethod
+    def _first_success(futures):
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if not future.cancelled() and future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future
+        # Both failed; report the first request's error
+        return futures[0]
+
+    async def call_async(
+        self,
+        command: str,
+        primary: Callable[[], Awaitable[T]],
+        hedge: Callable[[], Awaitable[T]],
+        budget: Callable[[], bool],
+    ) -> T:
+        """Coroutine flavor of `call`. The loser is cancelled."""
+        import asyncio
+
+        async def timed(func: Callable[[], Awaitable[T]]) -> T:
+            start = monotonic()
+            result = await func()
+            self.record(command, monotonic() - start)
+            return result
+
+        self._count(requests=1)
+        first = asyncio.ensure_future(timed(primary))
+        done, _ = await asyncio.wait([first], timeout=self.delay(command))
+        if done or not budget():
+            if not done:
+                self._count(skipped=1)
+            return await first
+
+        self._count(hedges=1)
+        second = asyncio.ensure_future(timed(hedge))
+        tasks = [first, second]
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._count(wins=1)
+                        return task.result()
+            return first.result()
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""Backfilling public trade history over long time ranges.
+
+returnTradeHistory returns at most TRADE_HISTORY_LIMIT trades per call, and
+silently drops the rest. iter_trades splits a range into windows, fetches
+them concurrently (within the client's rate limit), splits any window that
+comes back full, and streams the trades back in time order.
+"""
+from collections import deque
+from collections.abc import Sequence
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from typing import Any
+from typing import Deque
+from typing import Iterator
+from typing import Mapping
+from typing import Set
+from typing import Tuple
+
+from pyloniex.api.public import PoloniexPublicAPI
+
+
+TRADE_HISTORY_LIMIT = 50000
+
+logger = getLogger(__name__)
+
+
+def iter_trades(
+    public: PoloniexPublicAPI,
+    *,
+    currency_pair: str,
+    start: int,
+    end: int,
+    window: int = 24 * 60 * 60,
+    workers: int = 4,
+    limit: int = TRADE_HISTORY_LIMIT,
+) -> Iterator[Mapping[str, Any]]:
+    """Yield every public trade for `currency_pair` in [start, end), oldest
+    first, without duplicates. Their numbers are as `public` returns them
+    (see its `numbers`).
+
+    The range is fetched in windows of up to `window` seconds, `workers` of
+    them at a time. A window that returns `limit` trades may have been
+    truncated, so it is split in half and fetched again; windows that follow
+    start out at the reduced size, growing back once they come back sparse.
+    """
+    def fetch(a: int, b: int) -> Sequence:
+        # Poloniex treats both ends of the range as inclusive
+        trades = public.return_trade_history(currency_pair=currency_pair, start=a, end=b - 1)
+        # A list, or a view of one given the client's `numbers`
+        if not isinstance(trades, Sequence) or isinstance(trades, str):
+            raise ValueError(f'Unexpected returnTradeHistory response: {trades!r}')
+        return trades
+
+    pool = ThreadPoolExecutor(workers)
+    pending: Deque[Tuple[int, int, Future]] = deque()
+    cursor = start
+    size = window
+    seen: Set[int] = set()
+
+    def submit(a: int, b: int) -> Tuple[int, int, Future]:
+        return a, b, pool.submit(fetch, a, b)
+
+    def refill() -> None:
+        nonlocal cursor
+        while cursor < end and len(pending) < 2 * workers:
+            b = min(cursor + size, end)
+            pending.append(submit(cursor, b))
+            cursor = b
+
+    try:
+        refill()
+        while pending:
+            a, b, future = pending.popleft()
+            trades = future.result()
+
+            if len(trades) >= limit:
+                if b - a > 1:
+                    mid = (a + b) // 2
+                    pending.appendleft(submit(mid, b))
+                    pending.appendleft(submit(a, mid))
+                    size = max(1, min(size, b - a) // 2)
+                    continue
+                logger.warning(
+                    'Trade history for %s at %d may be truncated: %d trades in one second',
+                    currency_pair, a, len(trades),
+                )
+            elif len(trades) < limit // 4:
+                size = min(window, size * 2)
+
+            # Trades come back newest first; the IDs of the previous window
+            # are enough to drop any the two windows have in common
+            window_ids = set()
+            for trade in sorted(trades, key=lambda trade: trade['globalTradeID']):
+                trade_id = trade['globalTradeID']
+                window_ids.add(trade_id)
+                if trade_id not in seen:
+                    yield trade
+            seen = window_ids
+
+            refill()
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+        pool.shutdown(wait=False)
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""Rate limiter backends whose buckets are shared beyond a single process.
+
+Poloniex enforces its limits per API key, no matter how many processes use
+that key. Pass one of these as `rate_limiter` to every client that shares a
+key, and they will draw from the same bucket.
+"""
+import fcntl
+import mmap
+import os
+import struct
+from abc import ABCMeta
+from abc import abstractmethod
+from hashlib import blake2b
+from threading import Lock
+from time import time
+from typing import ContextManager
+from typing import Optional
+from typing import Union
+
+from pyloniex.utils import BaseRateLimiter
+from pyloniex.utils import refill
+
+
+class SharedMemoryRateLimiter(BaseRateLimiter):
+    """Token buckets stored in a memory-mapped file, for processes on the same
+    host. Every process (and thread) that opens the same `path` shares the
+    buckets; access is serialized with an exclusive lock on the file.
+
+    The file holds `size` slots. As with RateLimiter, once every slot is in
+    use the least recently used key is evicted.
+
+    Timestamps come from the wall clock, so that a file that outlives a
+    reboot (or sits on a disk rather than tmpfs) still makes sense. Slots
+    stamped in the future, e.g. after the clock was set back, are treated as
+    if they had just been written.
+    """
+
+    _slot = struct.Struct('<Qdd')  # key hash, budget, timestamp
+
+    def __init__(
+        self,
+        path: str,
+        per_second: float,
+        burst: float,
+        size: int = 16,
+    ) -> None:
+        self._path = path
+        self._per_second = per_second
+        self._burst = burst
+        self._size = size
+        # fcntl locks are held per process, so threads need their own lock
+        self._lock = Lock()
+
+        length = self._slot.size * size
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < length:
+                os.ftruncate(self._fd, length)
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        self._mmap = mmap.mmap(self._fd, length)
+
+    def close(self) -> None:
+        self._mmap.close()
+        os.close(self._fd)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # The builtin hash() is salted per process, so it can't be used here
+        digest = blake2b(key.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') or 1
+
+    def _find(self, key_hash: int, now: float) -> int:
+        """Index of the slot holding `key_hash`; failing that, of an empty
+        slot; failing that, of the least recently used one.
+        """
+        oldest, oldest_timestamp = 0, float('inf')
+        for i in range(self._size):
+            h, _, timestamp = self._slot.unpack_from(self._mmap, i * self._slot.size)
+            if h == key_hash or h == 0:
+                return i
+            timestamp = min(timestamp, now)
+            if timestamp < oldest_timestamp:
+                oldest, oldest_timestamp = i, timestamp
+        return oldest
+
+    def _take(self, key: str, tokens: float, max_wait: Optional[float]) -> Optional[float]:
+        key_hash = self._hash(key)
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+            try:
+                now = time()
+                offset = self._find(key_hash, now) * self._slot.size
+                h, budget, timestamp = self._slot.unpack_from(self._mmap, offset)
+                if h != key_hash:
+                    budget, timestamp = self._burst, now
+                elif timestamp > now:
+                    timestamp = now
+                wait, budget = refill(
+                    budget, timestamp, now,
+                    self._per_second, self._burst, tokens, max_wait,
+                )
+                if wait is not None:
+                    self._slot.pack_into(self._mmap, offset, key_hash, budget, now)
+                return wait
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN)
+
+
+class RateLimitStore(metaclass=ABCMeta):
+    """The subset of a Redis client used by StoreRateLimiter. A redis.Redis
+    instance satisfies it as is; so can any object with these methods.
+    """
+
+    @abstractmethod
+    def get(self, name: str) -> Optional[Union[bytes, str]]:
+        pass
+
+    @abstractmethod
+    def set(self, name: str, value: str) -> object:
+        pass
+
+    @abstractmethod
+    def lock(self, name: str) -> ContextManager:
+        pass
+
+
+class StoreRateLimiter(BaseRateLimiter):
+    """Token buckets kept in a Redis-like key-value store, so that processes
+    on different hosts can share them. Each bucket is read and written under
+    the store's lock for that key.
+
+    Timestamps come from the wall clock, so the hosts involved should keep
+    their clocks in sync.
+    """
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        per_second: float,
+        burst: float,
+        *,
+        prefix: str = 'pyloniex:ratelimit:',
+    ) -> None:
+        self._store = store
+        self._per_second = per_second
+        self._burst = burst
+        self._prefix = prefix
+
+    def _take(self, key: str, tokens: float, max_wait: Optional[float]) -> Optional[float]:
+        name = self._prefix + key
+        with self._store.lock(name + ':lock'):
+            now = time()
+            raw = self._store.get(name)
+            if raw is None:
+                budget, timestamp = self._burst, now
+            else:
+                if isinstance(raw, bytes):
+                    raw = raw.decode('ascii')
+                budget_str, timestamp_str = raw.split(':')
+                # Another host's clock may be ahead of this one's
+                budget, timestamp = float(budget_str), min(float(timestamp_str), now)
+            wait, budget = refill(
+                budget, timestamp, now,
+                self._per_second, self._burst, tokens, max_wait,
+            )
+            if wait is not None:
+                self._store.set(name, f'{budget!r}:{now!r}')
+            return wait
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""Instrumentation of requests: where the time goes, and what comes back.
+
+Every attempt at a request produces a RequestRecord, which times its phases:
+
+    wait      waiting for the rate limiter (or scheduler) and, for private
+              requests, for the previous nonce to go out
+    prepare   building and signing the request
+    network   sending it and reading the response
+    decode    decoding the response
+
+and notes its status and the bytes sent and received. Clients hand records
+to their `instrumentation`, along with retries and the number of requests
+waiting for a token. The default, NOOP, ignores all of it.
+
+PrometheusMetrics aggregates records into histograms and counters and
+renders them in the Prometheus text format; SpanHooks passes each record,
+as a span, to OpenTelemetry-style start and end callbacks:
+
+    metrics = PrometheusMetrics()
+    public = PoloniexPublicAPI(instrumentation=metrics)
+    ...
+    print(metrics.render())
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import monotonic
+from time import time
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+
+PHASES = ('wait', 'prepare', 'network', 'decode')
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# The record of the attempt being made in this thread or task, so that the
+# parts of a client that time a phase don't all have to be handed it
+_current: ContextVar[Optional['RequestRecord']] = ContextVar('pyloniex_request_record', default=None)
+
+
+def current_record() -> Optional['RequestRecord']:
+    return _current.get()
+
+
+def command_of(kwargs: Dict[str, Any]) -> Optional[str]:
+    """The command of a request, given the keyword arguments to `request`."""
+    params = kwargs.get('params') or kwargs.get('data') or {}
+    if isinstance(params, dict):
+        return params.get('command')
+    # Pre-encoded (see pyloniex.encoding)
+    return getattr(params, 'command', None)
+
+
+class RequestRecord:
+    """Measurements of one attempt at a request. Doubles as the span handed
+    to SpanHooks callbacks.
+    """
+
+    __slots__ = (
+        'client', 'command', 'start', 'end', 'start_time',
+        'phases', 'status', 'bytes_out', 'bytes_in', 'error',
+    )
+
+    def __init__(self, client: str, command: Optional[str]) -> None:
+        self.client = client
+        self.command = command
+        self.start = monotonic()
+        self.end: Optional[float] = None
+        # Wall clock time, for exporters that want it
+        self.start_time = time()
+        self.phases: Dict[str, float] = {}
+        self.status: Optional[int] = None
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.error: Optional[BaseException] = None
+
+    def __repr__(self) -> str:
+        return f'<RequestRecord {self.client}.{self.command} status={self.status} phases={self.phases}>'
+
+    @property
+    def name(self) -> str:
+        return f'poloniex.{self.command}'
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+    @property
+    def attributes(self) -> Dict[str, Any]:
+        attributes: Dict[str, Any] = {
+            'pyloniex.client': self.client,
+            'pyloniex.command': self.command,
+            'pyloniex.bytes_out': self.bytes_out,
+            'pyloniex.bytes_in': self.bytes_in,
+        }
+        if self.status is not None:
+            attributes['http.status_code'] = self.status
+        for phase, seconds in self.phases.items():
+            attributes[f'pyloniex.{phase}_seconds'] = seconds
+        return attributes
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+class Instrumentation:
+    """Receives measurements from clients. Every method does nothing;
+    subclasses override the ones they are interested in.
+    """
+
+    def started(self, record: RequestRecord) -> None:
+        pass
+
+    def finished(self, record: RequestRecord) -> None:
+        pass
+
+    def retried(self, client: str, command: Optional[str], error: Optional[BaseException]) -> None:
+        pass
+
+    def waiting(self, delta: int) -> None:
+        """The number of requests waiting for a token changed by `delta`."""
+
+
+NOOP = Instrumentation()
+
+
+@contextmanager
+def recording(
+    instrumentation: Instrumentation,
+    client: str,
+    command: Optional[str],
+) -> Iterator[RequestRecord]:
+    """Record an attempt at a request, unless one is already being recorded
+    (in which case that record is used).
+    """
+    record = _current.get()
+    if record is not None:
+        yield record
+        return
+
+    record = RequestRecord(client, command)
+    token = _current.set(record)
+    instrumentation.started(record)
+    try:
+        yield record
+    except BaseException as e:
+        record.error = e
+        raise
+    finally:
+        _current.reset(token)
+        record.end = monotonic()
+        instrumentation.finished(record)
+
+
+@contextmanager
+def waiting(instrumentation: Instrumentation, record: RequestRecord) -> Iterator[None]:
+    start = monotonic()
+    instrumentation.waiting(1)
+    try:
+        yield
+    finally:
+        instrumentation.waiting(-1)
+        record.add('wait', monotonic() - start)
+
+
+class Fanout(Instrumentation):
+    """Passes everything on to several instrumentations."""
+
+    def __init__(self, *instrumentations: Instrumentation) -> None:
+        self._instrumentations = instrumentations
+
+    def started(self, record: RequestRecord) -> None:
+        for instrumentation in self._instrumentations:
+            instrumentation.started(record)
+
+    def finished(self, record: RequestRecord) -> None:
+        for instrumentation in self._instrumentations:
+            instrumentation.finished(record)
+
+    def retried(self, client: str, command: Optional[str], error: Optional[BaseException]) -> None:
+        for instrumentation in self._instrumentations:
+            instrumentation.retried(client, command, error)
+
+    def waiting(self, delta: int) -> None:
+        for instrumentation in self._instrumentations:
+            instrumentation.waiting(delta)
+
+
+class SpanHooks(Instrumentation):
+    """Calls `on_start` and `on_end` with each request's RequestRecord, which
+    has the usual span fields: name, start_time, duration, attributes and
+    error.
+    """
+
+    def __init__(
+        self,
+        on_start: Optional[Callable[[RequestRecord], None]] = None,
+        on_end: Optional[Callable[[RequestRecord], None]] = None,
+    ) -> None:
+        self._on_start = on_start
+        self._on_end = on_end
+
+    def started(self, record: RequestRecord) -> None:
+        if self._on_start is not None:
+            self._on_start(record)
+
+    def finished(self, record: RequestRecord) -> None:
+        if self._on_end is not None:
+            self._on_end(record)
+
+
+class _Histogram:
+
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, buckets: int) -> None:
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+def _labels(labels: Tuple[Tuple[str, Any], ...]) -> str:
+    if not labels:
+        return ''
+    inner = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for name, value in labels
+    )
+    return '{' + inner + '}'
+
+
+class PrometheusMetrics(Instrumentation):
+    """Aggregates request records into Prometheus metrics:
+
+        pyloniex_request_seconds           histogram by client, command
+        pyloniex_request_phase_seconds     histogram by client, command, phase
+        pyloniex_responses_total           counter by client, command, status
+        pyloniex_errors_total              counter by client, command (no response)
+        pyloniex_retries_total             counter by client, command
+        pyloniex_sent_bytes_total          counter by client, command
+        pyloniex_received_bytes_total      counter by client, command
+        pyloniex_requests_waiting          gauge
+    """
+
+    def __init__(self, *, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self._buckets = tuple(sorted(buckets))
+        self._lock = Lock()
+        self._histograms: Dict[str, Dict[Tuple[Tuple[str, Any], ...], _Histogram]] = {
+            'pyloniex_request_seconds': {},
+            'pyloniex_request_phase_seconds': {},
+        }
+        self._counters: Dict[str, Dict[Tuple[Tuple[str, Any], ...], float]] = {
+            'pyloniex_responses_total': {},
+            'pyloniex_errors_total': {},
+            'pyloniex_retries_total': {},
+            'pyloniex_sent_bytes_total': {},
+            'pyloniex_received_bytes_total': {},
+        }
+        self._waiting = 0
+
+    def _observe(self, name: str, labels: Tuple[Tuple[str, Any], ...], value: float) -> None:
+        histograms = self._histograms[name]
+        histogram = histograms.get(labels)
+        if histogram is None:
+            histogram = histograms[labels] = _Histogram(len(self._buckets))
+        i = bisect_left(self._buckets, value)
+        if i < len(self._buckets):
+            histogram.counts[i] += 1
+        histogram.sum += value
+        histogram.count += 1
+
+    def _increment(self, name: str, labels: Tuple[Tuple[str, Any], ...], value: float = 1) -> None:
+        counters = self._counters[name]
+        counters[labels] = counters.get(labels, 0) + value
+
+    def finished(self, record: RequestRecord) -> None:
+        labels = (('client', record.client), ('command', record.command))
+        with self._lock:
+            if record.duration is not None:
+                self._observe('pyloniex_request_seconds', labels, record.duration)
+            for phase, seconds in record.phases.items():
+                self._observe('pyloniex_request_phase_seconds', labels + (('phase', phase),), seconds)
+            if record.status is not None:
+                self._increment('pyloniex_responses_total', labels + (('status', record.status),))
+            elif record.error is not None:
+                self._increment('pyloniex_errors_total', labels)
+            self._increment('pyloniex_sent_bytes_total', labels, record.bytes_out)
+            self._increment('pyloniex_received_bytes_total', labels, record.bytes_in)
+
+    def retried(self, client: str, command: Optional[str], error: Optional[BaseException]) -> None:
+        with self._lock:
+            self._increment('pyloniex_retries_total', (('client', client), ('command', command)))
+
+    def waiting(self, delta: int) -> None:
+        with self._lock:
+            self._waiting += delta
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self._lock:
+            for name, histograms in self._histograms.items():
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(histograms.items(), key=lambda item: str(item[0])):
+                    cumulative = 0
+                    for bound, count in zip(self._buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_labels(labels + (("le", bound),))} {cumulative}')
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {histogram.count}')
+                    lines.append(f'{name}_sum{_labels(labels)} {histogram.sum}')
+                    lines.append(f'{name}_count{_labels(labels)} {histogram.count}')
+            for name, counters in self._counters.items():
+                lines.append(f'# TYPE {name} counter')
+                for labels, value in sorted(counters.items(), key=lambda item: str(item[0])):
+                    lines.append(f'{name}{_labels(labels)} {value}')
+            lines.append('# TYPE pyloniex_requests_waiting gauge')
+            lines.append(f'pyloniex_requests_waiting {self._waiting}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""Nonce allocation and ordered dispatch for private requests.
+
+Poloniex rejects a private request whose nonce isn't greater than the last one
+it saw for the same key. Handing out unique, increasing nonces is therefore
+not enough: requests also have to reach the server in nonce order.
+
+A NonceDispatcher takes care of both. By default it holds its allocator's
+lock from the moment a nonce is handed out until the response to the request
+carrying it has arrived, so that the server has processed each nonce before
+it sees the next one; nothing is rejected, but a key's private requests take
+one round trip each.
+
+A pipelined dispatcher lets the next request go as soon as the previous one
+has been written to the wire, so round trips overlap. Requests on different
+connections can then still be read by the server out of order, and the odd
+one rejected; the retry policy sends those again right away, with a new
+nonce.
+
+Coroutines never block their event loop on an allocator's lock: those on one
+loop queue on an asyncio lock shared by every dispatcher using the allocator,
+and wait for the allocator itself (which threads may hold) on an executor
+thread.
+"""
+import fcntl
+import os
+import struct
+from abc import ABCMeta
+from abc import abstractmethod
+from threading import Lock
+from threading import local
+from time import time
+from typing import Any
+from typing import Callable
+from typing import Optional
+from typing import TYPE_CHECKING
+from typing import TypeVar
+from weakref import WeakKeyDictionary
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+T = TypeVar('T')
+
+_local = local()
+
+
+def _now() -> int:
+    """Nonces are derived from the time in microseconds, so that they keep
+    increasing even if the persisted high-water mark is lost.
+    """
+    return int(time() * 1000000)
+
+
+class BaseNonceAllocator(metaclass=ABCMeta):
+    """Hands out strictly increasing nonces.
+
+    `acquire` returns the next nonce and holds the allocator's lock until
+    `release` is called, so that nobody can use a later nonce in between.
+    """
+
+    @abstractmethod
+    def acquire(self) -> int:
+        pass
+
+    @abstractmethod
+    def release(self) -> None:
+        pass
+
+    def try_acquire(self) -> Optional[int]:
+        """Like `acquire`, but returns None right away if the lock is held."""
+        return None
+
+    def next(self) -> int:
+        nonce = self.acquire()
+        self.release()
+        return nonce
+
+
+class NonceAllocator(BaseNonceAllocator):
+    """Nonces that are unique and increasing within one process."""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._last = 0
+
+    def acquire(self) -> int:
+        self._lock.acquire()
+        return self._bump()
+
+    def try_acquire(self) -> Optional[int]:
+        if not self._lock.acquire(blocking=False):
+            return None
+        return self._bump()
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def _bump(self) -> int:
+        self._last = max(self._last + 1, _now())
+        return self._last
+
+
+class FileNonceAllocator(BaseNonceAllocator):
+    """Nonces that are unique and increasing across every process that uses
+    the same `path`, and across restarts. The last nonce handed out is kept in
+    the file, which is locked while a nonce is in flight.
+    """
+
+    _mark = struct.Struct('<Q')
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        # fcntl locks are held per process, so threads need their own lock
+        self._lock = Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+    def acquire(self) -> int:
+        self._lock.acquire()
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX)
+        except BaseException:
+            self._lock.release()
+            raise
+        return self._bump()
+
+    def try_acquire(self) -> Optional[int]:
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Another process has it
+            self._lock.release()
+            return None
+        except BaseException:
+            self._lock.release()
+            raise
+        return self._bump()
+
+    def _bump(self) -> int:
+        try:
+            raw = os.pread(self._fd, self._mark.size, 0)
+            last = self._mark.unpack(raw)[0] if len(raw) == self._mark.size else 0
+            nonce = max(last + 1, _now())
+            os.pwrite(self._fd, self._mark.pack(nonce), 0)
+        except BaseException:
+            self.release()
+            raise
+        return nonce
+
+    def release(self) -> None:
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN)
+        finally:
+            self._lock.release()
+
+
+# Per allocator, the asyncio lock that coroutines on each event loop queue on
+_loop_locks: Any = WeakKeyDictionary()
+
+
+def _loop_lock(allocator: BaseNonceAllocator) -> 'asyncio.Lock':
+    import asyncio
+    loop = asyncio.get_running_loop()
+    locks = _loop_locks.get(allocator)
+    if locks is None:
+        locks = _loop_locks[allocator] = WeakKeyDictionary()
+    lock = locks.get(loop)
+    if lock is None:
+        lock = locks[loop] = asyncio.Lock()
+    return lock
+
+
+async def _acquire_async(allocator: BaseNonceAllocator) -> int:
+    """Acquire `allocator` without blocking the event loop. The caller must
+    hold its loop lock.
+    """
+    nonce = allocator.try_acquire()
+    if nonce is not None:
+        return nonce
+    # Held by another thread or process
+    import asyncio
+    future = asyncio.get_running_loop().run_in_executor(None, allocator.acquire)
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        def release(future: 'asyncio.Future[int]') -> None:
+            if not future.cancelled() and future.exception() is None:
+                allocator.release()
+
+        future.add_done_callback(release)
+        raise
+
+
+async def next_async(allocator: BaseNonceAllocator) -> int:
+    """Coroutine flavor of `allocator.next()`, safe to use on an event loop
+    that also dispatches private requests.
+    """
+    async with _loop_lock(allocator):
+        nonce = await _acquire_async(allocator)
+        allocator.release()
+    return nonce
+
+
+def notify_sent() -> None:
+    """Called by the transport once a request dispatched from this thread has
+    been written out, allowing the next request to be sent.
+    """
+    callback = getattr(_local, 'on_sent', None)
+    if callback is not None:
+        callback()
+
+
+def _ignore() -> None:
+    pass
+
+
+class NonceDispatcher:
+    """Sends requests in nonce order.
+
+    `dispatch` allocates a nonce and calls `send` with it. The allocator stays
+    locked until `send` returns or, if `pipelined`, until the transport
+    reports (through `notify_sent`, or the callback passed to `send` by
+    `dispatch_async`) that the request has been written.
+    """
+
+    def __init__(self, allocator: BaseNonceAllocator, *, pipelined: bool = False) -> None:
+        self._allocator = allocator
+        self.pipelined = pipelined
+
+    @property
+    def allocator(self) -> BaseNonceAllocator:
+        return self._allocator
+
+    def _releaser(self) -> Callable[[], None]:
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                self._allocator.release()
+
+        return release
+
+    def dispatch(self, send: Callable[[int], T]) -> T:
+        nonce = self._allocator.acquire()
+        release = self._releaser()
+        previous = getattr(_local, 'on_sent', None)
+        _local.on_sent = release if self.pipelined else None
+        try:
+            return send(nonce)
+        finally:
+            _local.on_sent = previous
+            release()
+
+    async def dispatch_async(self, send: Callable[[int, Callable[[], None]], T]) -> T:
+        """Coroutine flavor of `dispatch`. `send` must be a coroutine function
+        taking the nonce and a callback to call once the request is written.
+        """
+        lock = _loop_lock(self._allocator)
+        await lock.acquire()
+        try:
+            nonce = await _acquire_async(self._allocator)
+        except BaseException:
+            lock.release()
+            raise
+        release_allocator = self._releaser()
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            if not released:
+                released = True
+                release_allocator()
+                lock.release()
+
+        try:
+            return await send(nonce, release if self.pipelined else _ignore)  # type: ignore
+        finally:
+            release()
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""Order books kept up to date in memory.
+
+An OrderBook is loaded from a snapshot (returnOrderBook, or the 'i' update
+that opens a push API order book channel) and then changed one price level
+at a time, either by push API messages or by syncing it with a newer
+snapshot. Each side keeps its prices sorted, best first, so the best price,
+the top N levels and the depth up to some price are read off directly:
+
+    book = OrderBook('BTC_ETH')
+    async for message in await push.subscribe('BTC_ETH'):
+        try:
+            book.apply(message)
+        except SequenceGap:
+            book.load(await public.return_order_book(currency_pair='BTC_ETH'))
+
+Prices and amounts are floats by default. Poloniex quotes both with 8
+decimal places, which floats represent without two prices ever colliding.
+Like the clients, a book takes `numbers='decimal'` or `numbers='scaled'` to
+keep them as Decimals or as int counts of 10 ** -price_scale instead
+(see pyloniex.decoding). Snapshots may be given as returned by a client in
+any number mode.
+
+Each price level update costs a binary search plus, when a level is added
+or removed, a shift of the list of prices behind it (see BookSide).
+"""
+from bisect import bisect_left
+from bisect import bisect_right
+from bisect import insort
+from itertools import islice
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from pyloniex.decoding import PRICE_SCALE
+from pyloniex.decoding import number_parser
+from pyloniex.decoding import unwrap
+
+
+# (price, amount), as floats, Decimals or scaled ints
+Level = Tuple[Any, Any]
+
+
+class SequenceGap(ValueError):
+    """An update arrived out of order, so at least one was missed and the
+    book has to be loaded from a new snapshot.
+    """
+
+    def __init__(self, expected: Optional[int], received: int) -> None:
+        super().__init__(f'Expected update {expected}, got {received}')
+        self.expected = expected
+        self.received = received
+
+
+class BookSide:
+    """The price levels on one side of a book, best first.
+
+    Prices are kept in a list sorted by binary search, alongside a dict of
+    the amount at each price. Finding a level is O(log n); adding or removing
+    one also shifts the tail of the list, which for books of realistic size
+    is a single, fast memmove.
+    """
+
+    def __init__(self, *, descending: bool) -> None:
+        # Bids are stored negated, so that both sides sort best first
+        self._sign = -1 if descending else 1
+        self._keys: List[Any] = []
+        self._amounts: Dict[Any, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[Level]:
+        sign, amounts = self._sign, self._amounts
+        for key in self._keys:
+            price = sign * key
+            yield price, amounts[price]
+
+    def __getitem__(self, price: Any) -> Any:
+        return self._amounts.get(price, 0)
+
+    def set(self, price: Any, amount: Any) -> None:
+        """Set the amount at `price`; an amount of zero removes the level."""
+        if amount:
+            if price not in self._amounts:
+                insort(self._keys, self._sign * price)
+            self._amounts[price] = amount
+        elif price in self._amounts:
+            del self._amounts[price]
+            del self._keys[bisect_left(self._keys, self._sign * price)]
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._amounts.clear()
+
+    def best(self) -> Optional[Level]:
+        if not self._keys:
+            return None
+        price = self._sign * self._keys[0]
+        return price, self._amounts[price]
+
+    def top(self, n: int) -> List[Level]:
+        return list(islice(self, n))
+
+    def depth(self, *, price: Any = None, levels: Optional[int] = None) -> Any:
+        """The total amount at `price` or better, or in the best `levels`
+        levels (or on the whole side, given neither).
+        """
+        end = len(self._keys)
+        if price is not None:
+            end = bisect_right(self._keys, self._sign * price)
+        if levels is not None:
+            end = min(end, levels)
+        sign, amounts = self._sign, self._amounts
+        return sum(amounts[sign * key] for key in islice(self._keys, end))
+
+    def _sync(self, levels: Iterable[Tuple[Any, Any]], parse: Callable[[Any], Any]) -> None:
+        latest = {parse(price): parse(amount) for price, amount in levels}
+        if not latest:
+            self.clear()
+            return
+        # A snapshot may be cut off at some depth, so it only says which
+        # levels are gone up to its worst price
+        worst = max(self._sign * price for price in latest)
+        end = bisect_right(self._keys, worst)
+        for key in self._keys[:end]:
+            price = self._sign * key
+            if price not in latest:
+                self.set(price, 0)
+        for price, amount in latest.items():
+            if self._amounts.get(price) != amount:
+                self.set(price, amount)
+
+
+class OrderBook:
+
+    def __init__(
+        self,
+        currency_pair: Optional[str] = None,
+        *,
+        numbers: Optional[str] = None,
+        price_scale: int = PRICE_SCALE,
+    ) -> None:
+        self.currency_pair = currency_pair
+        self._parse = number_parser(numbers, price_scale)
+        self.asks = BookSide(descending=False)
+        self.bids = BookSide(descending=True)
+        # Sequence number of the last update applied; None until loaded
+        self.sequence: Optional[int] = None
+
+    def __repr__(self) -> str:
+        return (
+            f'<OrderBook {self.currency_pair} seq={self.sequence} '
+            f'bid={self.best_bid} ask={self.best_ask}>'
+        )
+
+    @property
+    def best_bid(self) -> Optional[Level]:
+        return self.bids.best()
+
+    @property
+    def best_ask(self) -> Optional[Level]:
+        return self.asks.best()
+
+    def top(self, n: int) -> Dict[str, List[Level]]:
+        return {'asks': self.asks.top(n), 'bids': self.bids.top(n)}
+
+    def load(self, snapshot: Dict[str, Any]) -> None:
+        """Replace the book with a returnOrderBook snapshot for its pair."""
+        # Numbers as Poloniex sent them, whatever the client's `numbers`
+        snapshot = unwrap(snapshot)
+        parse = self._parse
+        for side, levels in ((self.asks, snapshot['asks']), (self.bids, snapshot['bids'])):
+            side.clear()
+            for price, amount in levels:
+                side.set(parse(price), parse(amount))
+        self.sequence = snapshot.get('seq')
+
+    def sync(self, snapshot: Dict[str, Any]) -> None:
+        """Bring the book up to date with a newer returnOrderBook snapshot,
+        changing only the levels that differ. Snapshots no newer than the
+        book are ignored.
+        """
+        snapshot = unwrap(snapshot)
+        seq = snapshot.get('seq')
+        if seq is not None and self.sequence is not None and seq <= self.sequence:
+            return
+        self.asks._sync(snapshot['asks'], self._parse)
+        self.bids._sync(snapshot['bids'], self._parse)
+        self.sequence = seq
+
+    def apply(self, message: List[Any]) -> List[List[Any]]:
+        """Apply a push API order book message, returning the trades
+        ('t' updates) it carried.
+
+        Messages at or before the book's sequence number are ignored, so a
+        feed can be replayed onto a snapshot taken while it was running.
+        Raises SequenceGap if messages were missed.
+        """
+        _, sequence, updates = message
+        if updates and updates[0][0] == 'i':
+            snapshot = updates[0][1]
+            self.currency_pair = snapshot.get('currencyPair', self.currency_pair)
+            asks, bids = snapshot['orderBook']
+            self.load({'asks': asks.items(), 'bids': bids.items(), 'seq': sequence})
+            return []
+
+        if self.sequence is not None and sequence <= self.sequence:
+            return []
+        if self.sequence is None or sequence != self.sequence + 1:
+            raise SequenceGap(None if self.sequence is None else self.sequence + 1, sequence)
+
+        trades = []
+        for update in updates:
+            kind = update[0]
+            if kind == 'o':
+                side = self.bids if update[1] else self.asks
+                side.set(self._parse(update[2]), self._parse(update[3]))
+            elif kind == 't':
+                trades.append(update)
+        self.sequence = sequence
+        return trades
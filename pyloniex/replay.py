@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""Recording and replaying the HTTP exchanges of the blocking clients, for
+deterministic offline backtests.
+
+Clients hand every prepared request to their `transport`. A Recorder sends
+it as usual and appends the exchange to a gzipped JSON lines log: method,
+URL, parameters (less the nonce; the Key and Sign headers aren't kept),
+status, response headers and body, and timing.
+
+    with Recorder('session.jsonl.gz') as recorder:
+        public = PoloniexPublicAPI(transport=recorder)
+        ...
+
+A Replayer serves the recorded responses back without touching the network.
+Requests are matched on their path and parameters; identical requests get
+the responses recorded for them in the order they were recorded. Replaying
+clients skip the rate limiter (or scheduler) and don't back off between
+retries. By default responses come back immediately; with `time_scale` they
+take their recorded latency times `time_scale` (1 for real time, 0.1 for ten
+times faster).
+
+    public = PoloniexPublicAPI(transport=Replayer('session.jsonl.gz'))
+"""
+import gzip
+import json
+from collections import defaultdict
+from collections import deque
+from threading import Lock
+from time import monotonic
+from time import sleep
+from time import time
+from typing import Any
+from typing import Deque
+from typing import Dict
+from urllib.parse import parse_qsl
+from urllib.parse import urlsplit
+
+from requests import PreparedRequest
+from requests import Response
+from requests import Session
+from requests.structures import CaseInsensitiveDict
+
+from pyloniex.cache import cache_key
+
+
+# Parameters that differ on every run, and so are neither recorded nor
+# matched on
+VOLATILE_PARAMS = frozenset(['nonce'])
+
+# Response headers that aren't worth keeping
+DROPPED_HEADERS = frozenset(['set-cookie'])
+
+
+class NotRecorded(LookupError):
+    """Raised when replaying a request that has no (more) recorded responses."""
+
+    def __init__(self, key: str) -> None:
+        super().__init__(f'No recorded response left for {key}')
+        self.key = key
+
+
+def request_params(request: PreparedRequest) -> Dict[str, str]:
+    """The parameters of a prepared request, from its query string or its
+    form-encoded body, less the volatile ones.
+    """
+    body = request.body or ''
+    encoded: str = body.decode('utf-8') if isinstance(body, bytes) else body  # type: ignore
+    if not encoded:
+        encoded = urlsplit(request.url).query  # type: ignore
+    return {
+        k: v
+        for k, v in parse_qsl(encoded, keep_blank_values=True)
+        if k not in VOLATILE_PARAMS
+    }
+
+
+def replay_key(method: str, url: str, params: Dict[str, Any]) -> str:
+    """What requests are matched on; the host is left out, so that logs
+    recorded against one host replay against another.
+    """
+    return f'{method} {urlsplit(url).path}?{cache_key(params)}'
+
+
+class Transport:
+    """Sends prepared requests for a client over its session."""
+
+    # Whether responses come from somewhere other than the exchange, in which
+    # case there's no point in rate limiting or backing off
+    replaying = False
+
+    def send(self, session: Session, request: PreparedRequest, stream: bool = False) -> Response:
+        return session.send(request, stream=stream)
+
+
+class Recorder(Transport):
+    """Sends requests over the session and appends each exchange to the log
+    at `path`. Streamed responses are read in full before they're returned.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._lock = Lock()
+        self._file = gzip.open(path, 'ab')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def send(self, session: Session, request: PreparedRequest, stream: bool = False) -> Response:
+        timestamp = time()
+        start = monotonic()
+        response = session.send(request, stream=stream)
+        content = response.content
+        elapsed = monotonic() - start
+
+        entry = {
+            'time': timestamp,
+            'elapsed': elapsed,
+            'method': request.method,
+            'url': urlsplit(request.url).path,
+            'params': request_params(request),
+            'status': response.status_code,
+            'headers': {
+                k: v for k, v in response.headers.items()
+                if k.lower() not in DROPPED_HEADERS
+            },
+            # surrogateescape round-trips any bytes that aren't UTF-8
+            'body': content.decode('utf-8', 'surrogateescape'),
+        }
+        line = json.dumps(entry, separators=(',', ':')).encode('utf-8') + b'\n'
+        with self._lock:
+            self._file.write(line)
+            # Each line is flushed, so that a crash loses at most the last one
+            self._file.flush()
+        return response
+
+
+class Replayer(Transport):
+    """Serves the responses recorded in the log at `path`."""
+
+    replaying = True
+
+    def __init__(self, path: str, *, time_scale: float = 0) -> None:
+        self._time_scale = time_scale
+        self._lock = Lock()
+        self._responses: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for entry in self._load(path):
+            key = replay_key(entry['method'], entry['url'], entry['params'])
+            self._responses[key].append(entry)
+
+    @staticmethod
+    def _load(path: str):
+        with gzip.open(path, 'rb') as f:
+            try:
+                for line in f:
+                    if line.endswith(b'\n'):
+                        yield json.loads(line)
+            except EOFError:
+                # The recording process died mid-write; everything up to
+                # the last flushed line is intact
+                pass
+
+    def remaining(self) -> int:
+        """How many recorded responses haven't been served yet."""
+        with self._lock:
+            return sum(len(entries) for entries in self._responses.values())
+
+    def send(self, session: Session, request: PreparedRequest, stream: bool = False) -> Response:
+        key = replay_key(request.method, request.url, request_params(request))  # type: ignore
+        with self._lock:
+            entries = self._responses.get(key)
+            if not entries:
+                raise NotRecorded(key)
+            entry = entries.popleft()
+
+        if self._time_scale:
+            sleep(entry['elapsed'] * self._time_scale)
+
+        response = Response()
+        response.status_code = entry['status']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response._content = entry['body'].encode('utf-8', 'surrogateescape')
+        # Lets streamed reads come out of _content
+        response._content_consumed = True  # type: ignore
+        response.url = request.url  # type: ignore
+        response.request = request
+        return response
@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""Priority scheduling of requests in front of a rate limiter.
+
+A rate limiter on its own hands out tokens first come, first served, so an
+urgent cancelOrder can end up waiting behind a backfill's worth of queued
+returnTradeHistory calls. A RequestScheduler instead decides who gets each
+token at the moment it becomes available: the oldest waiter of the most
+urgent priority class, taking turns between commands within a class.
+
+Waiting requests can also be given a deadline, per class or per call, and
+are dropped with RequestExpired once it passes:
+
+    scheduler = RequestScheduler(RateLimiter(6, 1, 1), max_wait={Priority.market_data: 5})
+    public = PoloniexPublicAPI(scheduler=scheduler)
+    private = PoloniexPrivateAPI(key=key, secret=secret, scheduler=scheduler)
+
+    with scheduler.deadline(2):
+        private.cancel_order(order_number=order_number)
+
+Clients sharing a scheduler share its rate limit.
+"""
+from collections import OrderedDict
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from threading import Condition
+from time import monotonic
+from typing import Deque
+from typing import Dict
+from typing import Iterator
+from typing import Optional
+
+from pyloniex.utils import BaseRateLimiter
+
+
+class Priority(IntEnum):
+    trading = 0
+    account = 1
+    market_data = 2
+    history = 3
+
+
+COMMAND_PRIORITIES = {
+    # Order entry and cancellation
+    'buy': Priority.trading,
+    'sell': Priority.trading,
+    'cancelOrder': Priority.trading,
+    'moveOrder': Priority.trading,
+    'marginBuy': Priority.trading,
+    'marginSell': Priority.trading,
+    'closeMarginPosition': Priority.trading,
+    'createLoanOffer': Priority.trading,
+    'cancelLoanOffer': Priority.trading,
+    'toggleAutoRenew': Priority.trading,
+    # Account state
+    'returnBalances': Priority.account,
+    'returnCompleteBalances': Priority.account,
+    'returnAvailableAccountBalances': Priority.account,
+    'returnTradableBalances': Priority.account,
+    'returnMarginAccountSummary': Priority.account,
+    'getMarginPosition': Priority.account,
+    'returnOpenOrders': Priority.account,
+    'returnOrderTrades': Priority.account,
+    'returnOpenLoanOffers': Priority.account,
+    'returnActiveLoans': Priority.account,
+    'returnFeeInfo': Priority.account,
+    'returnDepositAddresses': Priority.account,
+    'generateNewAddress': Priority.account,
+    'transferBalance': Priority.account,
+    'withdraw': Priority.account,
+    # Market data
+    'returnTicker': Priority.market_data,
+    'return24hVolume': Priority.market_data,
+    'returnOrderBook': Priority.market_data,
+    'returnCurrencies': Priority.market_data,
+    'returnLoanOrders': Priority.market_data,
+    # History
+    'returnTradeHistory': Priority.history,
+    'returnChartData': Priority.history,
+    'returnLendingHistory': Priority.history,
+    'returnDepositsWithdrawals': Priority.history,
+}
+
+
+class RequestExpired(Exception):
+    """A request was dropped because its deadline passed while it was
+    waiting to be sent.
+    """
+
+    def __init__(self, command: Optional[str], waited: float) -> None:
+        super().__init__(f'{command} expired after waiting {waited:.3f}s')
+        self.command = command
+        self.waited = waited
+
+
+class _Ticket:
+
+    __slots__ = ('priority', 'command', 'created', 'deadline', 'granted', 'expired')
+
+    def __init__(self, priority: Priority, command: Optional[str], deadline: Optional[float]) -> None:
+        self.priority = priority
+        self.command = command
+        self.created = monotonic()
+        self.deadline = deadline
+        self.granted = False
+        self.expired = False
+
+
+class RequestScheduler:
+    """Hands out the tokens of `limiter` (under `key`) to waiting requests
+    in priority order. All methods are safe to call from multiple threads.
+
+    `max_wait` gives, per priority class, how many seconds a request may wait
+    before it is dropped; classes not listed wait as long as it takes.
+    """
+
+    def __init__(
+        self,
+        limiter: BaseRateLimiter,
+        *,
+        key: str = 'RequestScheduler',
+        max_wait: Optional[Dict[Priority, float]] = None,
+        priorities: Optional[Dict[str, Priority]] = None,
+    ) -> None:
+        self.limiter = limiter
+        self._key = key
+        self._max_wait = {} if max_wait is None else max_wait
+        self._priorities = COMMAND_PRIORITIES if priorities is None else priorities
+        self._condition = Condition()
+        # Per class, a queue of waiting tickets per command, in the order
+        # the commands take turns
+        self._queues: Dict[Priority, OrderedDict[Optional[str], Deque[_Ticket]]] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        # Whether some waiting thread is already drawing tokens for the rest
+        self._dispatching = False
+        # When the token already reserved becomes available, if there is one
+        self._ready_at: Optional[float] = None
+        # A ContextVar rather than a thread local, so that requests run on
+        # other threads with the caller's context (hedges) keep its deadline
+        self._deadline: ContextVar[Optional[float]] = ContextVar(f'pyloniex_deadline_{id(self)}', default=None)
+
+    def priority(self, command: Optional[str]) -> Priority:
+        return self._priorities.get(command, Priority.market_data)  # type: ignore
+
+    def queued(self) -> Dict[Priority, int]:
+        """The number of waiting requests in each class."""
+        with self._condition:
+            return {
+                priority: sum(len(tickets) for tickets in flows.values())
+                for priority, flows in self._queues.items()
+            }
+
+    @contextmanager
+    def deadline(self, seconds: float) -> Iterator[None]:
+        """Drop requests made by this thread inside the block if they can't
+        be sent within `seconds` of entering it.
+        """
+        previous = self._deadline.get()
+        deadline = monotonic() + seconds
+        if previous is not None:
+            deadline = min(deadline, previous)
+        token = self._deadline.set(deadline)
+        try:
+            yield
+        finally:
+            self._deadline.reset(token)
+
+    def acquire(self, command: Optional[str]) -> None:
+        """Block until it is this request's turn to be sent. Raises
+        RequestExpired if its deadline passes first.
+        """
+        priority = self.priority(command)
+        deadline = self._deadline.get()
+        max_wait = self._max_wait.get(priority)
+        if max_wait is not None:
+            expires = monotonic() + max_wait
+            deadline = expires if deadline is None else min(deadline, expires)
+        ticket = _Ticket(priority, command, deadline)
+
+        dispatcher = False
+        with self._condition:
+            flows = self._queues[priority]
+            flows.setdefault(command, deque()).append(ticket)
+            self._condition.notify_all()
+            while not ticket.granted and not ticket.expired and self._dispatching:
+                timeout = None if deadline is None else deadline - monotonic()
+                if timeout is not None and timeout <= 0:
+                    self._expire(ticket)
+                    break
+                self._condition.wait(timeout)
+            if not ticket.granted and not ticket.expired:
+                self._dispatching = dispatcher = True
+
+        if dispatcher:
+            self._dispatch(ticket)
+
+        if ticket.expired:
+            raise RequestExpired(command, monotonic() - ticket.created)
+
+    def try_acquire(self, command: Optional[str]) -> bool:
+        """Take a token for a request only if one is free right now and no
+        other request is waiting for it.
+        """
+        with self._condition:
+            if self._dispatching:
+                return False
+            if self._ready_at is not None:
+                if self._ready_at > monotonic():
+                    return False
+                self._ready_at = None
+                return True
+            return self.limiter.acquire(self._key, timeout=0)
+
+    def _dispatch(self, own: _Ticket) -> None:
+        # Draw tokens one at a time, each going to whoever is most urgent
+        # once it is available, until this thread's own turn comes (or its
+        # deadline passes, in which case another waiter takes over)
+        try:
+            with self._condition:
+                while True:
+                    now = monotonic()
+                    for flows in self._queues.values():
+                        for tickets in list(flows.values()):
+                            for ticket in list(tickets):
+                                if ticket.deadline is not None and ticket.deadline <= now:
+                                    self._expire(ticket)
+                    if own.expired:
+                        return
+
+                    if self._ready_at is None:
+                        # Only reserve a token that some waiter will still be
+                        # around for
+                        horizon = self._horizon()
+                        max_wait = None if horizon is None else horizon - now
+                        wait = self.limiter._take(self._key, 1, max_wait)
+                        if wait is not None:
+                            self._ready_at = now + wait
+
+                    if self._ready_at is not None and self._ready_at <= now:
+                        chosen = self._next()
+                        if chosen is not None:
+                            chosen.granted = True
+                            # Otherwise the token is kept for the next request
+                            self._ready_at = None
+                        self._condition.notify_all()
+                        if own.granted:
+                            return
+                        continue
+
+                    wake = [t for t in (self._ready_at, own.deadline) if t is not None]
+                    # New arrivals notify, in case they change the horizon
+                    self._condition.wait(min(wake) - now if wake else None)
+        finally:
+            with self._condition:
+                self._dispatching = False
+                self._condition.notify_all()
+
+    def _horizon(self) -> Optional[float]:
+        """The latest deadline of any waiting request; None if some request
+        waits as long as it takes.
+        """
+        latest = 0.0
+        for flows in self._queues.values():
+            for tickets in flows.values():
+                for ticket in tickets:
+                    if ticket.deadline is None:
+                        return None
+                    latest = max(latest, ticket.deadline)
+        return latest
+
+    def _expire(self, ticket: _Ticket) -> None:
+        flows = self._queues[ticket.priority]
+        tickets = flows[ticket.command]
+        tickets.remove(ticket)
+        if not tickets:
+            del flows[ticket.command]
+        ticket.expired = True
+
+    def _next(self) -> Optional[_Ticket]:
+        for flows in self._queues.values():
+            if not flows:
+                continue
+            command, tickets = next(iter(flows.items()))
+            ticket = tickets.popleft()
+            if tickets:
+                flows.move_to_end(command)
+            else:
+                del flows[command]
+            return ticket
+        return None
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Incremental decoding of large JSON responses.
+
+Instead of holding the whole body (and then the whole decoded document) in
+memory, JSONStreamParser is fed the body a chunk at a time and hands back each
+member of the top-level array (or each key, value pair of the top-level
+object) as soon as it is complete.
+"""
+import codecs
+import json
+from typing import Any
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+
+_WHITESPACE = ' \t\n\r'
+
+_NUMBER = '0123456789.eE+-'
+
+_CLOSE = {'[': ']', '{': '}'}
+
+
+class UnexpectedJSON(ValueError):
+    """The top-level value wasn't the container the parser was told to
+    expect; `document` holds whatever it was instead (usually an error object
+    from Poloniex).
+    """
+
+    def __init__(self, document: Any) -> None:
+        super().__init__(f'Unexpected JSON document: {document!r}')
+        self.document = document
+
+
+class _Incomplete(Exception):
+    pass
+
+
+class JSONStreamParser:
+
+    def __init__(self, container: str = '[') -> None:
+        if container not in _CLOSE:
+            raise ValueError(f'Unsupported container {container!r}')
+        self._container = container
+        self._close = _CLOSE[container]
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._opened = False
+        self._closed = False
+        self._other = False
+        self._first = True
+        # After failing to decode a partial member, hold off until the buffer
+        # has doubled, so that big members don't get re-scanned every chunk
+        self._wait_for = 0
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """Add the next chunk of the body, returning the members it completed."""
+        self._buffer = self._buffer[self._pos:] + self._utf8.decode(chunk)
+        self._pos = 0
+        if len(self._buffer) < self._wait_for:
+            return []
+        return self._parse(final=False)
+
+    def close(self) -> List[Any]:
+        """Signal the end of the body, returning any members that were still
+        pending. Raises ValueError if the document is incomplete.
+        """
+        self._buffer = self._buffer[self._pos:] + self._utf8.decode(b'', final=True)
+        self._pos = 0
+        items = self._parse(final=True)
+        if not self._closed:
+            raise ValueError('Truncated JSON document')
+        return items
+
+    def _skip(self, i: int) -> int:
+        buffer = self._buffer
+        while i < len(buffer) and buffer[i] in _WHITESPACE:
+            i += 1
+        if i >= len(buffer):
+            raise _Incomplete()
+        return i
+
+    def _number_tail(self, i: int) -> bool:
+        """Whether the buffer ends with what may be the rest of a number that
+        was cut short (e.g. "2." of "2.5").
+        """
+        return all(c in _NUMBER for c in self._buffer[i:])
+
+    def _decode(self, i: int, final: bool) -> Tuple[Any, int]:
+        try:
+            return self._decoder.raw_decode(self._buffer, i)
+        except json.JSONDecodeError:
+            # Most likely the value just hasn't fully arrived yet
+            if final:
+                raise
+            raise _Incomplete()
+
+    def _parse(self, final: bool) -> List[Any]:
+        items: List[Any] = []
+        try:
+            if not self._opened:
+                i = self._skip(self._pos)
+                if self._buffer[i] != self._container:
+                    self._other = True
+                self._opened = True
+                self._pos = i if self._other else i + 1
+
+            if self._other:
+                # Not what we expected; wait for the rest and decode it whole
+                if final:
+                    raise UnexpectedJSON(json.loads(self._buffer[self._pos:]))
+                return items
+
+            while not self._closed:
+                i = self._skip(self._pos)
+                if self._first and self._buffer[i] == self._close:
+                    self._pos = i + 1
+                    self._closed = True
+                    break
+
+                if self._container == '{':
+                    key, i = self._decode(i, final)
+                    i = self._skip(i)
+                    if self._buffer[i] != ':':
+                        raise ValueError(f'Expected ":" at position {i}')
+                    value, i = self._decode(self._skip(i + 1), final)
+                    item: Any = (key, value)
+                else:
+                    item, i = self._decode(i, final)
+
+                # Only a following delimiter proves that a value (a number,
+                # say) wasn't cut short by the end of the chunk
+                i = self._skip(i)
+                if self._buffer[i] == self._close:
+                    self._closed = True
+                elif self._buffer[i] != ',':
+                    if not final and self._number_tail(i):
+                        raise _Incomplete()
+                    raise ValueError(f'Expected "," or "{self._close}" at position {i}')
+
+                items.append(item)
+                self._pos = i + 1
+                self._first = False
+            self._wait_for = 0
+        except _Incomplete:
+            if final:
+                raise ValueError('Truncated JSON document')
+            self._wait_for = 2 * (len(self._buffer) - self._pos)
+        return items
+
+
+def iter_json(chunks: Iterable[bytes], container: str = '[') -> Iterator[Any]:
+    """Yield the members of the top-level `container` of the JSON document
+    made up by `chunks`: values for an array, (key, value) pairs for an
+    object.
+    """
+    parser = JSONStreamParser(container)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
@@ -1,9 +1,33 @@
 # -*- coding: utf-8 -*-
+from abc import ABCMeta
+from abc import abstractmethod
 from collections import OrderedDict
+from collections import deque
+from concurrent.futures import Future
+from decimal import Decimal
+from threading import Lock
+from time import monotonic
+from time import sleep
 from time import time
 from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Deque
 from typing import Dict
+from typing import List
+from typing import Optional
+from typing import TYPE_CHECKING
 from typing import Tuple
+from typing import TypeVar
+
+from pyloniex.encoding import Scaled
+from pyloniex.encoding import format_value
+
+if TYPE_CHECKING:
+    import asyncio
+
+
+T = TypeVar('T')
 
 
 def protect_floats(params: Dict[str, Any]) -> Dict[str, Any]:
@@ -14,22 +38,98 @@ def protect_floats(params: Dict[str, Any]) -> Dict[str, Any]:
         '1e-08'
 
     This is a bummer for us. Poloniex uses 8 points of precision, so that's how
-    we roll.
+    we roll. Decimals and Scaled values are written exactly; see
+    pyloniex.encoding.
     """
     return {
-        k: (f'{v:.8f}' if isinstance(v, float) else v)
+        k: (format_value(v) if isinstance(v, (float, Decimal, Scaled)) else v)
         for k, v
         in params.items()
     }
 
 
-class RateLimiter:
+class BaseRateLimiter(metaclass=ABCMeta):
+    """Token bucket rate limiter front end. Subclasses decide where bucket
+    state lives (process memory, a shared file, a remote store...) by
+    implementing `_take`.
+    """
+
+    @abstractmethod
+    def _take(self, key: str, tokens: float, max_wait: Optional[float]) -> Optional[float]:
+        """Withdraw `tokens` from the bucket for `key`, letting its budget go
+        negative if need be. Returns how long the caller has to wait before
+        the withdrawal is covered, or None (and withdraws nothing) if that
+        would take longer than `max_wait`.
+
+        Because later callers find the bucket already in debt, their waits
+        line up behind earlier ones: tokens are handed out first come, first
+        served, and never faster than the refill rate.
+        """
+
+    def check(self, key: str) -> bool:
+        return self._take(key, 1, 0) is not None
+
+    def feedback(self, status_code: int, latency: Optional[float] = None) -> None:
+        """Told the status (and round trip time) of every response to a
+        request that went through the limiter. Fixed-rate limiters ignore it.
+        """
+
+    def reserve(self, key: str, tokens: float = 1) -> float:
+        """Reserve `tokens` without blocking. Returns the number of seconds
+        until they may be spent.
+        """
+        wait = self._take(key, tokens, None)
+        assert wait is not None
+        return wait
+
+    def acquire(
+        self,
+        key: str,
+        tokens: float = 1,
+        timeout: Optional[float] = None,
+    ) -> bool:
+        """Block until `tokens` are available for `key`, sleeping exactly as
+        long as the bucket requires. Several tokens can be taken at once to
+        cover a batch of events.
+
+        If `timeout` is given and the tokens can't be had within that many
+        seconds, returns False right away without taking anything.
+        """
+        wait = self._take(key, tokens, timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            sleep(wait)
+        return True
+
+
+def refill(
+    budget: float,
+    timestamp: float,
+    now: float,
+    per_second: float,
+    burst: float,
+    tokens: float,
+    max_wait: Optional[float],
+) -> Tuple[Optional[float], float]:
+    """The token bucket arithmetic shared by every BaseRateLimiter backend.
+    Returns the caller's wait (None if over `max_wait`) and the new budget.
+    """
+    budget = min(burst, budget + (now - timestamp) * per_second) - tokens
+    wait = max(0.0, -budget / per_second)
+    if max_wait is not None and wait > max_wait:
+        return None, budget + tokens
+    return wait, budget
+
+
+class RateLimiter(BaseRateLimiter):
     """A very fast rate in-memory rate limiter using the token bucket
     algorithm. See https://en.wikipedia.org/wiki/Token_bucket for details.
 
     Tokens accumulate in the bucket at a constant rate per second, given by
     `per_second`. Each time RateLimiter::check is called, one token is removed
-    from the bucket.
+    from the bucket. RateLimiter::acquire instead blocks until the requested
+    tokens are available. All methods are safe to call from multiple threads.
 
     The `burst` parameter controls the maximum number of tokens that may be
     held by the bucket at once. If tokens are not removed, they will accumulate
@@ -52,18 +152,177 @@ class RateLimiter:
         self._burst = burst
         self._size = size
         self._buckets: OrderedDict[str, Tuple[float, float]] = OrderedDict()
+        self._lock = Lock()
 
-    def check(self, key: str) -> bool:
-        now = time()
-        budget, timestamp = self._buckets.get(key, (self._burst, now))
-        budget = min(self._burst, budget + (now - timestamp) * self._per_second) - 1
-        if budget < 0:
-            return False
+    def _take(self, key: str, tokens: float, max_wait: Optional[float]) -> Optional[float]:
+        with self._lock:
+            now = monotonic()
+            budget, timestamp = self._buckets.get(key, (self._burst, now))
+            wait, budget = refill(
+                budget, timestamp, now,
+                self._per_second, self._burst, tokens, max_wait,
+            )
+            if wait is None:
+                return None
 
-        if key in self._buckets:
-            del self._buckets[key]
-        elif len(self._buckets) >= self._size:
-            self._buckets.popitem(last=False)
+            if key in self._buckets:
+                del self._buckets[key]
+            elif len(self._buckets) >= self._size:
+                self._buckets.popitem(last=False)
 
-        self._buckets[key] = (budget, now)
-        return True
+            self._buckets[key] = (budget, now)
+            return wait
+
+
+class AdaptiveRateLimiter(RateLimiter):
+    """A RateLimiter that looks for the server's real limit instead of
+    sticking to a guess, using additive increase, multiplicative decrease
+    (AIMD).
+
+    While responses are healthy, the rate grows by about `increase` requests
+    per second every second. A 429 or 5xx response multiplies it by
+    `decrease`, at most once per `cooldown` seconds, since requests already
+    in flight when the server started pushing back will fail too. Responses
+    slower than `max_latency` (if given) hold the rate where it is.
+
+    The rate stays between `min_per_second` and `max_per_second`. `history`
+    keeps the last `history_size` (timestamp, rate) changes: every decrease,
+    and at most one point per second while increasing.
+    """
+
+    def __init__(
+        self,
+        per_second: float,
+        burst: float = 1,
+        size: int = 16,
+        *,
+        min_per_second: float = 1,
+        max_per_second: Optional[float] = None,
+        increase: float = 0.2,
+        decrease: float = 0.5,
+        cooldown: float = 1,
+        max_latency: Optional[float] = None,
+        history_size: int = 1024,
+    ) -> None:
+        super().__init__(per_second, burst, size)
+        self._min_per_second = min_per_second
+        self._max_per_second = max_per_second
+        self._increase = increase
+        self._decrease = decrease
+        self._cooldown = cooldown
+        self._max_latency = max_latency
+        self._decreased_at = -cooldown
+        self._history: Deque[Tuple[float, float]] = deque(maxlen=history_size)
+        self._history.append((time(), per_second))
+        self._increasing = False
+
+    @property
+    def rate(self) -> float:
+        return self._per_second
+
+    @property
+    def history(self) -> List[Tuple[float, float]]:
+        with self._lock:
+            return list(self._history)
+
+    def feedback(self, status_code: int, latency: Optional[float] = None) -> None:
+        with self._lock:
+            rate = self._per_second
+            if status_code == 429 or status_code >= 500:
+                now = monotonic()
+                if now - self._decreased_at < self._cooldown:
+                    return
+                self._decreased_at = now
+                rate = max(self._min_per_second, rate * self._decrease)
+                increasing = False
+            elif self._max_latency is not None and latency is not None and latency > self._max_latency:
+                return
+            elif status_code < 400:
+                # One step per response adds up to `increase` per second
+                rate += self._increase / rate
+                if self._max_per_second is not None:
+                    rate = min(self._max_per_second, rate)
+                increasing = True
+            else:
+                return
+
+            if rate == self._per_second:
+                return
+            self._per_second = rate
+            timestamp = time()
+            last = self._history[-1][0]
+            if increasing and self._increasing and timestamp - last < 1:
+                self._history[-1] = (last, rate)
+            else:
+                self._history.append((timestamp, rate))
+            self._increasing = increasing
+
+
+class AsyncRateLimiter:
+    """Adapts a RateLimiter for use from coroutines.
+
+    Tokens are reserved up front, so waiting coroutines sleep on the event
+    loop for exactly as long as the bucket requires and are released in the
+    order they asked.
+    """
+
+    def __init__(self, limiter: BaseRateLimiter) -> None:
+        self._limiter = limiter
+
+    async def acquire(self, key: str, tokens: float = 1) -> None:
+        wait = self._limiter.reserve(key, tokens)
+        if wait > 0:
+            import asyncio
+            await asyncio.sleep(wait)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key: while one is in flight,
+    later callers with the same key wait for it and get its result (or its
+    exception) instead of making their own call.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def do(self, key: str, func: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        assert future is not None
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """Coroutine flavor of SingleFlight. The shared call runs in its own task,
+    so a caller giving up (being cancelled) doesn't cancel it for the others.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, 'asyncio.Future'] = {}
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        import asyncio
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
@@ -11,10 +11,14 @@ setup(
     packages=find_packages(),
 
     install_requires=[
-        'cryptography',
         'requests>=2.20.0',
-        'tenacity',
+        'tenacity>=8.2',
     ],
+    extras_require={
+        'async': ['aiohttp>=3.14'],
+        'fast': ['orjson'],
+        'numpy': ['numpy>=1.23'],
+    },
 
     author='Adam Rothman',
     author_email='rothman.adam@gmail.com',
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+from decimal import Decimal
+
+from pytest import approx
+from pytest import raises
+
+from pyloniex.account_state import AccountMirror
+from pyloniex.constants import OrderType
+from pyloniex.decoding import number_view
+from pyloniex.encoding import Scaled
+
+
+class StubClient:
+    """Answers the snapshot commands with a fixed account, and trading
+    commands with whatever a test queues up.
+    """
+
+    def __init__(self):
+        self.snapshots = 0
+        self.results = []
+
+    def return_complete_balances(self):
+        self.snapshots += 1
+        return {
+            'BTC': {'available': '1.00000000', 'onOrders': '0.00000000', 'btcValue': '1.00000000'},
+            'ETH': {'available': '10.00000000', 'onOrders': '2.00000000', 'btcValue': '0.48000000'},
+        }
+
+    def return_open_orders(self, *, currency_pair):
+        assert currency_pair == 'all'
+        return {
+            'BTC_ETH': [{
+                'orderNumber': '1',
+                'type': 'sell',
+                'rate': '0.04000000',
+                'amount': '2.00000000',
+                'startingAmount': '2.00000000',
+                'total': '0.08000000',
+            }],
+            'BTC_XMR': [],
+        }
+
+    def get_margin_position(self, *, currency_pair):
+        return {'BTC_ETH': {'type': 'none', 'amount': '0.00000000', 'total': '0.00000000'}}
+
+    def _result(self, **kwargs):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    buy = sell = cancel_order = move_order = transfer_balance = return_order_trades = _result
+
+
+def test_mirror_follows_trading():
+    client = StubClient()
+    account = AccountMirror(client)
+
+    assert account.return_complete_balances()['ETH'] == {'available': 10.0, 'onOrders': 2.0, 'btcValue': 0.48}
+    assert account.return_open_orders(currency_pair='BTC_XMR') == []
+    assert account.get_margin_position(currency_pair='BTC_ETH')['type'] == 'none'
+    assert account.get_margin_position(currency_pair='BTC_LTC') == {'type': 'none'}
+
+    # Half a BTC's worth fills right away, the rest rests on the book
+    client.results.append({
+        'orderNumber': 2,
+        'resultingTrades': [{'amount': '0.50000000', 'rate': '0.03000000', 'total': '0.01500000', 'type': 'buy'}],
+        'fee': '0.00200000',
+    })
+    account.buy(currency_pair='BTC_ETH', rate=0.03, amount=2)
+    balances = account.return_complete_balances()
+    assert balances['BTC']['available'] == approx(1 - 0.015 - 0.045)
+    assert balances['BTC']['onOrders'] == approx(0.045)
+    assert balances['ETH']['available'] == approx(10 + 0.5 * 0.998)
+    [order] = [o for o in account.return_open_orders(currency_pair='BTC_ETH') if o['orderNumber'] == '2']
+    assert order['amount'] == approx(1.5)
+    assert order['startingAmount'] == 2
+
+    # Another half fills later
+    client.results.append([
+        {'amount': '0.50000000', 'rate': '0.03000000', 'total': '0.01500000', 'fee': '0.00200000'},
+        {'amount': '0.50000000', 'rate': '0.03000000', 'total': '0.01500000', 'fee': '0.00150000'},
+    ])
+    account.return_order_trades(order_number=2)
+    balances = account.return_complete_balances()
+    assert balances['BTC']['onOrders'] == approx(0.03)
+    assert balances['ETH']['available'] == approx(10 + 0.5 * 0.998 + 0.5 * 0.9985)
+
+    client.results.append({'success': 1, 'amount': '1.00000000'})
+    account.cancel_order(order_number=2)
+    client.results.append({'success': 1, 'orderNumber': '3', 'resultingTrades': {'BTC_ETH': []}})
+    account.move_order(order_number=1, rate=0.05)
+    client.results.append({'success': 1})
+    account.transfer_balance(currency='BTC', amount=0.5, from_account='exchange', to_account='margin')
+    # Fill or kill orders never rest
+    client.results.append({'orderNumber': 4, 'resultingTrades': []})
+    account.sell(currency_pair='BTC_ETH', rate=0.1, amount=1, order_type=OrderType.fill_or_kill)
+
+    balances = account.return_complete_balances()
+    assert balances['BTC'] == {'available': approx(0.97 - 0.5), 'onOrders': approx(0), 'btcValue': 1.0}
+    assert balances['ETH']['onOrders'] == approx(2)
+    assert account.return_open_orders() == {
+        'BTC_ETH': [{
+            'orderNumber': '3',
+            'type': 'sell',
+            'rate': 0.05,
+            'amount': 2.0,
+            'startingAmount': 2.0,
+            'total': 0.1,
+        }],
+        'BTC_XMR': [],
+    }
+    assert client.snapshots == 1
+
+
+def test_reconciliation():
+    client = StubClient()
+    account = AccountMirror(client, interval=60)
+    account.return_complete_balances()
+    assert client.snapshots == 1
+
+    # An order the mirror doesn't know of
+    client.results.append({'success': 1, 'amount': '1.00000000'})
+    account.cancel_order(order_number=99)
+    assert account.stale
+    account.return_open_orders()
+    assert client.snapshots == 2
+
+    # A cancel for less than expected means a fill was missed
+    client.results.append({'success': 1, 'amount': '1.50000000'})
+    account.cancel_order(order_number=1)
+    account.return_open_orders()
+    assert client.snapshots == 3
+
+    # The outcome of a failed command isn't known
+    client.results.append(ConnectionError())
+    with raises(ConnectionError):
+        account.buy(currency_pair='BTC_ETH', rate=0.03, amount=1)
+    account.return_open_orders()
+    assert client.snapshots == 4
+
+    # Spending more than the mirror thinks is there
+    client.results.append({'orderNumber': 5, 'resultingTrades': []})
+    account.buy(currency_pair='BTC_ETH', rate=1, amount=2)
+    account.return_open_orders()
+    assert client.snapshots == 5
+
+    account.refreshed -= 60
+    account.return_open_orders()
+    assert client.snapshots == 6
+
+    account = AccountMirror(client, interval=None)
+    account.return_open_orders()
+    account.refreshed -= 3600
+    account.return_open_orders()
+    assert client.snapshots == 7
+
+
+def test_client_number_modes():
+    class DecimalClient(StubClient):
+        _numbers = staticmethod(number_view('decimal'))
+
+        def return_complete_balances(self):
+            return self._numbers(super().return_complete_balances())
+
+        def _result(self, **kwargs):
+            return self._numbers(super()._result(**kwargs))
+
+        buy = _result
+
+    class ScaledClient(DecimalClient):
+        _numbers = staticmethod(number_view('scaled'))
+
+    client = DecimalClient()
+    account = AccountMirror(client)
+    account.refresh()
+    client.results.append({
+        'orderNumber': 2,
+        'resultingTrades': [{'amount': '0.50000000', 'rate': '0.03000000', 'total': '0.01500000', 'type': 'buy'}],
+        'fee': '0.00200000',
+    })
+    account.buy(currency_pair='BTC_ETH', rate=0.03, amount=2)
+    balances = account.return_complete_balances()
+    # Exactly, with no float rounding on the way
+    assert balances['BTC']['available'] == Decimal('0.94')
+    assert balances['ETH']['available'] == Decimal('10.499')
+    assert account.return_open_orders(currency_pair='BTC_ETH')[1]['rate'] == Decimal('0.03')
+
+    client = ScaledClient()
+    account = AccountMirror(client)
+    assert account.return_complete_balances()['ETH'] == {
+        'available': 10 * 10 ** 8, 'onOrders': 2 * 10 ** 8, 'btcValue': 48 * 10 ** 6,
+    }
+    assert account.return_open_orders()['BTC_ETH'][0]['amount'] == 2 * 10 ** 8
+
+
+def test_exact_inputs_and_unexpected_results():
+    client = StubClient()
+    account = AccountMirror(client)
+    account.refresh()
+
+    client.results.append({'orderNumber': 2, 'resultingTrades': []})
+    account.buy(currency_pair='BTC_ETH', rate=Scaled(3000000), amount=Scaled(200000000))
+    assert account.return_complete_balances()['BTC']['onOrders'] == approx(0.06)
+    assert account.return_open_orders(currency_pair='BTC_ETH')[1]['rate'] == 0.03
+    assert not account.stale
+
+    # The order was placed, so its result is returned; the mirror just
+    # doesn't know what to make of it
+    client.results.append({'resultingTrades': []})
+    assert account.sell(currency_pair='BTC_ETH', rate=0.05, amount=1) == {'resultingTrades': []}
+    assert account.stale
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from time import monotonic
+from time import sleep
+
+from pytest import raises
+
+from pyloniex.accounts import AccountPool
+from pyloniex.api.private import PoloniexPrivateAPI
+from pyloniex.errors import PoloniexRequestError
+
+
+# How long the stub takes to answer each key
+DELAYS = {'slow': 0.3, 'medium': 0.15, 'fast': 0, 'broken': 0}
+
+
+def handle(request):
+    key = request.headers['Key']
+    sleep(DELAYS[key])
+    if key == 'broken':
+        return 403, {'error': 'Invalid API key'}
+    return 200, {'BTC': key}
+
+
+def test_sweep(serve):
+    StubPrivateAPI = serve(handle).client(PoloniexPrivateAPI)
+    host = StubPrivateAPI.host
+    accounts = {name: (name, 'secret') for name in ('slow', 'medium', 'fast', 'broken')}
+    # Two accounts on the same key share its nonce stream and rate limit
+    accounts['fast2'] = ('fast', 'secret')
+
+    with AccountPool(accounts, requests_per_second=4, client_class=StubPrivateAPI) as pool:
+        assert len(pool) == 5
+        assert pool['fast']._dispatcher.allocator is pool['fast2']._dispatcher.allocator
+        assert pool['fast']._dispatcher.allocator is not pool['slow']._dispatcher.allocator
+        assert pool['fast']._rate_limiter is pool['fast2']._rate_limiter
+        assert pool['fast']._session.get_adapter(host) is pool['slow']._session.get_adapter(host)
+
+        start = monotonic()
+        results = list(pool.sweep(lambda client: client.return_balances()))
+        # About as long as the slowest account, not the sum of them all
+        assert monotonic() - start < 0.6
+        # In the order they finished
+        order = [r.account for r in results]
+        assert order.index('fast') < order.index('medium') < order.index('slow')
+        by_account = {r.account: r for r in results}
+        assert by_account['slow'].value == {'BTC': 'slow'}
+        assert by_account['slow'].elapsed >= 0.3
+        assert isinstance(by_account['broken'].error, PoloniexRequestError)
+
+        values = pool.gather(lambda client: client.return_balances(), accounts=['fast', 'medium'])
+        assert values == {'fast': {'BTC': 'fast'}, 'medium': {'BTC': 'medium'}}
+        with raises(PoloniexRequestError):
+            pool.gather(lambda client: client.return_balances())
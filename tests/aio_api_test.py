@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import hmac
+import json
+from collections import Counter
+
+from aiohttp import web
+
+from pyloniex.api.aio import AsyncPoloniexPrivateAPI
+from pyloniex.api.aio import AsyncPoloniexPublicAPI
+
+
+def test_concurrent_public_requests(serve_async):
+    calls = Counter()
+
+    async def handler(request):
+        command = request.query['command']
+        calls[command] += 1
+        pair = request.query.get('currencyPair')
+        return web.json_response({'pair': pair, 'asks': [], 'bids': []})
+
+    StubPublicAPI = serve_async(handler).client(AsyncPoloniexPublicAPI)
+
+    async def main():
+        async with StubPublicAPI(requests_per_second=10000) as public:
+            pairs = [f'BTC_{i}' for i in range(200)]
+            books = await asyncio.gather(*(
+                public.return_order_book(currency_pair=pair, depth=1)
+                for pair in pairs
+            ))
+        return pairs, books
+
+    pairs, books = asyncio.run(main())
+    assert [book['pair'] for book in books] == pairs
+    assert calls['returnOrderBook'] == 200
+
+
+def test_private_request_is_signed(serve_async):
+    secret = 'hunter2'
+
+    async def handler(request):
+        body = await request.read()
+        expected = hmac.new(secret.encode(), body, hashlib.sha512).hexdigest()
+        if request.headers['Key'] != 'key' or request.headers['Sign'] != expected:
+            return web.json_response({'error': 'Invalid signature'}, status=403)
+        form = await request.post()
+        return web.json_response({'command': form['command'], 'nonce': form['nonce']})
+
+    StubPrivateAPI = serve_async(handler).client(AsyncPoloniexPrivateAPI)
+
+    async def main():
+        async with StubPrivateAPI(key='key', secret=secret) as private:
+            return await private.return_balances()
+
+    response = asyncio.run(main())
+    assert response['command'] == 'returnBalances'
+    assert int(response['nonce']) > 0
+
+
+def test_retry_on_429(serve_async):
+    attempts = []
+
+    async def handler(request):
+        attempts.append(request.query['command'])
+        if len(attempts) == 1:
+            return web.Response(
+                status=429,
+                body=json.dumps({'error': 'Slow down'}),
+                content_type='application/json',
+            )
+        return web.json_response({'BTC_ETH': {'last': '0.1'}})
+
+    StubPublicAPI = serve_async(handler).client(AsyncPoloniexPublicAPI)
+
+    async def main():
+        async with StubPublicAPI() as public:
+            return await public.return_ticker()
+
+    assert asyncio.run(main()) == {'BTC_ETH': {'last': '0.1'}}
+    assert len(attempts) == 2
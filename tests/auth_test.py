@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import hmac
+
+from requests import Request
+
+from pyloniex.api.private import PoloniexAuth
+
+
+def test_sign():
+    auth = PoloniexAuth('key', 'secret')
+    for body in (b'', b'command=returnBalances&nonce=1', b'x' * 4096):
+        expected = hmac.new(b'secret', body, hashlib.sha512).hexdigest()
+        # The keyed state is reused, so signing twice must give the same result
+        assert auth.sign(body) == expected.encode('ascii')
+        assert auth.sign(body) == expected.encode('ascii')
+
+
+def test_call_signs_prepared_request():
+    auth = PoloniexAuth('key', 'secret')
+    prepared = Request(
+        'POST',
+        'https://poloniex.com/tradingApi',
+        data={'command': 'returnBalances', 'nonce': 1},
+    ).prepare()
+    auth(prepared)
+    body = prepared.body.encode('utf-8')
+    assert prepared.headers['Key'] == 'key'
+    assert prepared.headers['Sign'] == auth.sign(body)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from time import sleep
+
+from pytest import fixture
+from pytest import raises
+
+from pyloniex import PoloniexPrivateAPI
+from pyloniex.api.aio import AsyncPoloniexPrivateAPI
+from pyloniex.batch import BatchAborted
+from pyloniex.batch import Move
+from pyloniex.batch import Order
+from pyloniex.errors import PoloniexRequestError
+
+
+LATENCY = 0.1
+
+
+def handle(request):
+    params = request.params
+    sleep(LATENCY)
+    if params['command'] == 'cancelOrder':
+        if params['orderNumber'] == '3':
+            return 422, {'error': 'Invalid order number, or you are not the person who placed the order.'}
+        return 200, {'success': 1, 'orderNumber': params['orderNumber']}
+    elif params['command'] == 'moveOrder':
+        return 200, {'success': 1, 'orderNumber': str(int(params['orderNumber']) + 100), 'rate': params['rate']}
+    return 200, {'orderNumber': params['command'] + params['rate'], 'amount': params['amount']}
+
+
+@fixture
+def server(serve):
+    return serve(handle)
+
+
+def test_batches(server):
+    StubPrivateAPI = server.client(PoloniexPrivateAPI)
+    private = StubPrivateAPI(key='key', secret='secret', requests_per_second=1000, pipelined=True)
+
+    batch = private.cancel_orders(range(1, 9), concurrency=8)
+    # In input order, and in about one round trip rather than eight
+    assert [r.value for r in batch.results if r.error is None] == [
+        {'success': 1, 'orderNumber': str(n)} for n in (1, 2, 4, 5, 6, 7, 8)
+    ]
+    assert isinstance(batch.errors[2], PoloniexRequestError)
+    assert not batch.ok
+    assert LATENCY <= batch.elapsed < 4 * LATENCY
+    assert 0 <= batch.spread < batch.elapsed
+
+    batch = private.cancel_orders([1, 3, 4, 5], concurrency=1, fail_fast=True)
+    assert batch.values[0] == {'success': 1, 'orderNumber': '1'}
+    assert isinstance(batch.errors[1], PoloniexRequestError)
+    assert [type(e) for e in batch.errors[2:]] == [BatchAborted, BatchAborted]
+    assert batch.results[3].acknowledged is None
+
+    batch = private.place_orders([
+        Order('buy', 'BTC_ETH', 0.03, 1.5),
+        Order('sell', 'BTC_ETH', 0.04, 2),
+    ])
+    assert batch.ok
+    assert batch.values == [
+        {'orderNumber': 'buy0.03000000', 'amount': '1.50000000'},
+        {'orderNumber': 'sell0.04000000', 'amount': '2'},
+    ]
+    with raises(ValueError):
+        private.place_orders([Order('short', 'BTC_ETH', 0.03, 1)])
+
+    batch = private.move_orders([Move(1, 0.05), Move(2, 0.06, 3)])
+    assert [v['orderNumber'] for v in batch.values] == ['101', '102']
+
+
+def test_async_batches(server):
+    StubPrivateAPI = server.client(AsyncPoloniexPrivateAPI)
+
+    async def main():
+        async with StubPrivateAPI(key='key', secret='secret', requests_per_second=1000, pipelined=True) as private:
+            return (
+                await private.cancel_orders(range(1, 9)),
+                await private.cancel_orders([1, 3, 4], concurrency=1, fail_fast=True),
+            )
+
+    best_effort, fail_fast = asyncio.run(main())
+    assert best_effort.values[0] == {'success': 1, 'orderNumber': '1'}
+    assert isinstance(best_effort.errors[2], PoloniexRequestError)
+    assert best_effort.elapsed < 4 * LATENCY
+    assert isinstance(fail_fast.errors[2], BatchAborted)
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+from pyloniex import PoloniexPublicAPI
+from pyloniex.api.aio import AsyncPoloniexPublicAPI
+from pyloniex.cache import ResponseCache
+
+
+class CountingPublicAPI(PoloniexPublicAPI):
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.requests = []
+
+    def request(self, method, url, *, params):
+        self.requests.append(params)
+        return {'command': params['command'], 'n': len(self.requests)}
+
+
+def test_cache_hits_and_misses():
+    cache = ResponseCache({'returnTicker': 60})
+    public = CountingPublicAPI(cache=cache)
+
+    assert public.return_ticker() == {'command': 'returnTicker', 'n': 1}
+    assert public.return_ticker() == {'command': 'returnTicker', 'n': 1}
+    # Not in the TTL table, so never cached
+    public.return_order_book(currency_pair='BTC_ETH')
+    public.return_order_book(currency_pair='BTC_ETH')
+
+    assert len(public.requests) == 3
+    assert cache.stats.hits == 1
+    assert cache.stats.misses == 1
+
+
+def test_cache_expiry():
+    cache = ResponseCache({'returnTicker': 0.05})
+    public = CountingPublicAPI(cache=cache)
+    public.return_ticker()
+    time.sleep(0.06)
+    assert public.return_ticker()['n'] == 2
+
+
+def test_cache_lru_eviction():
+    cache = ResponseCache({'returnLoanOrders': 60}, size=2)
+    public = CountingPublicAPI(cache=cache)
+    public.return_loan_orders(currency='BTC')
+    public.return_loan_orders(currency='ETH')
+    public.return_loan_orders(currency='BTC')
+    public.return_loan_orders(currency='XMR')  # evicts ETH
+
+    assert cache.stats.evictions == 1
+    assert public.return_loan_orders(currency='BTC')['n'] == 1
+    assert public.return_loan_orders(currency='ETH')['n'] == 4
+
+
+def test_cache_disk_tier(tmp_path):
+    public = CountingPublicAPI(cache=ResponseCache(path=str(tmp_path)))
+    currencies = public.return_currencies()
+
+    # A fresh cache (as after a restart) finds the response on disk
+    cache = ResponseCache(path=str(tmp_path))
+    public = CountingPublicAPI(cache=cache)
+    assert public.return_currencies() == currencies
+    assert public.requests == []
+    assert cache.stats.disk_hits == 1
+
+
+def test_async_cache():
+    class CountingAsyncPublicAPI(AsyncPoloniexPublicAPI):
+        calls = 0
+
+        async def request(self, method, url, *, params):
+            type(self).calls += 1
+            return {'command': params['command']}
+
+    async def main():
+        public = CountingAsyncPublicAPI(cache=ResponseCache())
+        return [await public.return_ticker() for _ in range(3)]
+
+    assert asyncio.run(main()) == [{'command': 'returnTicker'}] * 3
+    assert CountingAsyncPublicAPI.calls == 1
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+import json
+import time
+
+import numpy as np
+
+from pyloniex import PoloniexPublicAPI
+from pyloniex.candles import CandleStore
+from pyloniex.candles import to_rows
+
+
+PERIOD = 300
+START = 1504634400
+
+
+def candle(date):
+    price = date % 1000 / 1e4
+    return {
+        'date': date, 'high': price, 'low': price, 'open': price, 'close': price,
+        'volume': 1.5, 'quoteVolume': 20.25, 'weightedAverage': price,
+    }
+
+
+class FakePublicAPI(PoloniexPublicAPI):
+
+    def __init__(self, now):
+        super().__init__(requests_per_second=10000)
+        self.now = now
+        self.calls = []
+
+    def request(self, method, url, *, params, decoder=None):
+        self.calls.append((params['start'], params['end']))
+        period = int(params['period'])
+        first = -(-int(params['start']) // period) * period
+        rows = [
+            candle(date)
+            for date in range(first, int(params['end']) + 1, period)
+            if START <= date <= self.now
+        ] or [candle(0)]
+        return decoder(json.dumps(rows, separators=(',', ':')).encode())
+
+
+def test_only_gaps_are_fetched(tmp_path):
+    public = FakePublicAPI(now=int(time.time()))
+    store = CandleStore(public, str(tmp_path))
+
+    day = 24 * 60 * 60
+    candles = store.return_chart_data(currency_pair='BTC_ETH', period=PERIOD, start=START, end=START + day)
+    assert len(candles) == day // PERIOD + 1
+    assert candles['date'][0] == START
+    assert len(public.calls) == 1
+
+    # Fully covered: no API call, and no copy
+    candles = store.return_chart_data(
+        currency_pair='BTC_ETH', period=PERIOD, start=START + 3600, end=START + 7200,
+    )
+    assert len(public.calls) == 1
+    assert isinstance(candles, np.memmap)
+    assert to_rows(candles[:1]) == [candle(START + 3600)]
+
+    # Overlapping a covered range: only the missing part is fetched
+    candles = store.return_chart_data(
+        currency_pair='BTC_ETH', period=PERIOD, start=START - day, end=START + 2 * day,
+    )
+    assert public.calls[1:] == [(START - day, START - 1), (START + day + PERIOD, START + 2 * day + PERIOD - 1)]
+    assert len(candles) == 2 * day // PERIOD + 1
+    assert (np.diff(candles['date']) == PERIOD).all()
+
+
+def test_unaligned_range(tmp_path):
+    public = FakePublicAPI(now=int(time.time()))
+    store = CandleStore(public, str(tmp_path))
+
+    for _ in range(2):
+        candles = store.return_chart_data(
+            currency_pair='BTC_ETH', period=PERIOD, start=START + 100, end=START + 3 * PERIOD - 100,
+        )
+        assert list(candles['date']) == [START + PERIOD, START + 2 * PERIOD]
+    assert len(public.calls) == 1
+
+
+def test_live_tail_is_not_stored(tmp_path):
+    now = int(time.time())
+    public = FakePublicAPI(now=now)
+    store = CandleStore(public, str(tmp_path))
+
+    start = now - 3600
+    for _ in range(2):
+        candles = store.return_chart_data(currency_pair='BTC_ETH', period=PERIOD, start=start, end=now)
+        assert candles['date'][-1] == now - now % PERIOD
+
+    # The second call refetched only the forming candle
+    assert public.calls[1][0] == now - now % PERIOD
+    covered = store.covered(currency_pair='BTC_ETH', period=PERIOD)
+    assert covered[-1][1] == now - now % PERIOD
+
+
+def test_store_survives_restart(tmp_path):
+    public = FakePublicAPI(now=int(time.time()))
+    CandleStore(public, str(tmp_path)).return_chart_data(
+        currency_pair='BTC_ETH', period=PERIOD, start=START, end=START + 3600,
+    )
+    store = CandleStore(public, str(tmp_path))
+    candles = store.return_chart_data(currency_pair='BTC_ETH', period=PERIOD, start=START, end=START + 3600)
+    assert len(public.calls) == 1
+    assert len(candles) == 13
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+import json
+
+import numpy as np
+
+from pytest import raises
+
+from pyloniex import PoloniexPublicAPI
+from pyloniex.columnar import CHART_DATA_COLUMNS
+from pyloniex.columnar import TRADE_HISTORY_COLUMNS
+from pyloniex.columnar import decode_columns
+
+
+CANDLES = [
+    {'date': 1504634400, 'high': 0.0731, 'low': 0.0712, 'open': 0.0729, 'close': 0.0719,
+     'volume': 159.2, 'quoteVolume': 2203.4, 'weightedAverage': 0.0722},
+    {'date': 1504636200, 'high': 0.0725, 'low': 7e-08, 'open': 0.0719, 'close': 0.0721,
+     'volume': 0, 'quoteVolume': 0, 'weightedAverage': 0.0722},
+]
+
+TRADES = [
+    {'globalTradeID': 224151739, 'tradeID': 34025637, 'date': '2017-09-05 21:57:02',
+     'type': 'sell', 'rate': '0.07246999', 'amount': '0.01380010', 'total': '0.00100009'},
+    {'globalTradeID': 224151738, 'tradeID': 34025636, 'date': '2017-09-05 21:56:51',
+     'type': 'buy', 'rate': '0.07247000', 'amount': '2.00000000', 'total': '0.14494000'},
+]
+
+
+def encode(rows):
+    return json.dumps(rows, separators=(',', ':')).encode()
+
+
+def test_chart_data():
+    columns = decode_columns(encode(CANDLES), CHART_DATA_COLUMNS)
+    assert list(columns) == list(CHART_DATA_COLUMNS)
+    assert columns['date'].dtype == np.int64
+    assert columns['date'].tolist() == [1504634400, 1504636200]
+    assert columns['low'].tolist() == [0.0712, 7e-08]
+    assert columns['volume'].dtype == np.float64
+
+
+def test_trade_history():
+    columns = decode_columns(encode(TRADES), TRADE_HISTORY_COLUMNS, price_scale=8)
+    assert columns['globalTradeID'].tolist() == [224151739, 224151738]
+    assert columns['date'].tolist() == [1504648622, 1504648611]
+    assert columns['type'].tolist() == [b'sell', b'buy']
+    assert columns['rate'].dtype == np.int64
+    assert columns['rate'].tolist() == [7246999, 7247000]
+    assert columns['amount'].tolist() == [1380010, 200000000]
+
+
+def test_exact_scaled_prices():
+    large = dict(TRADES[0], rate='92233720.36854775', amount='123456789.12345678', total='0.123456785')
+    candle = dict(CANDLES[1], volume=123456789.12345678)
+    expected = {'rate': [9223372036854775], 'amount': [12345678912345678], 'total': [12345678]}
+    # The compact fast path, then json
+    for body in (encode([large]), json.dumps([large]).encode()):
+        columns = decode_columns(body, TRADE_HISTORY_COLUMNS, price_scale=8)
+        assert {key: columns[key].tolist() for key in expected} == expected
+
+    for body in (encode([candle]), json.dumps([candle]).encode()):
+        columns = decode_columns(body, CHART_DATA_COLUMNS, price_scale=8)
+        assert columns['low'].tolist() == [7]
+        assert columns['volume'].tolist() == [12345678912345678]
+        assert columns['quoteVolume'].tolist() == [0]
+
+
+def test_edge_cases():
+    columns = decode_columns(b'[]', CHART_DATA_COLUMNS)
+    assert all(len(column) == 0 for column in columns.values())
+
+    columns = decode_columns(encode(CANDLES[:1]), CHART_DATA_COLUMNS)
+    assert columns['date'].tolist() == [1504634400]
+
+    # Error responses come back as they would without columnar decoding
+    assert decode_columns(b'{"error":"Invalid currency pair."}', CHART_DATA_COLUMNS) == {
+        'error': 'Invalid currency pair.',
+    }
+
+
+def test_other_layouts():
+    expected = decode_columns(encode(TRADES * 3), TRADE_HISTORY_COLUMNS, price_scale=8)
+
+    # Spaced out, or indented, rather than compact
+    for body in (json.dumps(TRADES * 3).encode(), json.dumps(TRADES * 3, indent=2).encode()):
+        columns = decode_columns(body, TRADE_HISTORY_COLUMNS, price_scale=8)
+        assert {k: v.tolist() for k, v in columns.items()} == {k: v.tolist() for k, v in expected.items()}
+
+    # Rows whose keys come in different orders
+    reordered = [TRADES[0], dict(reversed(list(TRADES[1].items())))] * 3
+    columns = decode_columns(encode(reordered), TRADE_HISTORY_COLUMNS, price_scale=8)
+    assert {k: v.tolist() for k, v in columns.items()} == {k: v.tolist() for k, v in expected.items()}
+
+    columns = decode_columns(b'[ ]', CHART_DATA_COLUMNS)
+    assert all(len(column) == 0 for column in columns.values())
+
+
+def test_columnar_format():
+    class StubPublicAPI(PoloniexPublicAPI):
+        def request(self, method, url, *, params, decoder=None):
+            body = encode(CANDLES)
+            return json.loads(body) if decoder is None else decoder(body)
+
+    public = StubPublicAPI()
+    kwargs = dict(currency_pair='BTC_ETH', period=1800, start=0, end=1)
+    assert public.return_chart_data(**kwargs) == CANDLES
+    columns = public.return_chart_data(format='columnar', **kwargs)
+    assert columns['close'].tolist() == [0.0719, 0.0721]
+    with raises(ValueError):
+        public.return_chart_data(format='column', **kwargs)
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import threading
+from email.message import Message
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+from typing import Tuple
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+from pytest import fixture
+
+
+class StubRequest(NamedTuple):
+    method: str
+    path: str
+    # The query string of a GET, or the form body of a POST
+    params: Dict[str, str]
+    headers: Message
+    body: bytes
+
+
+# Answers a request with a status and data to send as JSON (or bytes to send
+# as they are)
+Handle = Callable[[StubRequest], Tuple[int, Any]]
+
+
+class StubServer:
+    """A local HTTP server that answers every request with `handle`."""
+
+    def __init__(self, handle: Handle, chunk_size: Optional[int] = None) -> None:
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                self.reply(StubRequest('GET', url.path, _params(url.query), self.headers, b''))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                path = urlparse(self.path).path
+                self.reply(StubRequest('POST', path, _params(body.decode()), self.headers, body))
+
+            def reply(self, request):
+                status, data = handle(request)
+                body = data if isinstance(data, bytes) else json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                step = chunk_size or len(body) or 1
+                for i in range(0, len(body), step):
+                    self.wfile.write(body[i:i + step])
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self._server.server_address[1]}'
+
+    def client(self, cls: type) -> type:
+        return _client(self.url, cls)
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class AsyncStubServer:
+    """An aiohttp server that answers every request, whatever its path, with
+    the coroutine function `handle`. It runs on an event loop of its own, in
+    a background thread, so that it can serve clients on any loop, and
+    blocking clients too.
+    """
+
+    def __init__(self, handle: Callable[[Any], Awaitable[Any]], handler_cancellation: bool = False) -> None:
+        from aiohttp import web
+
+        async def start():
+            app = web.Application()
+            app.router.add_route('*', '/{path:.*}', handle)
+            runner = web.AppRunner(app, handler_cancellation=handler_cancellation)
+            await runner.setup()
+            await web.TCPSite(runner, '127.0.0.1', 0).start()
+            return runner
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._runner = asyncio.run_coroutine_threadsafe(start(), self._loop).result()
+        self.url = f'http://127.0.0.1:{self._runner.addresses[0][1]}'
+
+    def client(self, cls: type) -> type:
+        return _client(self.url, cls)
+
+    def close(self) -> None:
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+
+def _client(url: str, cls: type) -> type:
+    """A subclass of the client class `cls` that talks to the server at
+    `url` rather than to Poloniex.
+    """
+    if hasattr(cls, 'host'):
+        attributes = {'host': url + urlparse(cls.host).path}  # type: ignore
+    else:
+        # The push API, over a websocket
+        attributes = {'url': 'ws' + url[len('http'):] + (urlparse(cls.url).path or '/')}  # type: ignore
+    return type(f'Stub{cls.__name__}', (cls,), attributes)
+
+
+def _params(query: str) -> Dict[str, str]:
+    return {key: values[0] for key, values in parse_qs(query).items()}
+
+
+@fixture
+def serve():
+    """Starts a StubServer: serve(handle, chunk_size=None), where
+    `chunk_size` makes it dribble response bodies out in pieces that size.
+    """
+    servers: List[StubServer] = []
+
+    def start(handle: Handle, *, chunk_size: Optional[int] = None) -> StubServer:
+        server = StubServer(handle, chunk_size)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+@fixture
+def serve_async():
+    """Starts an AsyncStubServer: serve_async(handle, handler_cancellation=False),
+    where `handler_cancellation` cancels handlers whose client disconnects.
+    """
+    servers: List[AsyncStubServer] = []
+
+    def start(handle: Callable[[Any], Awaitable[Any]], *, handler_cancellation: bool = False) -> AsyncStubServer:
+        server = AsyncStubServer(handle, handler_cancellation)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
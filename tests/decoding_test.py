@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+from decimal import Decimal
+
+from pytest import raises
+
+from pyloniex import PoloniexPublicAPI
+from pyloniex.cache import ResponseCache
+from pyloniex.decoding import BACKENDS
+from pyloniex.decoding import backend
+from pyloniex.decoding import LazyMapping
+from pyloniex.decoding import number_view
+from pyloniex.decoding import to_scaled
+from pyloniex.replay import Replayer
+
+
+TICKER = {
+    'BTC_ETH': {
+        'id': 148, 'last': '0.03112000', 'isFrozen': '0', 'high24hr': 0.0325,
+    },
+}
+
+BODY = json.dumps(TICKER).encode()
+
+
+def test_backends():
+    for name in BACKENDS:
+        assert backend(name)(BODY) == TICKER
+    assert backend() is backend(BACKENDS[0])
+
+
+def test_to_scaled():
+    assert to_scaled('0.00000001') == 1
+    assert to_scaled('-12.5') == -1250000000
+    assert to_scaled('0.000000015') == 2  # half to even
+    assert to_scaled('0.12', 2) == 12
+    assert to_scaled(0.1) == 10000000
+    assert to_scaled('BTC_ETH') == 'BTC_ETH'
+
+
+def test_number_views():
+    data = json.loads(BODY)
+    ticker = number_view('decimal')(data)['BTC_ETH']
+    assert ticker['last'] == Decimal('0.03112000')
+    assert ticker['high24hr'] == Decimal('0.0325')
+    assert ticker['isFrozen'] == '0'
+    assert ticker['id'] == 148
+    assert dict(ticker) == {
+        'id': 148,
+        'last': Decimal('0.03112000'),
+        'isFrozen': '0',
+        'high24hr': Decimal('0.0325'),
+    }
+    # The decoded response is untouched
+    assert data == TICKER
+
+    scaled = number_view('scaled', 4)([data['BTC_ETH'], data['BTC_ETH']])
+    assert [t['last'] for t in scaled] == [311, 311]
+    assert scaled[1:][0]['high24hr'] == 325
+
+    assert number_view(None)(data) is data
+    with raises(ValueError):
+        number_view('float')
+
+
+def test_client_numbers(tmp_path):
+    path = str(tmp_path / 'session.jsonl.gz')
+    entry = {
+        'time': 0, 'elapsed': 0, 'method': 'GET', 'url': '/public',
+        'params': {'command': 'returnTicker'}, 'status': 200,
+        'headers': {}, 'body': BODY.decode(),
+    }
+    with gzip.open(path, 'wt') as f:
+        f.write(json.dumps(entry) + '\n')
+
+    cache = ResponseCache()
+    public = PoloniexPublicAPI(transport=Replayer(path), cache=cache, numbers='decimal')
+    first = public.return_ticker()
+    assert isinstance(first, LazyMapping)
+    assert first['BTC_ETH']['last'] == Decimal('0.03112000')
+    # The cache holds the plain response, and hits are presented the same way
+    assert cache.lookup({'command': 'returnTicker'}) == (True, TICKER)
+    assert public.return_ticker()['BTC_ETH']['last'] == Decimal('0.03112000')
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import hmac
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from pyloniex import PoloniexPrivateAPI
+from pyloniex.constants import OrderType
+from pyloniex.encoding import Scaled
+from pyloniex.encoding import encode_params
+from pyloniex.utils import protect_floats
+
+
+def test_encode_params():
+    params = {
+        'command': 'buy',
+        'currencyPair': 'BTC_ETH',
+        'rate': 7.1e-07,
+        'amount': 2,
+        'address': 'a b&c',
+        'flag': True,
+    }
+    body = encode_params(params)
+    # The same as form encoding the parameters the old way
+    assert body == urlencode(protect_floats(params)).encode('ascii')
+    assert body.command == 'buy'
+    assert body.with_nonce(42) == body + b'&nonce=42'
+
+    exact = encode_params({
+        'command': 'sell',
+        'rate': Decimal('1E-9'),
+        'amount': Scaled(-12345, 4),
+        'total': Scaled(7),
+    })
+    assert exact == b'command=sell&rate=0.000000001&amount=-1.2345&total=0.00000007'
+
+
+def test_private_request_is_signed(serve):
+    received = []
+
+    def handle(request):
+        expected = hmac.new(b'secret', request.body, hashlib.sha512).hexdigest()
+        received.append((request.body, request.headers['Sign'] == expected))
+        return 200, {'orderNumber': '1'}
+
+    StubPrivateAPI = serve(handle).client(PoloniexPrivateAPI)
+    private = StubPrivateAPI(key='key', secret='secret', requests_per_second=1000)
+    assert private.buy(
+        currency_pair='BTC_ETH',
+        rate=Decimal('0.031415926'),
+        amount=Scaled(150000000),
+        order_type=OrderType.post_only,
+    ) == {'orderNumber': '1'}
+
+    [(body, signed)] = received
+    assert signed
+    assert body.startswith(
+        b'command=buy&currencyPair=BTC_ETH&rate=0.031415926&amount=1.50000000&postOnly=1&nonce=',
+    )
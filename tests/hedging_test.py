@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from itertools import count
+
+from aiohttp import web
+from requests import Response
+
+from pyloniex import PoloniexPublicAPI
+from pyloniex.api.aio import AsyncPoloniexPublicAPI
+from pyloniex.hedging import HedgeStats
+from pyloniex.hedging import HedgingPolicy
+from pyloniex.utils import RateLimiter
+
+
+class SlowFirstPublicAPI(PoloniexPublicAPI):
+    """The first request stalls; any later one is answered right away."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = count()
+
+    def _send(self, request, stream=False):
+        call = next(self.calls)
+        if call == 0:
+            time.sleep(0.5)
+        response = Response()
+        response.status_code = 200
+        response._content = json.dumps({'call': call}).encode()
+        return response
+
+
+def test_slow_request_is_hedged():
+    hedging = HedgingPolicy(initial_delay=0.05)
+    public = SlowFirstPublicAPI(requests_per_second=1000, hedging=hedging)
+
+    start = time.monotonic()
+    assert public.return_ticker() == {'call': 1}
+    assert time.monotonic() - start < 0.3
+    assert hedging.stats == HedgeStats(requests=1, hedges=1, wins=1, skipped=0)
+
+    # History isn't hedged
+    public.return_trade_history(currency_pair='BTC_ETH')
+    assert hedging.stats.requests == 1
+
+
+def test_concurrent_requests_dont_queue_for_workers():
+    class SlowPublicAPI(PoloniexPublicAPI):
+        def _send(self, request, stream=False):
+            time.sleep(0.05)
+            response = Response()
+            response.status_code = 200
+            response._content = b'{}'
+            return response
+
+    hedging = HedgingPolicy(initial_delay=0.2, workers=8)
+    public = SlowPublicAPI(requests_per_second=100000, hedging=hedging)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(64) as pool:
+        list(pool.map(lambda _: public.return_ticker(), range(64)))
+    # Not 8 rounds of 0.05s behind the hedging pool, and nothing was slow
+    # enough to hedge
+    assert time.monotonic() - start < 0.2
+    assert hedging.stats == HedgeStats(requests=64, hedges=0, wins=0, skipped=0)
+
+
+def test_requests_run_pooled_in_the_callers_context():
+    var: ContextVar = ContextVar('var', default=None)
+    hedging = HedgingPolicy(initial_delay=0.5, workers=2)
+    seen = []
+
+    def primary():
+        seen.append((var.get(), threading.get_ident()))
+        return 'primary'
+
+    var.set('caller')
+    for _ in range(20):
+        assert hedging.call('returnTicker', primary, primary, lambda: True) == 'primary'
+    assert {value for value, _ in seen} == {'caller'}
+    # Threads are reused rather than started per request
+    assert len({ident for _, ident in seen}) <= 2
+
+
+def test_hedge_needs_rate_budget():
+    hedging = HedgingPolicy(initial_delay=0.05)
+    public = SlowFirstPublicAPI(rate_limiter=RateLimiter(1, 1, 1), hedging=hedging)
+
+    assert public.return_ticker() == {'call': 0}
+    assert hedging.stats == HedgeStats(requests=1, hedges=0, wins=0, skipped=1)
+
+
+def test_delay_follows_latency_percentile():
+    hedging = HedgingPolicy(percentile=90, min_samples=10, initial_delay=0.5)
+    assert hedging.delay('returnTicker') == 0.5
+    for i in range(1, 101):
+        hedging.record('returnTicker', i / 100)
+    assert hedging.delay('returnTicker') == 0.91
+    assert hedging.delay('returnOrderBook') == 0.5
+
+
+def test_async_hedge_cancels_loser(serve_async):
+    calls = count()
+    finished = []
+
+    async def handler(request):
+        call = next(calls)
+        if call == 0:
+            await asyncio.sleep(2)
+        finished.append(call)
+        return web.json_response({'call': call})
+
+    # Lets the server notice the loser's connection being dropped
+    server = serve_async(handler, handler_cancellation=True)
+    StubPublicAPI = server.client(AsyncPoloniexPublicAPI)
+
+    async def main():
+        hedging = HedgingPolicy(initial_delay=0.05)
+        async with StubPublicAPI(requests_per_second=1000, hedging=hedging) as public:
+            start = time.monotonic()
+            ticker = await public.return_ticker()
+            return ticker, time.monotonic() - start, hedging.stats
+
+    ticker, elapsed, stats = asyncio.run(main())
+    assert ticker == {'call': 1}
+    assert elapsed < 1
+    assert stats == HedgeStats(requests=1, hedges=1, wins=1, skipped=0)
+    assert finished == [1]
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+import random
+import threading
+from datetime import datetime
+from decimal import Decimal
+
+from pyloniex import PoloniexPublicAPI
+from pyloniex.history import iter_trades
+
+
+START = 1504634400
+
+
+def make_trades():
+    random.seed(7)
+    trades = []
+    trade_id = 1000
+    for second in range(START, START + 3 * 3600):
+        # A quiet market with a burst of activity in the middle
+        burst = START + 5000 <= second < START + 5100
+        for _ in range(random.randint(5, 15) if burst else random.randint(0, 1)):
+            trade_id += 1
+            trades.append({
+                'globalTradeID': trade_id,
+                'tradeID': trade_id,
+                'date': datetime.utcfromtimestamp(second).strftime('%Y-%m-%d %H:%M:%S'),
+                'timestamp': second,
+                'type': 'buy',
+                'rate': '0.07',
+                'amount': '1.0',
+                'total': '0.07',
+            })
+    return trades
+
+
+class FakePublicAPI(PoloniexPublicAPI):
+    limit = 200
+
+    def __init__(self, trades, numbers=None):
+        super().__init__(requests_per_second=10000, numbers=numbers)
+        self.trades = trades
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def return_trade_history(self, *, currency_pair, start=None, end=None):
+        with self.lock:
+            self.calls.append((start, end))
+        matches = [t for t in self.trades if start <= t['timestamp'] <= end]
+        # Newest first, truncated like the real thing
+        return self._numbers(list(reversed(matches))[:self.limit])
+
+
+def test_iter_trades_complete_and_ordered():
+    trades = make_trades()
+    public = FakePublicAPI(trades)
+    result = list(iter_trades(
+        public,
+        currency_pair='BTC_ETH',
+        start=START,
+        end=START + 3 * 3600,
+        window=1800,
+        workers=3,
+        limit=FakePublicAPI.limit,
+    ))
+    assert [t['globalTradeID'] for t in result] == [t['globalTradeID'] for t in trades]
+    # The burst forced some windows to be split
+    assert any(end - start + 1 < 1800 for start, end in public.calls)
+
+
+def test_iter_trades_stops_early():
+    public = FakePublicAPI(make_trades())
+    trades = iter_trades(
+        public,
+        currency_pair='BTC_ETH',
+        start=START,
+        end=START + 3 * 3600,
+        window=600,
+        workers=2,
+        limit=FakePublicAPI.limit,
+    )
+    first = next(trades)
+    trades.close()
+    assert first['globalTradeID'] == 1001
+
+
+def test_iter_trades_number_views():
+    trades = make_trades()
+    public = FakePublicAPI(trades, numbers='decimal')
+    result = list(iter_trades(
+        public,
+        currency_pair='BTC_ETH',
+        start=START,
+        end=START + 3 * 3600,
+        window=1800,
+        workers=3,
+        limit=FakePublicAPI.limit,
+    ))
+    assert [t['globalTradeID'] for t in result] == [t['globalTradeID'] for t in trades]
+    assert result[0]['rate'] == Decimal('0.07')
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+import subprocess
+import sys
+
+
+def loaded_after(statement: str, modules):
+    """Which of `modules` a fresh interpreter has loaded after `statement`."""
+    probe = f'import sys\n{statement}\nprint(*(m for m in {modules!r} if m in sys.modules))'
+    output = subprocess.run(
+        [sys.executable, '-c', probe],
+        check=True,
+        stdout=subprocess.PIPE,
+    ).stdout.decode()
+    return output.split()
+
+
+def test_lazy_imports():
+    heavy = ('requests', 'tenacity', 'cryptography', 'asyncio', 'orjson', 'hmac')
+    assert loaded_after(
+        'import pyloniex, pyloniex.order_book, pyloniex.constants, pyloniex.encoding',
+        heavy,
+    ) == []
+
+    lazy = ('tenacity', 'cryptography', 'asyncio')
+    assert loaded_after(
+        "from pyloniex import PoloniexPrivateAPI\n"
+        "PoloniexPrivateAPI(key='key', secret='secret')",
+        lazy,
+    ) == []
+    assert loaded_after(
+        "from pyloniex import PoloniexPrivateAPI\n"
+        "PoloniexPrivateAPI(key='key', secret='secret')._auth.sign(b'')",
+        lazy,
+    ) == []
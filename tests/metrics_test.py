@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from pytest import fixture
+
+from pyloniex import PoloniexPrivateAPI
+from pyloniex import PoloniexPublicAPI
+from pyloniex.api.aio import AsyncPoloniexPublicAPI
+from pyloniex.metrics import PHASES
+from pyloniex.metrics import Fanout
+from pyloniex.metrics import PrometheusMetrics
+from pyloniex.metrics import SpanHooks
+
+
+@fixture
+def base(serve):
+    attempts = []
+
+    def handle(request):
+        command = request.params['command']
+        if request.method == 'POST':
+            return 200, {'command': command}
+        attempts.append(command)
+        if command == 'returnOrderBook' and attempts.count(command) == 1:
+            return 429, {'error': 'Slow down'}
+        return 200, {'command': command}
+
+    return serve(handle).url
+
+
+def test_prometheus_metrics(base):
+    class StubPublicAPI(PoloniexPublicAPI):
+        host = f'{base}/public'
+
+    metrics = PrometheusMetrics()
+    public = StubPublicAPI(requests_per_second=1000, instrumentation=metrics)
+    assert public.return_ticker() == {'command': 'returnTicker'}
+    assert public.return_order_book(currency_pair='BTC_ETH') == {'command': 'returnOrderBook'}
+
+    text = metrics.render()
+    labels = 'client="StubPublicAPI",command="returnTicker"'
+    for phase in PHASES:
+        assert f'pyloniex_request_phase_seconds_count{{{labels},phase="{phase}"}} 1' in text
+    assert f'pyloniex_request_seconds_count{{{labels}}} 1' in text
+    assert f'pyloniex_request_seconds_bucket{{{labels},le="+Inf"}} 1' in text
+    assert f'pyloniex_received_bytes_total{{{labels}}} 27' in text
+
+    labels = 'client="StubPublicAPI",command="returnOrderBook"'
+    assert f'pyloniex_responses_total{{{labels},status="429"}} 1' in text
+    assert f'pyloniex_responses_total{{{labels},status="200"}} 1' in text
+    assert f'pyloniex_retries_total{{{labels}}} 1' in text
+    assert 'pyloniex_requests_waiting 0' in text
+
+
+def test_span_hooks(base):
+    class StubPrivateAPI(PoloniexPrivateAPI):
+        host = f'{base}/tradingApi'
+
+    started, ended = [], []
+    metrics = PrometheusMetrics()
+    hooks = SpanHooks(on_start=started.append, on_end=ended.append)
+    private = StubPrivateAPI(key='key', secret='secret', instrumentation=Fanout(hooks, metrics))
+    assert private.return_balances() == {'command': 'returnBalances'}
+
+    assert started == ended
+    span = ended[0]
+    assert span.name == 'poloniex.returnBalances'
+    assert span.error is None
+    assert span.duration >= sum(span.phases.values())
+    attributes = span.attributes
+    assert attributes['http.status_code'] == 200
+    assert attributes['pyloniex.bytes_out'] == len('command=returnBalances&nonce=') + 16
+    assert attributes['pyloniex.prepare_seconds'] > 0
+    assert 'pyloniex_responses_total{client="StubPrivateAPI",command="returnBalances",status="200"} 1' in metrics.render()
+
+
+def test_async_metrics(base):
+    class StubPublicAPI(AsyncPoloniexPublicAPI):
+        host = f'{base}/public'
+
+    ended = []
+
+    async def main():
+        async with StubPublicAPI(instrumentation=SpanHooks(on_end=ended.append)) as public:
+            return await public.return_ticker()
+
+    assert asyncio.run(main()) == {'command': 'returnTicker'}
+    span, = ended
+    assert span.status == 200
+    assert set(span.phases) == {'wait', 'network', 'decode'}
+    assert span.bytes_in == 27
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+from aiohttp import web
+from pytest import fixture
+
+from pyloniex import PoloniexPrivateAPI
+from pyloniex.api.aio import AsyncPoloniexPrivateAPI
+from pyloniex.nonce import FileNonceAllocator
+from pyloniex.nonce import NonceAllocator
+from pyloniex.nonce import next_async
+from pyloniex.utils import RateLimiter
+
+
+DELAY = 0.05
+
+
+class NonceServer:
+    """Accepts a request only if its nonce beats every nonce seen before, the
+    way Poloniex does.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last = 0
+        self.accepted = 0
+        self.rejected = 0
+
+    def check(self, body):
+        nonce = int(parse_qs(body.decode())['nonce'][0])
+        with self.lock:
+            if nonce <= self.last:
+                self.rejected += 1
+                return False
+            self.last = nonce
+            self.accepted += 1
+            return True
+
+
+@fixture
+def stub(serve_async):
+    """An asyncio server, so that requests are read in the order they arrive
+    rather than in whatever order handler threads get scheduled.
+    """
+    state = NonceServer()
+
+    async def handler(request):
+        ok = state.check(await request.read())
+        await asyncio.sleep(DELAY)
+        if ok:
+            return web.json_response({})
+        return web.json_response({'error': 'Nonce must be greater'}, status=422)
+
+    return state, serve_async(handler)
+
+
+def test_nonce_allocator_threads():
+    allocator = NonceAllocator()
+    with ThreadPoolExecutor(8) as pool:
+        nonces = list(pool.map(lambda _: allocator.next(), range(2000)))
+    assert len(set(nonces)) == 2000
+
+
+def _allocate(path, count, queue):
+    allocator = FileNonceAllocator(path)
+    queue.put([allocator.next() for _ in range(count)])
+    allocator.close()
+
+
+def test_file_nonce_allocator(tmp_path):
+    path = str(tmp_path / 'nonce')
+    queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=_allocate, args=(path, 200, queue))
+        for _ in range(3)
+    ]
+    for process in processes:
+        process.start()
+    nonces = []
+    for _ in processes:
+        nonces.extend(queue.get(timeout=30))
+    for process in processes:
+        process.join()
+    assert len(set(nonces)) == 600
+
+    # The high-water mark survives a restart, even if the clock goes back
+    with open(path, 'r+b') as f:
+        f.write((2 ** 62).to_bytes(8, 'little'))
+    allocator = FileNonceAllocator(path)
+    assert allocator.next() == 2 ** 62 + 1
+    allocator.close()
+
+
+def test_concurrent_private_requests_in_nonce_order(stub):
+    state, server = stub
+    StubPrivateAPI = server.client(PoloniexPrivateAPI)
+
+    for pipelined in (False, True):
+        state.accepted = state.rejected = 0
+        private = StubPrivateAPI(
+            key='key',
+            secret='secret',
+            rate_limiter=RateLimiter(10000, 1, 1),
+            pipelined=pipelined,
+        )
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(10) as pool:
+            list(pool.map(lambda n: private.cancel_order(order_number=n), range(30)))
+        elapsed = time.monotonic() - start
+
+        assert state.accepted == 30
+        if pipelined:
+            # Requests overlapped instead of waiting for each other's
+            # responses; the server may read the ones on different
+            # connections out of order, and those are retried
+            assert elapsed < 30 * DELAY / 2
+        else:
+            assert state.rejected == 0
+
+
+def test_default_allocator_per_key(stub):
+    state, server = stub
+    StubPrivateAPI = server.client(PoloniexPrivateAPI)
+    a, b, another_a = (
+        StubPrivateAPI(key=key, secret='secret', rate_limiter=RateLimiter(10000, 1, 1))
+        for key in ('key-a', 'key-b', 'key-a')
+    )
+    assert a._dispatcher.allocator is another_a._dispatcher.allocator
+    assert a._dispatcher.allocator is not b._dispatcher.allocator
+
+    # A request in flight on one key doesn't hold up another key's
+    a._dispatcher.allocator.acquire()
+    pool = ThreadPoolExecutor(1)
+    try:
+        pool.submit(b.cancel_order, order_number=1).result(timeout=5)
+    finally:
+        a._dispatcher.allocator.release()
+        pool.shutdown()
+    assert state.accepted == 1
+
+
+def test_concurrent_async_private_requests_in_nonce_order(stub):
+    state, server = stub
+    StubPrivateAPI = server.client(AsyncPoloniexPrivateAPI)
+
+    async def main(pipelined):
+        private = StubPrivateAPI(
+            key='key',
+            secret='secret',
+            rate_limiter=RateLimiter(10000, 1, 1),
+            pipelined=pipelined,
+        )
+        async with private:
+            await asyncio.gather(*(
+                private.cancel_order(order_number=n) for n in range(30)
+            ))
+
+    asyncio.run(main(False))
+    assert state.accepted == 30
+    assert state.rejected == 0
+
+    state.accepted = state.rejected = 0
+    start = time.monotonic()
+    asyncio.run(main(True))
+    elapsed = time.monotonic() - start
+    assert state.accepted == 30
+    assert elapsed < 30 * DELAY / 2
+
+
+def test_async_clients_sharing_an_allocator(stub):
+    state, server = stub
+    allocator = NonceAllocator()
+    StubPrivateAPI = server.client(AsyncPoloniexPrivateAPI)
+
+    async def main():
+        clients = [
+            StubPrivateAPI(
+                key='key',
+                secret='secret',
+                rate_limiter=RateLimiter(10000, 1, 1),
+                nonce_allocator=allocator,
+            )
+            for _ in range(2)
+        ]
+        # A thread holding the allocator doesn't block the loop either
+        allocator.acquire()
+        asyncio.get_running_loop().call_later(DELAY, allocator.release)
+        try:
+            return await asyncio.wait_for(asyncio.gather(
+                *(client.cancel_order(order_number=n) for client in clients for n in range(5)),
+                next_async(allocator),
+            ), timeout=5)
+        finally:
+            for client in clients:
+                await client.close()
+
+    *_, nonce = asyncio.run(main())
+    assert state.accepted == 10
+    assert state.rejected == 0
+    assert nonce > 0
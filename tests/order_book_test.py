@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import random
+from decimal import Decimal
+
+import pytest
+
+from pyloniex.decoding import number_view
+from pyloniex.order_book import OrderBook
+from pyloniex.order_book import SequenceGap
+
+
+SNAPSHOT = {
+    'asks': [['0.07100000', 1.5], ['0.07200000', 2], ['0.07300000', 3]],
+    'bids': [['0.07000000', 4], ['0.06900000', 5], ['0.06800000', 6]],
+    'isFrozen': '0',
+    'seq': 100,
+}
+
+
+def test_snapshot_and_queries():
+    book = OrderBook('BTC_ETH')
+    book.load(SNAPSHOT)
+
+    assert book.sequence == 100
+    assert book.best_ask == (0.071, 1.5)
+    assert book.best_bid == (0.07, 4.0)
+    assert book.top(2) == {
+        'asks': [(0.071, 1.5), (0.072, 2.0)],
+        'bids': [(0.07, 4.0), (0.069, 5.0)],
+    }
+    assert book.asks.depth(price=0.072) == 3.5
+    assert book.bids.depth(price=0.069) == 9.0
+    assert book.bids.depth(levels=1) == 4.0
+    assert book.bids.depth() == 15.0
+
+
+def test_push_updates_and_sequence():
+    book = OrderBook()
+    opening = {
+        'currencyPair': 'BTC_ETH',
+        'orderBook': [{'0.07100000': '1.5', '0.07200000': '2'}, {'0.07000000': '4'}],
+    }
+    assert book.apply([148, 7, [['i', opening]]]) == []
+    assert book.currency_pair == 'BTC_ETH'
+
+    trade = ['t', '126320', 1, '0.07100000', '0.5', 1506380000]
+    trades = book.apply([148, 8, [
+        ['o', 0, '0.07100000', '1.0'],
+        ['o', 1, '0.07050000', '2.0'],
+        ['o', 0, '0.07200000', '0.00000000'],
+        trade,
+    ]])
+    assert trades == [trade]
+    assert book.best_bid == (0.0705, 2.0)
+    assert list(book.asks) == [(0.071, 1.0)]
+    assert book.sequence == 8
+
+    # Old messages are ignored; missing ones are reported
+    assert book.apply([148, 8, [['o', 0, '0.07100000', '9']]]) == []
+    assert book.best_ask == (0.071, 1.0)
+    with pytest.raises(SequenceGap) as e:
+        book.apply([148, 10, [['o', 0, '0.07100000', '9']]])
+    assert (e.value.expected, e.value.received) == (9, 10)
+
+    with pytest.raises(SequenceGap):
+        OrderBook().apply([148, 1, [['o', 0, '0.07100000', '9']]])
+
+
+def test_sync_with_newer_snapshot():
+    book = OrderBook('BTC_ETH')
+    book.load(SNAPSHOT)
+    book.sync({
+        # The 0.072 ask is gone; the 0.073 one is beyond this snapshot's depth
+        'asks': [['0.07050000', 1], ['0.07100000', 1.5], ['0.07250000', 1]],
+        'bids': [['0.07000000', 3]],
+        'seq': 105,
+    })
+    assert list(book.asks) == [(0.0705, 1.0), (0.071, 1.5), (0.0725, 1.0), (0.073, 3.0)]
+    assert list(book.bids) == [(0.07, 3.0), (0.069, 5.0), (0.068, 6.0)]
+    assert book.sequence == 105
+
+    book.sync({'asks': [], 'bids': [], 'seq': 104})
+    assert len(book.asks) == 4
+
+
+def test_matches_rebuilt_book():
+    rng = random.Random(0)
+    book = OrderBook()
+    book.load({'asks': [], 'bids': [], 'seq': 0})
+    expected = {0: {}, 1: {}}
+    for sequence in range(1, 5001):
+        side = rng.randint(0, 1)
+        price = f'{rng.randint(1, 500) / 1e4:.8f}'
+        amount = rng.choice(['0.00000000', f'{rng.random():.8f}'])
+        book.apply([148, sequence, [['o', side, price, amount]]])
+        if float(amount):
+            expected[side][float(price)] = float(amount)
+        else:
+            expected[side].pop(float(price), None)
+
+    assert list(book.asks) == sorted(expected[0].items())
+    assert list(book.bids) == sorted(expected[1].items(), reverse=True)
+
+
+def test_number_modes():
+    book = OrderBook('BTC_ETH', numbers='scaled')
+    book.load(SNAPSHOT)
+    assert book.best_ask == (7100000, 150000000)
+    assert book.bids.depth() == 1500000000
+    book.apply([148, 101, [['o', 1, '0.07050000', '2']]])
+    assert book.best_bid == (7050000, 200000000)
+
+    book = OrderBook('BTC_ETH', numbers='decimal')
+    book.load(SNAPSHOT)
+    assert book.best_ask == (Decimal('0.071'), Decimal('1.5'))
+
+    # A snapshot from a client in another number mode reads as sent
+    view = number_view('scaled')(SNAPSHOT)
+    book = OrderBook('BTC_ETH')
+    book.load(view)
+    assert book.best_ask == (0.071, 1.5)
+    book.sync(number_view('scaled')({'asks': [['0.07000000', 1]], 'bids': [], 'seq': 101}))
+    assert book.best_ask == (0.07, 1.0)
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import hashlib
+import hmac
+import json
+from collections import Counter
+
+from aiohttp import web
+
+from pyloniex.api.push import ACCOUNT
+from pyloniex.api.push import TICKER
+from pyloniex.api.push import PoloniexPushAPI
+
+
+def ticker(i):
+    return [TICKER, None, [148, str(i), '0.1', '0.09', '0.0', '1', '10', 0, '0.1', '0.09']]
+
+
+async def take(subscription, n):
+    messages = []
+    async for message in subscription:
+        messages.append(message)
+        if len(messages) == n:
+            break
+    return messages
+
+
+def test_fan_out_and_resubscribe(serve_async):
+    subscribes = Counter()
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for frame in ws:
+            command = json.loads(frame.data)
+            channel = command['channel']
+            subscribes[channel] += 1
+            if channel == TICKER:
+                await ws.send_json([TICKER, 1])
+                for i in range(3):
+                    await ws.send_json(ticker(i))
+            elif channel == 'BTC_ETH':
+                book = {'currencyPair': 'BTC_ETH', 'orderBook': [{'0.08': '1'}, {'0.07': '2'}]}
+                await ws.send_json([148, 1, [['i', book]]])
+                await ws.send_json([148, 2, [['o', 1, '0.07', '3']]])
+            if sum(subscribes.values()) == 2:
+                # Drop the first connection once both channels are set up
+                await ws.close()
+        return ws
+
+    StubPushAPI = serve_async(handler).client(PoloniexPushAPI)
+
+    async def main():
+        async with StubPushAPI(reconnect_delay=0.01) as push:
+            first = await push.subscribe(TICKER)
+            second = await push.subscribe(TICKER, maxsize=1)
+            book = await push.subscribe('BTC_ETH')
+            results = await asyncio.wait_for(
+                asyncio.gather(take(first, 6), take(second, 6), take(book, 4)),
+                timeout=5,
+            )
+            return results, push.connections
+
+    (first, second, book), connections = asyncio.run(main())
+    assert connections == 2
+    assert subscribes == {TICKER: 2, 'BTC_ETH': 2}
+    assert first == second == [ticker(i) for i in range(3)] * 2
+    assert [message[2][0][0] for message in book] == ['i', 'o', 'i', 'o']
+
+
+def test_slow_subscriber_drops_oldest(serve_async):
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for _ in ws:
+            for i in range(10):
+                await ws.send_json(ticker(i))
+        return ws
+
+    StubPushAPI = serve_async(handler).client(PoloniexPushAPI)
+
+    async def main():
+        async with StubPushAPI() as push:
+            subscription = await push.subscribe(TICKER, maxsize=2, overflow='drop')
+            while subscription.dropped < 8:
+                await asyncio.sleep(0.01)
+            await subscription.close()
+            return subscription.dropped, [message async for message in subscription]
+
+    dropped, messages = asyncio.run(asyncio.wait_for(main(), timeout=5))
+    assert dropped == 8
+    assert messages == [ticker(8), ticker(9)]
+
+
+def test_undecodable_frames_are_skipped(serve_async):
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for _ in ws:
+            await ws.send_str('<html>502 Bad Gateway</html>')
+            for i in range(2):
+                await ws.send_json(ticker(i))
+        return ws
+
+    StubPushAPI = serve_async(handler).client(PoloniexPushAPI)
+
+    async def main():
+        async with StubPushAPI() as push:
+            subscription = await push.subscribe(TICKER)
+            return await take(subscription, 2), push.connections
+
+    messages, connections = asyncio.run(asyncio.wait_for(main(), timeout=5))
+    assert messages == [ticker(0), ticker(1)]
+    assert connections == 1
+
+
+def test_account_subscription_is_signed(serve_async):
+    secret = 'hunter2'
+    received = []
+
+    async def handler(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        async for frame in ws:
+            command = json.loads(frame.data)
+            received.append(command)
+            expected = hmac.new(secret.encode(), command['payload'].encode(), hashlib.sha512).hexdigest()
+            if command['key'] == 'key' and command['sign'] == expected:
+                await ws.send_json([ACCOUNT, '', [['b', 28, 'e', '-0.06']]])
+            else:
+                await ws.send_json({'error': 'Permission denied.'})
+        return ws
+
+    StubPushAPI = serve_async(handler).client(PoloniexPushAPI)
+
+    async def main():
+        async with StubPushAPI(key='key', secret=secret) as push:
+            account = await push.subscribe(ACCOUNT)
+            return await asyncio.wait_for(take(account, 1), timeout=5)
+
+    assert asyncio.run(main()) == [[ACCOUNT, '', [['b', 28, 'e', '-0.06']]]]
+    assert received[0]['payload'].startswith('nonce=')
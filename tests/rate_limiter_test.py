@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
+import threading
 import time
 from collections import Counter
 
+from requests import Response
+
+from pyloniex import PoloniexPrivateAPI
+from pyloniex import PoloniexPublicAPI
+from pyloniex.utils import AdaptiveRateLimiter
 from pyloniex.utils import RateLimiter
 
 
@@ -21,3 +27,107 @@ def test_rate_limiter():
 
     for bucket, count in counter.items():
         assert count <= max_per_sec
+
+
+def test_rate_limiter_acquire_threads():
+    max_per_sec = 20
+
+    limiter = RateLimiter(max_per_sec, 1, 1)
+    times = []
+
+    def worker():
+        for _ in range(5):
+            limiter.acquire('test')
+            times.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    times.sort()
+    assert len(times) == 40
+    # 1 token up front, then one every 1/20 s
+    assert times[-1] - times[0] >= 39 / max_per_sec - 0.01
+    # Times are taken once each thread has woken up again, which under load
+    # can be a few milliseconds after its token was granted; a late reading
+    # at the start of a window makes the window look short
+    for i in range(len(times) - max_per_sec):
+        assert times[i + max_per_sec] - times[i] >= 1 - 0.05
+
+
+def test_rate_limiter_acquire_batch():
+    limiter = RateLimiter(10, 1, 1)
+
+    start = time.monotonic()
+    assert limiter.acquire('test', tokens=3) is True
+    # The first token was banked; the other two take 0.2 s to accrue
+    assert 0.18 <= time.monotonic() - start < 0.3
+
+    # Bucket is empty now, so nothing can be had without waiting
+    assert limiter.acquire('test', timeout=0) is False
+    assert limiter.check('test') is False
+    assert limiter.acquire('test', timeout=0.2) is True
+
+
+def test_rate_limiter_reserve_is_fifo():
+    limiter = RateLimiter(10, 1, 1)
+    waits = [limiter.reserve('test') for _ in range(4)]
+    assert waits[0] == 0
+    assert waits == sorted(waits)
+    assert abs(waits[3] - 0.3) < 0.01
+
+
+def test_adaptive_rate_limiter():
+    limiter = AdaptiveRateLimiter(6, min_per_second=2, max_per_second=10, cooldown=0.05)
+
+    for _ in range(60):
+        limiter.feedback(200, 0.1)
+    # About `increase` (0.2) per second's worth of responses
+    assert 7.5 < limiter.rate < 8
+
+    limiter.feedback(429)
+    halved = limiter.rate
+    assert 3.75 < halved < 4
+    # Requests that were already in flight don't count twice
+    limiter.feedback(503)
+    assert limiter.rate == halved
+
+    time.sleep(0.06)
+    limiter.feedback(502)
+    limiter.feedback(404)
+    assert limiter.rate == 2
+
+    for _ in range(1000):
+        limiter.feedback(200)
+    assert limiter.rate == 10
+
+    rates = [rate for _, rate in limiter.history]
+    # Increases within a second share a point
+    assert rates == [6, limiter.history[1][1], halved, 2, 10]
+
+
+def test_adaptive_rate_limiter_latency():
+    limiter = AdaptiveRateLimiter(6, max_latency=0.5)
+    limiter.feedback(200, 1.0)
+    assert limiter.rate == 6
+    limiter.feedback(200, 0.1)
+    assert limiter.rate > 6
+
+
+def test_clients_feed_their_limiter():
+    class StubPublicAPI(PoloniexPublicAPI):
+        def _send(self, request, stream=False):
+            response = Response()
+            response.status_code = 200
+            response._content = b'{}'
+            return response
+
+    limiter = AdaptiveRateLimiter(6)
+    public = StubPublicAPI(rate_limiter=limiter)
+    public.return_ticker()
+    assert limiter.rate > 6
+
+    private = PoloniexPrivateAPI(key='key', secret='secret', requests_per_second=2)
+    assert private._rate_limiter._per_second == 2
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import gzip
+import json
+from time import monotonic
+
+from pytest import fixture
+from pytest import raises
+
+from pyloniex import PoloniexPrivateAPI
+from pyloniex import PoloniexPublicAPI
+from pyloniex.errors import PoloniexRequestError
+from pyloniex.replay import NotRecorded
+from pyloniex.replay import Recorder
+from pyloniex.replay import Replayer
+
+
+@fixture
+def base(serve):
+    attempts = []
+
+    def handle(request):
+        command = request.params['command']
+        if request.method == 'POST':
+            return 200, {'command': command}
+        attempts.append(command)
+        if command == 'returnOrderBook' and attempts.count(command) == 1:
+            return 429, {'error': 'Slow down'}
+        return 200, {'command': command, 'attempt': len(attempts)}
+
+    return serve(handle).url
+
+
+def record(base, path):
+    class StubPublicAPI(PoloniexPublicAPI):
+        host = f'{base}/public'
+
+    class StubPrivateAPI(PoloniexPrivateAPI):
+        host = f'{base}/tradingApi'
+
+    with Recorder(path) as recorder:
+        public = StubPublicAPI(requests_per_second=1000, transport=recorder)
+        private = StubPrivateAPI(key='key', secret='secret', requests_per_second=1000, transport=recorder)
+        results = [
+            public.return_ticker(),
+            public.return_ticker(),
+            public.return_order_book(currency_pair='BTC_ETH'),
+            private.return_balances(),
+        ]
+    return results
+
+
+def test_record_and_replay(base, tmp_path):
+    path = str(tmp_path / 'session.jsonl.gz')
+    recorded = record(base, path)
+
+    with gzip.open(path, 'rt') as f:
+        entries = [json.loads(line) for line in f]
+    # Including the 429 that was retried
+    assert [e['status'] for e in entries] == [200, 200, 429, 200, 200]
+    assert entries[-1]['params'] == {'command': 'returnBalances'}
+    assert 'secret' not in json.dumps(entries)
+
+    # Nothing listens on this host; every response comes from the log
+    class OfflinePublicAPI(PoloniexPublicAPI):
+        host = 'http://127.0.0.1:9/public'
+
+    class OfflinePrivateAPI(PoloniexPrivateAPI):
+        host = 'http://127.0.0.1:9/tradingApi'
+
+    replayer = Replayer(path)
+    public = OfflinePublicAPI(requests_per_second=1, transport=replayer)
+    private = OfflinePrivateAPI(key='key', secret='secret', requests_per_second=1, transport=replayer)
+    assert public.replaying
+
+    start = monotonic()
+    replayed = [
+        public.return_ticker(),
+        public.return_ticker(),
+        public.return_order_book(currency_pair='BTC_ETH'),
+        private.return_balances(),
+    ]
+    # Neither the rate limiter nor the retry backoff got in the way
+    assert monotonic() - start < 0.5
+    assert replayed == recorded
+    assert replayer.remaining() == 0
+
+    with raises(NotRecorded):
+        public.return_ticker()
+
+
+def test_replay_errors_and_time_scale(tmp_path):
+    path = str(tmp_path / 'session.jsonl.gz')
+    entry = {
+        'time': 0, 'elapsed': 0.2, 'method': 'GET', 'url': '/public',
+        'params': {'command': 'returnCurrencies'}, 'status': 422,
+        'headers': {'Content-Type': 'application/json'}, 'body': '{"error":"Nope"}',
+    }
+    with gzip.open(path, 'wt') as f:
+        f.write(json.dumps(entry) + '\n')
+        f.write(json.dumps({**entry, 'status': 200, 'body': '{}'}) + '\n')
+        f.write('{"truncated": ')
+
+    public = PoloniexPublicAPI(transport=Replayer(path, time_scale=0.1))
+    start = monotonic()
+    with raises(PoloniexRequestError) as info:
+        public.return_currencies()
+    assert info.value.message == 'Nope'
+    assert public.return_currencies() == {}
+    assert 0.04 <= monotonic() - start < 0.5
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import time
+from threading import Lock
+from threading import Thread
+
+import pytest
+from requests import Response
+
+from pyloniex import PoloniexPublicAPI
+from pyloniex.scheduler import Priority
+from pyloniex.scheduler import RequestExpired
+from pyloniex.scheduler import RequestScheduler
+from pyloniex.utils import RateLimiter
+
+
+lock = Lock()
+
+
+def run_all(scheduler, commands, stagger=0.0, granted=None):
+    if granted is None:
+        granted = []
+
+    def run(command):
+        scheduler.acquire(command)
+        with lock:
+            granted.append(command)
+
+    threads = []
+    for command in commands:
+        thread = Thread(target=run, args=(command,))
+        thread.start()
+        threads.append(thread)
+        time.sleep(stagger)
+    return threads, granted
+
+
+def test_urgent_requests_get_the_next_token():
+    scheduler = RequestScheduler(RateLimiter(20, 1, 1))
+    scheduler.acquire('returnTicker')  # empties the bucket
+
+    threads, granted = run_all(scheduler, ['returnTradeHistory'] * 6, stagger=0.002)
+    time.sleep(0.01)
+    assert scheduler.queued()[Priority.history] == 6
+    urgent, _ = run_all(scheduler, ['cancelOrder'], granted=granted)
+    for thread in threads + urgent:
+        thread.join()
+
+    assert len(granted) == 7
+    # It jumps the queue; at most the token already being waited for goes
+    # to history first
+    assert granted.index('cancelOrder') <= 1
+    assert scheduler.queued() == {priority: 0 for priority in Priority}
+
+
+def test_commands_take_turns_within_a_class():
+    scheduler = RequestScheduler(RateLimiter(100, 1, 1))
+    scheduler.acquire('returnTicker')
+
+    commands = ['returnTradeHistory'] * 4 + ['returnLendingHistory'] * 4
+    threads, granted = run_all(scheduler, commands, stagger=0.001)
+    for thread in threads:
+        thread.join()
+
+    # Once both are queued, neither gets two turns in a row
+    assert granted[-4:].count('returnLendingHistory') >= 2
+    assert 'returnLendingHistory' in granted[:5]
+
+
+def test_stale_requests_are_dropped():
+    scheduler = RequestScheduler(RateLimiter(5, 1, 1), max_wait={Priority.history: 0.05})
+    scheduler.acquire('returnTicker')
+
+    start = time.monotonic()
+    with pytest.raises(RequestExpired) as e:
+        scheduler.acquire('returnChartData')
+    assert e.value.command == 'returnChartData'
+    assert time.monotonic() - start < 0.3
+
+    with pytest.raises(RequestExpired):
+        with scheduler.deadline(0.01):
+            scheduler.acquire('cancelOrder')
+
+    # Without a deadline, the request waits for its token
+    scheduler.acquire('cancelOrder')
+    assert scheduler.queued() == {priority: 0 for priority in Priority}
+
+
+def test_expiry_is_prompt_and_costs_no_token():
+    scheduler = RequestScheduler(RateLimiter(1, 1, 1), max_wait={Priority.history: 0.05})
+    scheduler.acquire('returnTicker')
+    start = time.monotonic()
+
+    # Dropped at its deadline, not once the next token comes a second later
+    with pytest.raises(RequestExpired):
+        scheduler.acquire('returnChartData')
+    assert time.monotonic() - start < 0.2
+
+    # The next token still goes to the next request, on time
+    scheduler.acquire('cancelOrder')
+    assert 0.9 < time.monotonic() - start < 1.2
+    assert not scheduler.try_acquire('returnTicker')
+
+
+def test_client_requests_go_through_the_scheduler():
+    commands = []
+
+    class RecordingScheduler(RequestScheduler):
+        def acquire(self, command):
+            commands.append(command)
+
+    class StubPublicAPI(PoloniexPublicAPI):
+        def _send(self, request, stream=False):
+            response = Response()
+            response.status_code = 200
+            response._content = b'{}'
+            return response
+
+    public = StubPublicAPI(scheduler=RecordingScheduler(RateLimiter(6, 1, 1)))
+    public.return_ticker()
+    public.return_order_book(currency_pair='BTC_ETH')
+    assert commands == ['returnTicker', 'returnOrderBook']
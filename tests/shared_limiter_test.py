@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import threading
+import time
+from contextlib import contextmanager
+
+from pyloniex import PoloniexPublicAPI
+from pyloniex.limiters import SharedMemoryRateLimiter
+from pyloniex.limiters import StoreRateLimiter
+
+
+class FakeStore:
+    """Stands in for a Redis client."""
+
+    def __init__(self):
+        self._data = {}
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def get(self, name):
+        return self._data.get(name)
+
+    def set(self, name, value):
+        self._data[name] = value.encode('ascii')
+        return True
+
+    @contextmanager
+    def lock(self, name):
+        with self._guard:
+            lock = self._locks.setdefault(name, threading.Lock())
+        with lock:
+            yield
+
+
+def assert_rate(times, per_second):
+    # Times are taken once each worker has woken up again, and processes
+    # that start late or get descheduled record their grants late, so allow
+    # for some scheduling jitter
+    times = sorted(times)
+    for i in range(len(times) - per_second):
+        assert times[i + per_second] - times[i] >= 1 - 0.05
+
+
+def _worker(path, per_second, count, queue):
+    limiter = SharedMemoryRateLimiter(path, per_second, 1)
+    times = []
+    for _ in range(count):
+        limiter.acquire('key')
+        times.append(time.monotonic())
+    limiter.close()
+    queue.put(times)
+
+
+def test_shared_memory_limiter_across_processes(tmp_path):
+    path = str(tmp_path / 'bucket')
+    per_second = 20
+    queue = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=_worker, args=(path, per_second, 10, queue))
+        for _ in range(3)
+    ]
+    for process in processes:
+        process.start()
+    times = []
+    for _ in processes:
+        times.extend(queue.get(timeout=30))
+    for process in processes:
+        process.join()
+
+    assert len(times) == 30
+    assert_rate(times, per_second)
+
+
+def test_shared_memory_limiter_keys(tmp_path):
+    limiter = SharedMemoryRateLimiter(str(tmp_path / 'bucket'), 1, 1, size=2)
+    assert limiter.check('a') is True
+    assert limiter.check('a') is False
+    assert limiter.check('b') is True
+    # Evicts 'a', the least recently used key
+    assert limiter.check('c') is True
+    assert limiter.check('a') is True
+    limiter.close()
+
+
+def test_shared_memory_limiter_future_timestamps(tmp_path):
+    limiter = SharedMemoryRateLimiter(str(tmp_path / 'bucket'), 1, 1)
+    limiter.check('a')
+    # As if the file was written before the clock was set back a day
+    h = limiter._hash('a')
+    limiter._slot.pack_into(limiter._mmap, 0, h, 1.0, time.time() + 86400)
+    assert limiter.reserve('a') == 0
+    assert 0.9 < limiter.reserve('a') <= 1
+    limiter.close()
+
+
+def test_store_limiter_threads():
+    store = FakeStore()
+    per_second = 20
+    times = []
+
+    def worker():
+        limiter = StoreRateLimiter(store, per_second, 1)
+        for _ in range(5):
+            limiter.acquire('key')
+            times.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(times) == 30
+    assert_rate(times, per_second)
+
+
+def test_client_uses_given_limiter():
+    limiter = StoreRateLimiter(FakeStore(), 1, 1)
+    public = PoloniexPublicAPI(rate_limiter=limiter)
+    assert public._rate_limiter is limiter
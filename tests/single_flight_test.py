@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from pytest import raises
+
+from pyloniex import PoloniexPublicAPI
+from pyloniex.api.aio import AsyncPoloniexPublicAPI
+from pyloniex.utils import SingleFlight
+
+
+class SlowPublicAPI(PoloniexPublicAPI):
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def request(self, method, url, *, params):
+        with self.lock:
+            self.calls += 1
+        time.sleep(0.1)
+        return {'pair': params['currencyPair']}
+
+
+def test_identical_requests_coalesce():
+    public = SlowPublicAPI(coalesce=True)
+    with ThreadPoolExecutor(16) as pool:
+        books = list(pool.map(lambda _: public.return_order_book(), range(16)))
+    assert all(book is books[0] for book in books)
+    assert public.calls == 1
+
+    # Different parameters aren't coalesced
+    with ThreadPoolExecutor(2) as pool:
+        list(pool.map(
+            lambda pair: public.return_order_book(currency_pair=pair),
+            ['BTC_ETH', 'BTC_XMR'],
+        ))
+    assert public.calls == 3
+
+
+def test_exceptions_are_shared():
+    flights = SingleFlight()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        time.sleep(0.1)
+        raise ValueError('nope')
+
+    def call(_):
+        with raises(ValueError):
+            flights.do('key', fail)
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(call, range(8)))
+    assert len(calls) == 1
+
+    # Once finished, the next call goes out again
+    with raises(ValueError):
+        flights.do('key', fail)
+    assert len(calls) == 2
+
+
+def test_async_coalesce():
+    class SlowAsyncPublicAPI(AsyncPoloniexPublicAPI):
+        calls = 0
+
+        async def request(self, method, url, *, params):
+            type(self).calls += 1
+            await asyncio.sleep(0.05)
+            return {'command': params['command']}
+
+    async def main():
+        public = SlowAsyncPublicAPI(coalesce=True)
+        return await asyncio.gather(*(public.return_ticker() for _ in range(50)))
+
+    results = asyncio.run(main())
+    assert len(results) == 50
+    assert SlowAsyncPublicAPI.calls == 1
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import random
+
+from pytest import fixture
+from pytest import raises
+
+from pyloniex import PoloniexPublicAPI
+from pyloniex.api.aio import AsyncPoloniexPublicAPI
+from pyloniex.errors import PoloniexRequestError
+from pyloniex.streaming import UnexpectedJSON
+from pyloniex.streaming import iter_json
+
+
+BOOKS = {
+    f'BTC_{i}': {
+        'asks': [[f'0.{j:08d}', j * 1.5] for j in range(50)],
+        'bids': [[f'0.{j:08d}', j * 0.5] for j in range(50)],
+        'isFrozen': '0',
+        'seq': i,
+    }
+    for i in range(40)
+}
+
+TRADES = [
+    {'globalTradeID': i, 'tradeID': i, 'date': '2017-09-05 21:57:02',
+     'type': 'buy', 'rate': '0.07246999', 'amount': '0.0138001', 'total': '0.00100009'}
+    for i in range(500)
+]
+
+
+def split(body, n):
+    cuts = sorted(random.sample(range(1, len(body)), n))
+    return [body[a:b] for a, b in zip([0] + cuts, cuts + [len(body)])]
+
+
+def test_iter_json_any_chunking():
+    random.seed(1)
+    documents = [
+        ([1, -2.5e-7, 'a"b\\u00e9', {'x': [1, 2]}, [], {}, None, True, 12345678], '['),
+        ([], '['),
+        ({'BTC_ETH': {'seq': 5}, 'é': 'ü', 'n': 1.25e10}, '{'),
+        ({}, '{'),
+    ]
+    for document, container in documents:
+        body = json.dumps(document, ensure_ascii=False).encode('utf-8')
+        expected = document if container == '[' else list(document.items())
+        for _ in range(200):
+            chunks = split(body, random.randint(0, min(len(body) - 1, 12)))
+            assert list(iter_json(chunks, container)) == expected
+
+
+def test_iter_json_errors():
+    with raises(UnexpectedJSON) as info:
+        list(iter_json([b'{"error":', b'"Invalid currency pair."}']))
+    assert info.value.document == {'error': 'Invalid currency pair.'}
+
+    with raises(ValueError):
+        list(iter_json([b'[1, 2']))
+    with raises(ValueError):
+        list(iter_json([b'[1 2]']))
+
+
+def handle(request):
+    if request.params.get('currencyPair') == 'BTC_NOPE':
+        return 200, {'error': 'Invalid currency pair.'}
+    elif request.params['command'] == 'returnOrderBook':
+        return 200, BOOKS
+    return 200, TRADES
+
+
+@fixture
+def server(serve):
+    # Dribbles bodies out in small pieces
+    return serve(handle, chunk_size=1000)
+
+
+def test_stream_public(server):
+    StubPublicAPI = server.client(PoloniexPublicAPI)
+    public = StubPublicAPI(requests_per_second=1000)
+
+    assert list(public.iter_order_books()) == list(BOOKS.items())
+    assert list(public.iter_trade_history(currency_pair='BTC_ETH')) == TRADES
+
+    with raises(PoloniexRequestError) as info:
+        list(public.iter_trade_history(currency_pair='BTC_NOPE'))
+    assert info.value.message == 'Invalid currency pair.'
+
+
+def test_stream_public_async(server):
+    StubPublicAPI = server.client(AsyncPoloniexPublicAPI)
+
+    async def main():
+        async with StubPublicAPI(requests_per_second=1000) as public:
+            books = [item async for item in public.iter_order_books()]
+            trades = [
+                trade
+                async for trade in public.iter_trade_history(currency_pair='BTC_ETH')
+            ]
+        return books, trades
+
+    books, trades = asyncio.run(main())
+    assert books == list(BOOKS.items())
+    assert trades == TRADES